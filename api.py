@@ -0,0 +1,296 @@
+"""
+Headless HTTP API over QAChain, for services that need answers without the Streamlit UI.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+    POST   /documents          upload a PDF (multipart "file"); ingested in the background
+    GET    /jobs/{job_id}      progress of an ingest
+    GET    /documents          documents in the corpus
+    DELETE /documents/{doc_id} remove a document
+    POST   /ask                {"question": ..., "doc_ids": [...]}
+    POST   /ask/batch          {"questions": [...], "doc_ids": [...]}
+    GET    /health
+    GET    /metrics            stage timings, counters and cache hit rates, in Prometheus text format
+
+All requests share one corpus and the process-wide models. Questions, from /ask
+and /ask/batch alike, go to one batching.MicroBatcher, whose dispatcher thread is
+the only one running the models: concurrent questions are micro-batched into one
+ask_questions call. When PDF_QA_API_MAX_PENDING requests are already waiting or
+running, new ones get 503 with Retry-After instead of piling up. Uploads are
+ingested one at a time, in the order they arrive.
+
+With PDF_QA_API_PROCESSES above 1, inference moves out of this process: a
+worker_pool.WorkerPool runs that many worker processes, each with its own models,
+sharing documents through the index cache directory; this process only dispatches.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, List, Optional, Union
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from batching import MicroBatcher
+from ingestion import IngestPool
+from metrics import Metrics, get_metrics
+from qa_chain import QAChain
+from query_cache import LRUCache
+from worker_pool import WorkerPool, configured_qa_chain
+
+# Largest batch accepted by /ask/batch
+MAX_BATCH_QUESTIONS = 64
+# Ingest jobs whose status can still be looked up
+MAX_TRACKED_JOBS = 1024
+# How long /metrics waits for busy worker processes before serving their last reported stats
+WORKER_STATS_TIMEOUT_S = 1.0
+
+
+class Overloaded(Exception):
+    """Raised when the inference pool already has as much work as it may queue."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking inference calls with a cap on the work it holds.
+    At most `workers` calls run at once and at most `max_pending` (running plus
+    waiting) are accepted; beyond that `run` raises Overloaded straight away.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @contextmanager
+    def _slot(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise Overloaded()
+            self._pending += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._slot():
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def wait(self, submit: Callable[[], Future]) -> Any:
+        """Like `run`, for work another component executes and reports through a Future."""
+        with self._slot():
+            return await asyncio.wrap_future(submit())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _save_upload(upload: Any) -> str:
+    """Copy an upload's file to a temp PDF (blocking; run it off the event loop) and return its path."""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        shutil.copyfileobj(upload, f, 1 << 20)
+    return f.name
+
+
+class AskRequest(BaseModel):
+    question: str = Field(min_length=1)
+    doc_ids: Optional[List[str]] = None
+
+
+class BatchAskRequest(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    doc_ids: Optional[List[str]] = None
+
+
+def create_app(
+    qa_chain_factory: Callable[[], QAChain] = configured_qa_chain,
+    workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    max_batch_size: Optional[int] = None,
+    max_wait_ms: Optional[float] = None,
+    warm_up: Optional[bool] = None,
+    processes: Optional[int] = None
+) -> FastAPI:
+    """
+    Build the API. Models are loaded at startup, not on the first request, and with
+    `warm_up` (PDF_QA_WARMUP, on unless "0") each runs one dummy input before serving.
+    `workers` and `max_pending` default to PDF_QA_API_WORKERS (4) and PDF_QA_API_MAX_PENDING (64);
+    `max_batch_size` and `max_wait_ms` to PDF_QA_API_MAX_BATCH (16, 1 turns batching off)
+    and PDF_QA_API_MAX_WAIT_MS (5). `workers` threads handle the other blocking calls (removing
+    documents). `processes` (PDF_QA_API_PROCESSES, 1) above 1 serves
+    from a WorkerPool of that many processes; `qa_chain_factory` must then be a module-level
+    function, and the pool batches queued questions itself.
+    """
+    processes = processes or int(os.environ.get("PDF_QA_API_PROCESSES", 1))
+    workers = workers or int(os.environ.get("PDF_QA_API_WORKERS", 4))
+    max_pending = max_pending or int(os.environ.get("PDF_QA_API_MAX_PENDING", 64))
+    max_batch_size = max_batch_size or int(os.environ.get("PDF_QA_API_MAX_BATCH", 16))
+    max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.environ.get("PDF_QA_API_MAX_WAIT_MS", 5))
+    warm_up = warm_up if warm_up is not None else os.environ.get("PDF_QA_WARMUP", "1") != "0"
+    jobs = LRUCache(maxsize=MAX_TRACKED_JOBS)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.inference = BoundedExecutor(workers, max_pending)
+        app.state.pool = None
+        # In pool mode: the stats request in flight, and the last stats the workers reported
+        app.state.stats_future = None
+        app.state.worker_stats = []
+        if processes > 1:
+            # The pool is also the batcher: submit() has MicroBatcher's interface
+            app.state.pool = app.state.batcher = WorkerPool(
+                processes, factory=qa_chain_factory, max_batch_size=max_batch_size, warm_up=warm_up
+            )
+            await asyncio.get_running_loop().run_in_executor(None, app.state.pool.wait_ready)
+            app.state.corpus = app.state.pool
+        else:
+            app.state.qa_chain = app.state.corpus = qa_chain_factory()
+            # One ingest at a time into the one shared corpus; further uploads wait in the queue
+            app.state.ingest_pool = IngestPool(workers=1)
+            if warm_up:
+                await asyncio.get_running_loop().run_in_executor(None, app.state.qa_chain.warm_up)
+            # Also with batching off (max_batch_size 1), so questions never run the models on two threads at once
+            app.state.batcher = MicroBatcher(app.state.qa_chain, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        yield
+        app.state.batcher.close()
+        if app.state.pool is None:
+            app.state.ingest_pool.shutdown(wait=False)
+        app.state.inference.shutdown()
+
+    app = FastAPI(title="PDF QA API", lifespan=lifespan)
+
+    async def run_inference(fn: Callable[..., Any], *args: Any) -> Any:
+        try:
+            return await app.state.inference.run(fn, *args)
+        except Overloaded:
+            raise HTTPException(status_code=503, detail="Server busy, retry later.", headers={"Retry-After": "1"})
+
+    async def ask_batched(submit: Callable[[], Future]) -> Any:
+        try:
+            return await app.state.inference.wait(submit)
+        except Overloaded:
+            raise HTTPException(status_code=503, detail="Server busy, retry later.", headers={"Retry-After": "1"})
+
+    def require_documents() -> Union[QAChain, WorkerPool]:
+        # The QAChain, or in multi-process mode the pool, which keeps the corpus manifest
+        corpus = app.state.corpus
+        if not corpus.documents:
+            raise HTTPException(status_code=409, detail="No document loaded. Upload a PDF first.")
+        return corpus
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "pending": app.state.inference.pending, "documents": len(app.state.corpus.documents)}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        # The caches and the batcher keep their own counts; they are read at scrape time
+        extra = {}
+        if app.state.pool is None:
+            cache_stats = [app.state.qa_chain.cache_stats()]
+            merged = get_metrics()
+        else:
+            # Each worker process keeps its own caches and metrics; add them up. Busy workers answer
+            # after their current task, so a scrape that cannot wait gets their last stats instead,
+            # and later scrapes wait on the same request rather than queueing more
+            if app.state.stats_future is None or app.state.stats_future.done():
+                app.state.stats_future = app.state.pool.stats()
+            try:
+                workers_stats = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(app.state.stats_future)), WORKER_STATS_TIMEOUT_S
+                )
+                app.state.worker_stats = workers_stats
+            except asyncio.TimeoutError:
+                workers_stats = app.state.worker_stats
+            cache_stats = [stats["cache_stats"] for stats in workers_stats]
+            merged = Metrics(buckets=get_metrics().buckets)
+            merged.merge(get_metrics().export())
+            for stats in workers_stats:
+                merged.merge(stats["metrics"])
+        for worker_cache_stats in cache_stats:
+            for cache, stats in worker_cache_stats.items():
+                for counter, field in (("cache_hits_total", "hits"), ("cache_misses_total", "misses")):
+                    key = (counter, (("cache", cache),))
+                    extra[key] = extra.get(key, 0) + stats[field]
+        extra[("microbatch_batches_total", ())] = app.state.batcher.batches
+        extra[("microbatch_questions_total", ())] = app.state.batcher.questions
+        return merged.render_prometheus(extra_counters=extra)
+
+    @app.post("/documents", status_code=202)
+    async def ingest(file: UploadFile = File(...)):
+        # Copy the upload to a temp file on a thread, not the event loop; the ingest worker deletes it once read
+        pdf_path = await run_in_threadpool(_save_upload, file.file)
+        if app.state.pool is not None:
+            job = app.state.pool.ingest(pdf_path, name=file.filename, remove_file=True)
+        else:
+            job = app.state.ingest_pool.submit(
+                app.state.qa_chain, pdf_path, name=file.filename, replace=False, remove_file=True
+            )
+        job_id = uuid.uuid4().hex
+        jobs.put(job_id, job)
+        return {"job_id": job_id, "status": job.status}
+
+    @app.get("/jobs/{job_id}")
+    async def job_status(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job id: {job_id}")
+        return {
+            "job_id": job_id,
+            "status": job.status,
+            "doc_id": job.doc_id,
+            "pages_done": job.pages_done,
+            "pages_total": job.pages_total,
+            "chunks_done": job.chunks_done,
+            "error": job.error,
+        }
+
+    @app.get("/documents")
+    async def list_documents():
+        return {"documents": app.state.corpus.list_documents()}
+
+    @app.delete("/documents/{doc_id}")
+    async def delete_document(doc_id: str):
+        try:
+            await run_inference(app.state.corpus.remove_document, doc_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown document id: {doc_id}")
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return {"deleted": doc_id}
+
+    @app.post("/ask")
+    async def ask(request: AskRequest):
+        require_documents()
+        result = await ask_batched(lambda: app.state.batcher.submit(request.question, request.doc_ids))
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        return result
+
+    @app.post("/ask/batch")
+    async def ask_batch(request: BatchAskRequest):
+        require_documents()
+        return {"results": await ask_batched(lambda: app.state.batcher.submit_batch(request.questions, request.doc_ids))}
+
+    return app
+
+
+# One JSON line per request on the "pdf_qa" logger (see metrics.Metrics.trace)
+logging.basicConfig(level=os.environ.get("PDF_QA_LOG_LEVEL", "INFO"))
+app = create_app()
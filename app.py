@@ -1,13 +1,24 @@
 import streamlit as st
+import logging
 import os
 from datetime import datetime
 import shutil # Import shutil for file operations
+import hashlib
+import tempfile
+import threading
 
 # Import QAChain from your module (adjust the import path as needed)
 from qa_chain import QAChain
+from index_cache import get_index_cache
+from ingestion import get_ingest_pool
+
+logger = logging.getLogger("pdf_qa.app")
+# One JSON line per request on the "pdf_qa" logger (see metrics.Metrics.trace)
+logging.basicConfig(level=os.environ.get("PDF_QA_LOG_LEVEL", "INFO"))
 
 # --- Constants & Paths ---
-TEMP_PDF_PATH = "temp_uploaded_document.pdf"
+# How often (seconds) the ingest progress panel refreshes while a PDF is processed
+INGEST_REFRESH_SECONDS = 1
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -315,9 +326,10 @@ with st.sidebar:
         st.session_state.qa_history = []
         st.session_state.pdf_processed = False
         st.session_state.qa_chain = None # Reset the QAChain instance
-        # Clean up temporary PDF if it exists
-        if os.path.exists(TEMP_PDF_PATH):
-            os.remove(TEMP_PDF_PATH)
+        if st.session_state.get("ingest_job") is not None:
+            st.session_state.ingest_job.cancel()
+        st.session_state.ingest_job = None
+        st.session_state.pop("current_pdf_id", None)
         st.rerun() # Rerun to re-initialize everything cleanly
 
 # Apply theme styles
@@ -326,13 +338,32 @@ st.markdown(f"<style>{get_theme_styles(st.session_state.theme)}</style>", unsafe
 # --- Session State Initialization (Revised) ---
 # Check if qa_chain needs to be initialized or re-initialized
 if 'qa_chain' not in st.session_state or st.session_state.qa_chain is None:
-    with st.spinner("⏳ Loading AI models... This might take a moment."):
-        try:
-            st.session_state.qa_chain = QAChain()
-            # No st.success here to keep it clean, user sees the input fields become active
-        except Exception as e:
-            st.error(f"❌ Failed to load AI models. Please check your setup and try again. Error: {e}")
-            st.stop() # Stop the app if models cannot be loaded
+    try:
+        # PDF_QA_READER_MODE=generative writes answers with a small seq2seq model and streams them;
+        # with PDF_QA_READER_MODE=per_chunk, PDF_QA_CHUNKS_PER_PASS and PDF_QA_CONFIDENT_SCORE stop
+        # reading chunks once an answer scores high enough;
+        # PDF_QA_RETRIEVAL_MODE=sparse or hybrid adds BM25 retrieval to the default dense search;
+        # PDF_QA_RERANK=1 re-ranks a wider candidate set with a cross-encoder;
+        # PDF_QA_CHUNKING=tokens chunks by model tokens along headings instead of 1000 characters;
+        # PDF_QA_VECTOR_DTYPE=float16 or int8 stores vectors more compactly than float32.
+        # Models load on first use, so the page renders without waiting for them
+        st.session_state.qa_chain = QAChain(
+            index_cache=get_index_cache(),
+            reader_mode=os.environ.get("PDF_QA_READER_MODE", "stuff"),
+            chunks_per_pass=int(os.environ["PDF_QA_CHUNKS_PER_PASS"]) if os.environ.get("PDF_QA_CHUNKS_PER_PASS") else None,
+            confident_score=float(os.environ["PDF_QA_CONFIDENT_SCORE"]) if os.environ.get("PDF_QA_CONFIDENT_SCORE") else None,
+            retrieval_mode=os.environ.get("PDF_QA_RETRIEVAL_MODE", "dense"),
+            rerank=os.environ.get("PDF_QA_RERANK") == "1",
+            chunking=os.environ.get("PDF_QA_CHUNKING", "characters"),
+            vector_dtype=os.environ.get("PDF_QA_VECTOR_DTYPE", "float32"),
+            lazy=True
+        )
+    except Exception as e:
+        st.error(f"❌ Failed to set up the AI assistant. Please check your setup and try again. Error: {e}")
+        st.stop()
+    # ...and are loaded and warmed up in the background meanwhile (PDF_QA_WARMUP=0 turns this off)
+    if os.environ.get("PDF_QA_WARMUP", "1") != "0":
+        threading.Thread(target=st.session_state.qa_chain.warm_up, name="warm-up", daemon=True).start()
 
 if 'qa_history' not in st.session_state:
     st.session_state.qa_history = []
@@ -340,6 +371,39 @@ if 'qa_history' not in st.session_state:
 if 'pdf_processed' not in st.session_state:
     st.session_state.pdf_processed = False
 
+if 'ingest_job' not in st.session_state:
+    st.session_state.ingest_job = None
+
+
+def render_ingest_progress():
+    """Result of the background ingest, or its live progress while it runs."""
+    job = st.session_state.ingest_job
+    if job is None:
+        return
+    if job.status == "failed":
+        st.error(f"❌ Could not process PDF. Please ensure it's a valid PDF and try again. Error: {job.error}")
+    elif job.done:
+        st.session_state.pdf_processed = True
+        st.success(f"✅ Document loaded! Ready to chat about '{job.name}'.")
+    else:
+        poll_ingest_progress()
+
+
+@st.fragment(run_every=INGEST_REFRESH_SECONDS)
+def poll_ingest_progress():
+    """Only this panel reruns while it polls; once the job ends, the page reruns without it."""
+    job = st.session_state.ingest_job
+    if job is None or job.done:
+        st.rerun() # Refresh the whole page now the document is complete, which stops the polling
+    elif job.status == "queued":
+        st.info(f"⏳ '{job.name}' is waiting for a free worker...")
+    else:
+        st.progress(
+            job.fraction,
+            text=f"✨ Analyzing '{job.name}': page {job.pages_done} of {job.pages_total}, "
+                 f"{job.chunks_done} chunks indexed. You can already ask about the pages read so far."
+        )
+
 # --- Title & Description ---
 st.title("📄 PDF AI Assistant")
 st.markdown("##### Upload a PDF and chat with it like a friend!")
@@ -353,35 +417,33 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file is not None:
-    # Generate a unique ID for the file based on its name and size
-    file_id = f"{uploaded_file.name}-{uploaded_file.size}"
+    # Identify the file by its content so renamed or same-size files are handled correctly.
+    # Streamlit reruns this script on every interaction, so hash each upload only once.
+    upload_key = (uploaded_file.file_id, uploaded_file.size)
+    if st.session_state.get("upload_key") != upload_key:
+        st.session_state.upload_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        st.session_state.upload_key = upload_key
+    file_id = st.session_state.upload_hash
 
     # Check if a new file is uploaded or if the existing one needs re-processing
     if 'current_pdf_id' not in st.session_state or st.session_state.current_pdf_id != file_id:
         st.session_state.pdf_processed = False # Mark for reprocessing
+        if st.session_state.ingest_job is not None:
+            st.session_state.ingest_job.cancel() # Stop ingesting the previous upload
+        st.session_state.ingest_job = None
         st.session_state.current_pdf_id = file_id # Update current file ID
         st.session_state.qa_history = [] # Clear history for a new document
 
-    if not st.session_state.pdf_processed:
-        # Save the uploaded file temporarily
-        try:
-            with open(TEMP_PDF_PATH, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            with st.spinner(f"✨ Analyzing '{uploaded_file.name}'... This may take a moment."):
-                chunk_count = st.session_state.qa_chain.load_document(TEMP_PDF_PATH)
-                st.session_state.pdf_processed = True
-                st.success(f"✅ Document loaded! Ready to chat about '{uploaded_file.name}'.")
-                
-        except Exception as e:
-            st.error(f"❌ Could not process PDF. Please ensure it's a valid PDF and try again. Error: {e}")
-            st.session_state.pdf_processed = False
-        finally:
-            # Always attempt to remove the temporary file
-            if os.path.exists(TEMP_PDF_PATH):
-                os.remove(TEMP_PDF_PATH)
-    else:
-        st.info(f"📄 Document '{uploaded_file.name}' is ready to chat!")
+    if not st.session_state.pdf_processed and st.session_state.ingest_job is None:
+        # Save the upload to a file of its own (sessions must not share one) and ingest it in the background;
+        # the worker deletes the file once it has been read
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(uploaded_file.getbuffer())
+        st.session_state.ingest_job = get_ingest_pool().submit(
+            st.session_state.qa_chain, f.name, name=uploaded_file.name, remove_file=True
+        )
+
+    render_ingest_progress()
 
 # --- Question Answering Section ---
 st.header("2. Chat with Your Document")
@@ -401,29 +463,34 @@ with st.form("question_form", clear_on_submit=True):
         st.empty() # Placeholder column for spacing
 
     if submit_button:
-        if not st.session_state.pdf_processed:
+        if st.session_state.qa_chain.vector_store is None:
             st.warning("Please upload a PDF first to enable chat.")
         elif not user_question.strip():
             st.warning("Please enter a question before clicking 'Send'.")
         else:
-            with st.spinner("🔍 Thinking..."):
-                try:
-                    response = st.session_state.qa_chain.ask_question(user_question)
-                    answer = response.get("answer", "I couldn't find a relevant answer in the document.")
-                    source_docs = response.get("source_documents", [])
-
-                    # Store the Q&A in history, including timestamp
-                    st.session_state.qa_history.append({
-                        "question": user_question,
-                        "answer": answer,
-                        "sources": source_docs,
-                        "timestamp": datetime.now().strftime("%H:%M:%S")
-                    })
-
-                except Exception as e:
-                    # Generic error for the user, full detail printed to console for developer
-                    st.error("❌ An error occurred while generating the answer. Please try again or check the console for details.")
-                    print(f"Error in main app during ask_question: {e}") # Debug print
+            try:
+                with st.spinner("🔍 Thinking..."):
+                    response = st.session_state.qa_chain.stream_answer(user_question)
+                # Show the answer as it is generated; it moves into the history below once complete
+                live_answer = st.empty()
+                with live_answer.container():
+                    answer = st.write_stream(response["answer_stream"])
+                live_answer.empty()
+                answer = answer or "I couldn't find a relevant answer in the document."
+                source_docs = response.get("source_documents", [])
+
+                # Store the Q&A in history, including timestamp
+                st.session_state.qa_history.append({
+                    "question": user_question,
+                    "answer": answer,
+                    "sources": source_docs,
+                    "timestamp": datetime.now().strftime("%H:%M:%S")
+                })
+
+            except Exception:
+                # Generic error for the user, full detail printed to console for developer
+                st.error("❌ An error occurred while generating the answer. Please try again or check the console for details.")
+                logger.exception("Error in main app during ask_question")
 
 # --- Conversation History Display ---
 st.header("3. Chat History")
@@ -0,0 +1,110 @@
+"""
+Micro-batching of concurrent questions. Callers on different threads submit single
+questions; a dispatcher thread collects them for up to `max_wait_ms` (or until
+`max_batch_size` are waiting) and answers them with one QAChain.ask_questions call,
+i.e. one encode call, one FAISS search and one batched reader pass. Lists of
+questions (submit_batch) join the same batches, so the dispatcher is the only
+thread running the models; with max_batch_size 1 it just answers requests in turn.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from qa_chain import QAChain
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(self, qa_chain: QAChain, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.qa_chain = qa_chain
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue" = queue.Queue()
+        # Batches sent to ask_questions and the questions in them, for tuning and benchmarks
+        self.batches = 0
+        self.questions = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, question: str, doc_ids: Optional[List[str]] = None) -> Future:
+        """Queue a question; the returned future resolves to the same dict ask_question gives."""
+        return self._put([question], doc_ids, single=True)
+
+    def submit_batch(self, questions: List[str], doc_ids: Optional[List[str]] = None) -> Future:
+        """Queue several questions; the future resolves to the list ask_questions gives."""
+        return self._put(list(questions), doc_ids, single=False)
+
+    def _put(self, questions: List[str], doc_ids: Optional[List[str]], single: bool) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((questions, doc_ids, future, single))
+        return future
+
+    def ask(self, question: str, doc_ids: Optional[List[str]] = None) -> dict:
+        return self.submit(question, doc_ids).result()
+
+    def close(self) -> None:
+        """Answer what is already queued, then stop the dispatcher thread."""
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.questions / self.batches if self.batches else 0.0
+
+    def _collect(self, first) -> Tuple[list, bool]:
+        """The first request plus whatever else arrives within max_wait_ms, up to max_batch_size."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _dispatch(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            # ask_questions takes one document filter per call, so group by it
+            groups: Dict[Optional[Tuple[str, ...]], list] = {}
+            for item in batch:
+                key = tuple(sorted(item[1])) if item[1] is not None else None
+                groups.setdefault(key, []).append(item)
+            for doc_ids, items in groups.items():
+                self._run(items, list(doc_ids) if doc_ids is not None else None)
+
+    def _run(self, items: list, doc_ids: Optional[List[str]]) -> None:
+        # Skip requests cancelled while queued (e.g. the API client went away); once running,
+        # a future can no longer be cancelled, so answering it below cannot fail
+        items = [item for item in items if item[2].set_running_or_notify_cancel()]
+        if not items:
+            return
+        questions = [question for item in items for question in item[0]]
+        self.batches += 1
+        self.questions += len(questions)
+        try:
+            results = self.qa_chain.ask_questions(questions, doc_ids=doc_ids)
+        except Exception as e:
+            for _, _, future, _ in items:
+                future.set_exception(e)
+            return
+        start = 0
+        for item_questions, _, future, single in items:
+            answers = results[start:start + len(item_questions)]
+            start += len(item_questions)
+            future.set_result(answers[0] if single else answers)
@@ -0,0 +1,94 @@
+"""
+Recall@k vs latency vs memory for the FAISS index types in vector_index.
+
+    python -m benchmarks.bench_ann --n 1000000 --dim 384 --k 10
+
+Vectors are synthetic clustered data shaped like sentence embeddings; ground
+truth comes from an exact flat index. Use --n 100000 for a quick run.
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.common import print_table
+from vector_index import build_index, default_nlist
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    step = 100_000
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        assignment = rng.integers(0, clusters, stop - start)
+        vectors[start:stop] = centers[assignment] + 0.5 * rng.standard_normal((stop - start, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> tuple:
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query[None, :], k)
+    latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+    _, found = index.search(queries, k)
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return recall, latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--train-size", type=int, default=200_000, help="Vectors used to train IVF / PQ.")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.n, args.dim, clusters=max(16, args.n // 1000), seed=0)
+    # Queries are perturbed copies of stored vectors, like paraphrases of indexed text
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(args.n, args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    training = vectors[: min(args.train_size, args.n)]
+    nlist = default_nlist(args.n)
+
+    flat = faiss.IndexFlatL2(args.dim)
+    flat.add(vectors)
+    _, truth = flat.search(queries, args.k)
+
+    rows = []
+
+    def report(label, index, build_s):
+        recall, latency_ms = measure(index, queries, truth, args.k)
+        size_mb = faiss.serialize_index(index).nbytes / 1024 ** 2
+        rows.append([label, f"{build_s:.1f}", f"{recall:.3f}", f"{latency_ms:.3f}", f"{size_mb:.1f}"])
+
+    report("flat", flat, 0.0)
+
+    for index_type in ("ivf", "ivfpq"):
+        start = time.perf_counter()
+        index = build_index(index_type, training, nlist=nlist)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+        for nprobe in (1, 8, 32, 128):
+            index.nprobe = nprobe
+            report(f"{index_type} nlist={nlist} nprobe={nprobe}", index, build_s)
+
+    start = time.perf_counter()
+    index = build_index("hnsw", training)
+    index.add(vectors)
+    build_s = time.perf_counter() - start
+    for ef_search in (16, 64, 256):
+        index.hnsw.efSearch = ef_search
+        report(f"hnsw efSearch={ef_search}", index, build_s)
+
+    print(f"n={args.n} dim={args.dim} k={args.k}")
+    print_table(["index", "build_s", f"recall@{args.k}", "ms/query", "size_mb"], rows)
+
+
+if __name__ == "__main__":
+    main()
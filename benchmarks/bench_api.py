@@ -0,0 +1,119 @@
+"""
+Load test of the HTTP API: latency percentiles and throughput of /ask at several
+client concurrency levels. Starts `uvicorn api:app` itself unless --url points at
+a running server, and uploads --pdf before measuring. With --processes, a server
+is started for each count of inference worker processes (PDF_QA_API_PROCESSES),
+to see throughput scale with the cores.
+
+    python -m benchmarks.bench_api --concurrency 1 8 32 --requests 200
+    python -m benchmarks.bench_api --processes 1 2 4 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import DEFAULT_QUESTIONS, percentile, print_table, repo_path
+
+
+def start_server(port: int, processes: int = 1) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=repo_path(),
+        env={**os.environ, "PDF_QA_API_PROCESSES": str(processes)}
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600): # model loading can take a while on first start
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("API server did not start")
+
+
+def ingest(url: str, pdf_path: str) -> None:
+    with open(pdf_path, "rb") as f:
+        job_id = httpx.post(f"{url}/documents", files={"file": (os.path.basename(pdf_path), f)}).json()["job_id"]
+    while True:
+        job = httpx.get(f"{url}/jobs/{job_id}").json()
+        if job["status"] == "done":
+            return
+        if job["status"] not in ("queued", "running"):
+            raise RuntimeError(f"Ingest failed: {job['error']}")
+        time.sleep(0.2)
+
+
+async def run_level(url: str, concurrency: int, total: int) -> list:
+    latencies, rejected, failed = [], 0, 0
+    counter = iter(range(total))
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal rejected, failed
+        for i in counter:
+            question = DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)]
+            start = time.perf_counter()
+            response = await http.post(f"{url}/ask", json={"question": question})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            elif response.status_code == 503:
+                rejected += 1
+            else:
+                failed += 1
+
+    async with httpx.AsyncClient(timeout=120) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ms = [s * 1000 for s in latencies]
+    return [
+        concurrency,
+        len(ms),
+        rejected,
+        failed,
+        f"{percentile(ms, 50):.1f}",
+        f"{percentile(ms, 99):.1f}",
+        f"{len(ms) / elapsed:.1f}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Use a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1], help="Worker process counts to start servers with")
+    args = parser.parse_args()
+
+    rows = []
+    for processes in [None] if args.url else args.processes:
+        server = None
+        url = args.url
+        if url is None:
+            # Answers would come from the cache after the first round; measure the full path
+            os.environ.setdefault("PDF_QA_ANSWER_CACHE_SIZE", "0")
+            server = start_server(args.port, processes)
+            url = f"http://127.0.0.1:{args.port}"
+        try:
+            ingest(url, args.pdf)
+            for concurrency in args.concurrency:
+                rows.append([processes or "-", *asyncio.run(run_level(url, concurrency, args.requests))])
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    print_table(["processes", "clients", "ok", "503", "errors", "p50_ms", "p99_ms", "rps"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Latency, throughput and fp32 parity of each inference backend.
+
+    python -m benchmarks.bench_backends --backends torch torch-int8 onnx
+
+Embedding throughput is measured on the document's chunks; reader latency is per
+question with a joined top-3 context, the same work QAChain.ask_question does.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import DEFAULT_QUESTIONS, percentile, print_table, repo_path
+from inference_backends import BACKENDS
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reference_vectors = None
+    reference_answers = None
+    rows = []
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        qa = QAChain(registry=ModelRegistry(backend=backend, embedding_cache_size=0, answer_cache_size=0))
+        qa.load_document(args.pdf)
+        chunks = list(qa.doc_processor.text_chunks)
+
+        qa.ask_question(DEFAULT_QUESTIONS[0]) # warm-up
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            vectors = np.asarray(qa.embeddings.embed_documents(chunks))
+        embed_s = (time.perf_counter() - start) / args.repeat
+
+        latencies = []
+        answers = []
+        for _ in range(args.repeat):
+            answers = []
+            for question in DEFAULT_QUESTIONS:
+                start = time.perf_counter()
+                answers.append(qa.ask_question(question)["answer"])
+                latencies.append(time.perf_counter() - start)
+
+        if reference_vectors is None:
+            reference_vectors, reference_answers = vectors, answers
+        cosine = (reference_vectors * vectors).sum(axis=1) / (
+            np.linalg.norm(reference_vectors, axis=1) * np.linalg.norm(vectors, axis=1)
+        )
+        same_answers = sum(a == b for a, b in zip(answers, reference_answers)) / len(answers)
+
+        ms = [s * 1000 for s in latencies]
+        rows.append([
+            backend,
+            f"{len(chunks) / embed_s:.1f}",
+            f"{percentile(ms, 50):.1f}",
+            f"{percentile(ms, 95):.1f}",
+            f"{len(latencies) / (sum(latencies) or 1):.1f}",
+            f"{cosine.min():.4f}",
+            f"{same_answers:.0%}",
+        ])
+        if backend not in args.backends:
+            rows.pop()
+
+    print_table(
+        ["backend", "embed_chunks/s", "ask_p50_ms", "ask_p95_ms", "questions/s", "min_cosine", "same_answer"],
+        rows
+    )
+
+
+if __name__ == "__main__":
+    main()
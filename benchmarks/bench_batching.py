@@ -0,0 +1,75 @@
+"""
+Throughput of concurrent clients asking questions directly (one ask_question per
+client thread) vs through the MicroBatcher, at several client counts.
+
+    python -m benchmarks.bench_batching --clients 1 8 64 --per-client 8
+"""
+import argparse
+import threading
+import time
+
+from batching import MicroBatcher
+from benchmarks.common import DEFAULT_QUESTIONS, percentile, print_table, repo_path
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def run_clients(ask, clients: int, per_client: int) -> tuple[float, list]:
+    """Return (wall seconds, per-question latencies) for `clients` threads asking `per_client` questions each."""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def client(offset: int):
+        barrier.wait()
+        for i in range(per_client):
+            question = DEFAULT_QUESTIONS[(offset + i) % len(DEFAULT_QUESTIONS)]
+            start = time.perf_counter()
+            ask(question)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--per-client", type=int, default=8)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Caching off, so every question pays for embedding, search and reading
+    qa = QAChain(registry=ModelRegistry(embedding_cache_size=0, answer_cache_size=0))
+    qa.load_document(args.pdf)
+    qa.ask_question(DEFAULT_QUESTIONS[0]) # warm-up
+
+    rows = []
+    for clients in args.clients:
+        wall, latencies = run_clients(qa.ask_question, clients, args.per_client)
+        rows.append(["direct", clients, f"{len(latencies) / wall:.1f}", *_ms(latencies), "1.0"])
+
+        batcher = MicroBatcher(qa, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+        wall, latencies = run_clients(batcher.ask, clients, args.per_client)
+        batcher.close()
+        rows.append(["batched", clients, f"{len(latencies) / wall:.1f}", *_ms(latencies), f"{batcher.mean_batch_size:.1f}"])
+
+    print_table(["mode", "clients", "qps", "p50_ms", "p99_ms", "mean_batch"], rows)
+
+
+def _ms(latencies: list) -> list:
+    ms = [s * 1000 for s in latencies]
+    return [f"{percentile(ms, 50):.1f}", f"{percentile(ms, 99):.1f}"]
+
+
+if __name__ == "__main__":
+    main()
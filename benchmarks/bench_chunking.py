@@ -0,0 +1,71 @@
+"""
+Character chunking (RecursiveCharacterTextSplitter, 1000/200) vs token chunking
+(TokenChunker sized to MiniLM's window): how many chunks the embedder and the
+reader would truncate, how full the embedder window is, and indexing throughput.
+
+    python -m benchmarks.bench_chunking --pages 200
+    python -m benchmarks.bench_chunking --pdf sample.pdf
+
+A chunk is truncated by the reader when it does not fit in one max_seq_len window
+next to a question of --question-tokens tokens.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from transformers import AutoTokenizer
+
+from benchmarks.common import make_synthetic_pdf, print_table
+from document_processor import DocumentProcessor
+from model_registry import EMBEDDING_MODEL, QA_MODEL, ModelRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--pdf", help="Use an existing PDF instead of generating one.")
+    parser.add_argument("--reader-max-seq-len", type=int, default=384)
+    parser.add_argument("--question-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    embedder = ModelRegistry().get_embeddings(EMBEDDING_MODEL).client
+    reader_tokenizer = AutoTokenizer.from_pretrained(QA_MODEL)
+    embed_limit = embedder.max_seq_length - 2
+    reader_limit = args.reader_max_seq_len - args.question_tokens - 3
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        for chunking in ("characters", "tokens"):
+            processor = DocumentProcessor(embedder=embedder, chunking=chunking)
+            # Chunking alone, then chunking plus embedding as add_document does it
+            start = time.perf_counter()
+            chunks = [chunk for chunk, _ in processor.iter_chunk_locations(pdf_path)]
+            chunk_s = time.perf_counter() - start
+            start = time.perf_counter()
+            processor.process_pdf(pdf_path)
+            index_s = time.perf_counter() - start
+
+            embed_tokens = [len(ids) for ids in embedder.tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+            reader_tokens = [len(ids) for ids in reader_tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+            rows.append([
+                chunking,
+                len(chunks),
+                f"{sum(embed_tokens) / len(chunks):.0f}",
+                f"{sum(min(t, embed_limit) for t in embed_tokens) / (embed_limit * len(chunks)):.2f}",
+                f"{sum(t > embed_limit for t in embed_tokens) / len(chunks):.3f}",
+                f"{sum(t > reader_limit for t in reader_tokens) / len(chunks):.3f}",
+                f"{len(chunks) / chunk_s:.0f}",
+                f"{len(chunks) / index_s:.1f}",
+            ])
+
+    print(f"embedder window={embed_limit} tokens, reader room={reader_limit} tokens")
+    print_table(
+        ["chunking", "chunks", "mean_tokens", "window_fill", "embed_truncated", "reader_truncated", "chunks/s", "indexed/s"],
+        rows
+    )
+
+
+if __name__ == "__main__":
+    main()
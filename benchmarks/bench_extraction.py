@@ -0,0 +1,52 @@
+"""
+Serial vs process-pool PyMuPDF text extraction.
+
+    python -m benchmarks.bench_extraction --pages 2000 --workers 1 2 4 8 16
+
+Every parallel run is checked to be byte-identical to the serial output.
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from benchmarks.common import make_synthetic_pdf, print_table
+from pdf_extraction import iter_pages_parallel, iter_pages_serial
+
+
+def digest(pages) -> str:
+    h = hashlib.sha256()
+    for text in pages:
+        h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--pdf", help="Use an existing PDF instead of generating one.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_synthetic_pdf(os.path.join(tmp, f"synthetic_{args.pages}.pdf"), args.pages)
+
+        start = time.perf_counter()
+        reference = digest(iter_pages_serial(pdf_path))
+        serial_s = time.perf_counter() - start
+
+        rows = [["serial", f"{serial_s:.3f}", "1.00", "yes"]]
+        for workers in sorted(set(args.workers)):
+            if workers <= 1:
+                continue
+            start = time.perf_counter()
+            result = digest(iter_pages_parallel(pdf_path, workers))
+            elapsed = time.perf_counter() - start
+            rows.append([workers, f"{elapsed:.3f}", f"{serial_s / elapsed:.2f}", "yes" if result == reference else "NO"])
+
+    print_table(["workers", "wall_s", "speedup", "identical"], rows)
+
+
+if __name__ == "__main__":
+    main()
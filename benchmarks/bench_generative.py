@@ -0,0 +1,49 @@
+"""
+Time to first token vs total time of the streaming generative reader, at several
+max-new-token budgets. Caching is off so every question is generated.
+
+    python -m benchmarks.bench_generative --max-new-tokens 16 32 64
+"""
+import argparse
+import time
+
+from benchmarks.common import DEFAULT_QUESTIONS, percentile, print_table, repo_path
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--max-new-tokens", type=int, nargs="+", default=[16, 32, 64])
+    args = parser.parse_args()
+
+    qa = QAChain(registry=ModelRegistry(embedding_cache_size=0, answer_cache_size=0), reader_mode="generative")
+    qa.load_document(args.pdf)
+    "".join(qa.stream_answer(DEFAULT_QUESTIONS[0])["answer_stream"]) # warm-up
+
+    rows = []
+    for budget in args.max_new_tokens:
+        qa.reader.max_new_tokens = budget
+        first_ms, total_ms = [], []
+        for question in DEFAULT_QUESTIONS:
+            start = time.perf_counter()
+            stream = qa.stream_answer(question)["answer_stream"]
+            next(stream, None)
+            first_ms.append((time.perf_counter() - start) * 1000)
+            for _ in stream:
+                pass
+            total_ms.append((time.perf_counter() - start) * 1000)
+        rows.append([
+            budget,
+            f"{percentile(first_ms, 50):.0f}",
+            f"{percentile(first_ms, 95):.0f}",
+            f"{percentile(total_ms, 50):.0f}",
+            f"{percentile(total_ms, 95):.0f}",
+        ])
+
+    print_table(["max_new_tokens", "ttft_p50_ms", "ttft_p95_ms", "total_p50_ms", "total_p95_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
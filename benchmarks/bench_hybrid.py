@@ -0,0 +1,68 @@
+"""
+Hit rate and latency of dense, sparse (BM25) and hybrid retrieval on exact-token
+queries: each synthetic page ends with a clause ID and a part number, and a query
+is a hit if the chunk containing that token is in the top k.
+
+    python -m benchmarks.bench_hybrid --pages 200 --k 1 5
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from benchmarks.common import make_synthetic_pdf, percentile, print_table
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def exact_token_queries(chunks: list) -> list:
+    """(query, token) pairs for every part number and clause ID in the chunks."""
+    queries = []
+    for chunk in chunks:
+        for clause, part in re.findall(r"Clause (\d+-\d+) applies to part (PN-\d+)", chunk):
+            queries.append((f"Which part does clause {clause} apply to?", clause))
+            queries.append((f"What clause covers {part}?", part))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5])
+    args = parser.parse_args()
+
+    # One registry so the three chains share the embedding model; caching off
+    registry = ModelRegistry(embedding_cache_size=0, answer_cache_size=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), pages=args.pages)
+        chains = {}
+        for mode in ("dense", "sparse", "hybrid"):
+            chains[mode] = QAChain(registry=registry, retrieval_mode=mode)
+            chains[mode].load_document(pdf)
+
+    queries = exact_token_queries(chains["dense"].doc_processor.text_chunks)
+    rows = []
+    for mode, qa in chains.items():
+        qa.retrieve(queries[0][0]) # warm-up
+        hits = {k: 0 for k in args.k}
+        latencies = []
+        for query, token in queries:
+            start = time.perf_counter()
+            texts = [text for text, _ in qa.retrieve(query, k=max(args.k))]
+            latencies.append((time.perf_counter() - start) * 1000)
+            for k in args.k:
+                hits[k] += any(token in text for text in texts[:k])
+        rows.append([
+            mode,
+            *(f"{hits[k] / len(queries):.3f}" for k in args.k),
+            f"{percentile(latencies, 50):.1f}",
+            f"{percentile(latencies, 95):.1f}",
+        ])
+
+    print(f"pages={args.pages} queries={len(queries)}")
+    print_table(["retrieval", *(f"hit@{k}" for k in args.k), "p50_ms", "p95_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
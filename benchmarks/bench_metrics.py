@@ -0,0 +1,68 @@
+"""
+Cost of the instrumentation: the time to record one span, and uncached
+ask_questions latency with metrics on vs off. The overhead should stay well
+under 1% of a request.
+
+    python -m benchmarks.bench_metrics --pages 50 --queries 64
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import metrics
+from benchmarks.common import DEFAULT_QUESTIONS, make_synthetic_pdf, percentile, print_table
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def span_cost_us(instrumentation: metrics.Metrics, n: int = 100_000) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        with instrumentation.span("bench"):
+            pass
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def run(qa: QAChain, questions: list) -> list:
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        qa.ask_questions([question])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=3, help="Alternating on/off rounds, to even out drift.")
+    args = parser.parse_args()
+
+    enabled, disabled = metrics.Metrics(), metrics.Metrics(enabled=False)
+    print(f"span: {span_cost_us(enabled):.2f} us on, {span_cost_us(disabled):.2f} us off")
+
+    qa = QAChain(registry=ModelRegistry(embedding_cache_size=0, answer_cache_size=0))
+    with tempfile.TemporaryDirectory() as tmp:
+        qa.load_document(make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), pages=args.pages))
+    questions = [DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)] for i in range(args.queries)]
+    qa.ask_questions(questions[:1]) # warm-up
+
+    latencies = {"on": [], "off": []}
+    for _ in range(args.rounds):
+        for label, instrumentation in (("on", enabled), ("off", disabled)):
+            metrics._default_metrics = instrumentation
+            latencies[label].extend(run(qa, questions))
+
+    rows = [
+        [label, f"{sum(ms) / len(ms):.2f}", f"{percentile(ms, 50):.2f}", f"{percentile(ms, 95):.2f}"]
+        for label, ms in latencies.items()
+    ]
+    print_table(["metrics", "mean_ms", "p50_ms", "p95_ms"], rows)
+    on, off = (sum(latencies[label]) / len(latencies[label]) for label in ("on", "off"))
+    print(f"overhead: {(on - off) / off:+.2%}")
+
+
+if __name__ == "__main__":
+    main()
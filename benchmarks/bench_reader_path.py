@@ -0,0 +1,45 @@
+"""
+Per-question latency of LangChain RetrievalQA, the native retrieve-then-read path
+with a joined ("stuff") context, and the native path reading each chunk separately.
+
+    python -m benchmarks.bench_reader_path --repeat 20
+"""
+import argparse
+import time
+
+from benchmarks.common import DEFAULT_QUESTIONS, LATENCY_HEADERS, latency_row, print_table, repo_path
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def time_questions(qa: QAChain, questions, repeat: int) -> list:
+    qa.ask_question(questions[0]) # warm-up
+    samples = []
+    for _ in range(repeat):
+        for question in questions:
+            start = time.perf_counter()
+            qa.ask_question(question)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # Caching off, so every repeat pays for retrieval and reading
+    registry = ModelRegistry(embedding_cache_size=0, answer_cache_size=0)
+    rows = []
+    for pipeline_mode, reader_mode in (("retrieval_qa", "stuff"), ("native", "stuff"), ("native", "per_chunk")):
+        qa = QAChain(registry=registry, pipeline_mode=pipeline_mode, reader_mode=reader_mode)
+        qa.load_document(args.pdf)
+        label = f"{pipeline_mode}/{reader_mode}"
+        rows.append(latency_row(label, time_questions(qa, DEFAULT_QUESTIONS, args.repeat)))
+
+    print_table(LATENCY_HEADERS, rows)
+
+
+if __name__ == "__main__":
+    main()
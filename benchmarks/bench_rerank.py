@@ -0,0 +1,61 @@
+"""
+Hit rate and latency of dense retrieval alone vs dense retrieval of N candidates
+re-ranked by the cross-encoder, on the synthetic part-number and clause queries of
+bench_hybrid. Each re-ranked setting is run twice: cold, then with every
+(question, chunk) score cached.
+
+    python -m benchmarks.bench_rerank --pages 100 --candidates 10 25 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_hybrid import exact_token_queries
+from benchmarks.common import make_synthetic_pdf, percentile, print_table
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def run(qa: QAChain, queries: list) -> list:
+    hits, latencies = 0, []
+    for query, token in queries:
+        start = time.perf_counter()
+        texts = [text for text, _ in qa.retrieve(query)]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(token in text for text in texts)
+    return [f"{hits / len(queries):.3f}", f"{percentile(latencies, 50):.1f}", f"{percentile(latencies, 95):.1f}"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--budget-ms", type=float, default=None, help="Latency budget; unlimited by default.")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(embedding_cache_size=0, answer_cache_size=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), pages=args.pages)
+        plain = QAChain(registry=registry)
+        plain.load_document(pdf)
+        reranked = QAChain(registry=registry, rerank=True)
+        reranked.load_document(pdf)
+
+    queries = exact_token_queries(plain.doc_processor.text_chunks)
+    plain.retrieve(queries[0][0]) # warm-up
+    rows = [["off", "-", *run(plain, queries)]]
+    reranked.rerank_budget_ms = args.budget_ms
+    for candidates in args.candidates:
+        reranked.rerank_candidates = candidates
+        registry.rerank_cache.clear()
+        reranked.retrieve(queries[0][0]) # warm-up
+        rows.append([candidates, "cold", *run(reranked, queries)])
+        rows.append([candidates, "cached", *run(reranked, queries)])
+
+    print(f"pages={args.pages} queries={len(queries)} top_k={plain.top_k}")
+    print_table(["candidates", "scores", f"hit@{plain.top_k}", "p50_ms", "p95_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Hit rate and latency of the paraphrase (semantic) answer cache at several cosine
+thresholds. Each group's first question is asked cold; its paraphrases should then
+be answered from the cache. "agree" is the share of cache hits whose answer matches
+what the reader gives for that exact question with caching off.
+
+    python -m benchmarks.bench_semantic_cache --thresholds 0.8 0.85 0.9 0.95
+"""
+import argparse
+import time
+
+from benchmarks.common import percentile, print_table, repo_path
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+PARAPHRASE_GROUPS = [
+    ["What is Hugging Face known for?", "What is Hugging Face famous for?", "Why is Hugging Face well known?"],
+    [
+        "Which libraries does Hugging Face provide?",
+        "What libraries are offered by Hugging Face?",
+        "Which Hugging Face libraries exist?",
+    ],
+    ["What models are hosted on the hub?", "Which models does the hub host?", "What can be found on the model hub?"],
+    ["How can models be fine-tuned?", "How do I fine-tune a model?", "What is the way to fine-tune models?"],
+    ["What are Spaces used for?", "What is the purpose of Spaces?", "Why would someone use Spaces?"],
+    ["What is the Inference API?", "Explain the Inference API.", "What does the Inference API do?"],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    args = parser.parse_args()
+
+    # Reference answers and uncached latency, with every cache disabled
+    registry = ModelRegistry(embedding_cache_size=0, answer_cache_size=0)
+    qa = QAChain(registry=registry)
+    qa.load_document(args.pdf)
+    questions = [question for group in PARAPHRASE_GROUPS for question in group]
+    qa.ask_question(questions[0]) # warm-up
+    reference, cold_ms = {}, []
+    for question in questions:
+        start = time.perf_counter()
+        reference[question] = qa.ask_question(question)["answer"]
+        cold_ms.append((time.perf_counter() - start) * 1000)
+
+    rows = [["off", "-", "-", f"{percentile(cold_ms, 50):.1f}", "-"]]
+    for threshold in args.thresholds:
+        registry.semantic_threshold = threshold
+        registry.semantic_caches.clear()
+        hit_ms, agree, hits = [], 0, 0
+        for group in PARAPHRASE_GROUPS:
+            qa.ask_question(group[0])
+            for paraphrase in group[1:]:
+                start = time.perf_counter()
+                result = qa.ask_question(paraphrase)
+                elapsed = (time.perf_counter() - start) * 1000
+                stats = qa.cache_stats()["semantic"]
+                if stats["hits"] > hits:
+                    hits = stats["hits"]
+                    hit_ms.append(elapsed)
+                    agree += result["answer"] == reference[paraphrase]
+        paraphrases = sum(len(group) - 1 for group in PARAPHRASE_GROUPS)
+        rows.append([
+            threshold,
+            f"{hits / paraphrases:.0%}",
+            f"{agree / hits:.0%}" if hits else "-",
+            f"{percentile(cold_ms, 50):.1f}",
+            f"{percentile(hit_ms, 50):.2f}" if hit_ms else "-",
+        ])
+
+    print_table(["threshold", "hit_rate", "agree", "miss_p50_ms", "hit_p50_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Memory and time-to-first-answer as the number of QAChain sessions grows.
+
+    python -m benchmarks.bench_sessions --sessions 20
+    python -m benchmarks.bench_sessions --sessions 20 --isolated   # old behaviour: one model set per session
+
+Each new session builds a QAChain, loads the PDF and asks one question, the same
+work a fresh Streamlit browser session does before its first answer.
+"""
+import argparse
+import time
+
+from benchmarks.common import current_rss_mb, print_table, repo_path
+from model_registry import ModelRegistry
+from qa_chain import QAChain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--pdf", default=repo_path("sample.pdf"))
+    parser.add_argument("--question", default="What is described in the document?")
+    parser.add_argument("--isolated", action="store_true", help="Give every session its own ModelRegistry.")
+    args = parser.parse_args()
+
+    shared_registry = ModelRegistry()
+    sessions = []
+    rows = []
+    baseline_rss = current_rss_mb()
+
+    for n in range(1, args.sessions + 1):
+        start = time.perf_counter()
+        qa = QAChain(registry=ModelRegistry() if args.isolated else shared_registry)
+        qa.load_document(args.pdf)
+        qa.ask_question(args.question)
+        first_answer_s = time.perf_counter() - start
+        sessions.append(qa)
+
+        rss = current_rss_mb()
+        rows.append([n, f"{first_answer_s:.3f}", f"{rss:.0f}", f"{rss - baseline_rss:.0f}"])
+
+    print(f"mode: {'isolated' if args.isolated else 'shared registry'}")
+    print_table(["sessions", "first_answer_s", "rss_mb", "rss_growth_mb"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Cold start: time to import the app modules, to construct a QAChain (when the
+page can render), and to the first answer for a user who uploads a PDF
+`--think-s` seconds after the page appears. Every mode runs in a fresh process.
+
+    eager     models loaded in QAChain.__init__ (the default)
+    lazy      models loaded on first use
+    warm-up   lazy, plus QAChain.warm_up on a background thread (what app.py does)
+
+    python -m benchmarks.bench_startup --pages 20 --think-s 5
+    PDF_QA_MODEL_DIR=models HF_HUB_OFFLINE=1 python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import DEFAULT_QUESTIONS, make_synthetic_pdf, print_table
+
+MODES = ("eager", "lazy", "warm-up")
+
+
+def run_mode(mode: str, pdf_path: str, think_s: float) -> dict:
+    """Time one cold start in this process; must run before anything imported the app modules."""
+    start = time.perf_counter()
+    from qa_chain import QAChain
+    import_s = time.perf_counter() - start
+
+    qa = QAChain(reader_mode=os.environ.get("PDF_QA_READER_MODE", "stuff"), lazy=mode != "eager")
+    ready_s = time.perf_counter() - start
+    if mode == "warm-up":
+        threading.Thread(target=qa.warm_up, daemon=True).start()
+
+    time.sleep(think_s)
+    asked = time.perf_counter()
+    qa.load_document(pdf_path)
+    qa.ask_question(DEFAULT_QUESTIONS[0])
+    first_answer_s = time.perf_counter() - asked
+
+    asked = time.perf_counter()
+    qa.ask_question(DEFAULT_QUESTIONS[1])
+    second_ms = (time.perf_counter() - asked) * 1000
+    return {
+        "mode": mode,
+        "import_s": round(import_s, 3),
+        "ready_s": round(ready_s, 3),
+        "upload_to_answer_s": round(first_answer_s, 3),
+        "second_question_ms": round(second_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--think-s", type=float, default=5.0, help="Time between page render and upload.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.child_pdf, args.think_s)))
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        for mode in args.modes:
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_startup", "--child", mode,
+                "--child-pdf", pdf_path, "--think-s", str(args.think_s),
+            ]
+            output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rows.append([result[column] for column in ("mode", "import_s", "ready_s", "upload_to_answer_s", "second_question_ms")])
+
+    print(f"pages={args.pages} think_s={args.think_s}")
+    print_table(["mode", "import_s", "ready_s", "upload_to_answer_s", "second_question_ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Memory per worker and recall for the vector dtypes of compact_storage.
+
+    python -m benchmarks.bench_storage --n 200000 --dim 384
+
+Builds one index cache entry per dtype from synthetic chunks and vectors, then
+loads each entry in a fresh process (as a worker would) and reads every chunk
+and vector. "private_mb" is the anonymous memory that process holds on its own;
+memory-mapped pages are file-backed and shared with every other process on the
+same cache directory, so they show up in "rss_mb" only. The "legacy" row
+rebuilds the old layout (a str and a Document per chunk, float32 array, float32
+flat index) from the float32 entry. Recall@k is against an exact float32 search.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import faiss
+import numpy as np
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.bench_ann import synthetic_vectors
+from benchmarks.common import print_table
+from compact_storage import VECTOR_DTYPES, ChunkTexts, CompactVectors
+from index_cache import IndexCache
+from vector_index import ChunkDocstore, add_to_store, build_index
+
+WORDS = "refund warranty serial battery shipping return policy invoice device support customer order".split()
+
+
+def memory_mb() -> tuple:
+    """(rss, anonymous) memory of this process in MiB, from /proc/self/smaps_rollup."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    # File-backed pages count as private while only one process maps them, so go by Anonymous
+    return fields["Rss"], fields["Anonymous"]
+
+
+def synthetic_chunks(n: int, chars: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    per_chunk = chars // 7
+    return [" ".join(words[rng.integers(0, len(words), per_chunk)]) for _ in range(n)]
+
+
+def run_child(entry_dir: str, mode: str) -> dict:
+    """Load one entry the way a worker does and read all of it; report the memory it took."""
+    rss_before, private_before = memory_mb()
+    held = [] # objects that must stay alive until memory is measured
+    cache = IndexCache(cache_dir=os.path.dirname(entry_dir))
+    cached = cache.load(os.path.basename(entry_dir), FakeEmbeddings(size=1))
+    if mode == "legacy":
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_core.documents import Document
+        chunks = list(cached.chunks)
+        vectors = np.array(cached.embeddings, dtype=np.float32)
+        docstore = InMemoryDocstore({
+            f"doc:{i}": Document(page_content=text, metadata={"doc_id": "doc", "source": "doc.pdf", "page": 1})
+            for i, text in enumerate(chunks)
+        })
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        del cached
+        # The legacy layout's docstore and index are what this mode measures
+        held.extend((docstore, index))
+    else:
+        # Touch every page, as answering questions over the whole document eventually does
+        for array in (cached.chunks.buffer, cached.chunks.offsets, cached.embeddings.codes):
+            array.sum()
+    rss_after, private_after = memory_mb()
+    return {"rss_mb": round(rss_after - rss_before, 1), "private_mb": round(private_after - private_before, 1)}
+
+
+def build_entry(cache: IndexCache, key: str, chunks: ChunkTexts, vectors: np.ndarray, dtype: str) -> faiss.Index:
+    index = build_index("flat", vectors, vector_dtype=dtype)
+    store = FAISS(FakeEmbeddings(size=vectors.shape[1]), index, ChunkDocstore(), {})
+    locations = [{"page": 1}] * len(chunks)
+    add_to_store(store, "doc", "doc.pdf", 0, chunks, vectors, locations)
+    cache.store(key, chunks, CompactVectors.encode(vectors, dtype), store, locations=locations, source="doc.pdf")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--chunk-chars", type=int, default=800)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(*args.child)))
+        return
+
+    vectors = synthetic_vectors(args.n, args.dim, clusters=max(16, args.n // 1000), seed=0)
+    chunks = ChunkTexts.from_texts(synthetic_chunks(args.n, args.chunk_chars, seed=0))
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(args.n, args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = IndexCache(cache_dir=tmp, max_bytes=1 << 62)
+        for dtype in VECTOR_DTYPES:
+            key = dtype.ljust(64, "0")
+            index = build_entry(cache, key, chunks, vectors, dtype)
+            _, found = index.search(queries, args.k)
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+            entry_dir = os.path.join(tmp, key)
+            entry_mb = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir)) / 1024 ** 2
+            modes = ["legacy", dtype] if dtype == "float32" else [dtype]
+            for mode in modes:
+                cmd = [sys.executable, "-m", "benchmarks.bench_storage", "--child", entry_dir, mode]
+                output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                rows.append([
+                    mode, round(recall, 4), round(entry_mb, 1), result["rss_mb"], result["private_mb"],
+                    round(result["private_mb"] * 1024 ** 2 / args.n, 1),
+                ])
+
+    print(f"n={args.n} dim={args.dim} chunk_chars={args.chunk_chars} k={args.k}")
+    print_table(["layout", f"recall@{args.k}", "entry_mb", "rss_mb", "private_mb", "private_bytes_per_chunk"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Peak RSS and wall time of whole-document vs streaming PDF processing.
+
+    python -m benchmarks.bench_streaming --pages 2000
+    python -m benchmarks.bench_streaming --pages 2000 --no-embed   # extraction + chunking only
+
+Each mode runs in its own subprocess so the peak RSS figures do not mix.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_synthetic_pdf, peak_rss_mb, print_table
+
+MODES = ("whole", "streaming")
+
+
+def run_whole(processor, pdf_path, embed):
+    # The pre-streaming implementation: one big string, split, then encode everything
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    chunks = processor.text_splitter.split_text(text)
+    if embed:
+        processor._embed(chunks)
+    return len(chunks)
+
+
+def run_streaming(processor, pdf_path, embed):
+    if embed:
+        return processor.process_pdf(pdf_path)[0]
+    return sum(1 for _ in processor.iter_chunks(processor.iter_pages(pdf_path)))
+
+
+def child(mode, pdf_path, embed):
+    from document_processor import DocumentProcessor
+
+    processor = DocumentProcessor() if embed else DocumentProcessor(embedder=object())
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    runner = run_whole if mode == "whole" else run_streaming
+    chunk_count = runner(processor, pdf_path, embed)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "mode": mode,
+        "chunks": chunk_count,
+        "wall_s": round(elapsed, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_before_mb": round(rss_before, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--pdf", help="Use an existing PDF instead of generating one.")
+    parser.add_argument("--no-embed", action="store_true", help="Skip the embedding step.")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.pdf, not args.no_embed)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_synthetic_pdf(os.path.join(tmp, f"synthetic_{args.pages}.pdf"), args.pages)
+        rows = []
+        for mode in MODES:
+            cmd = [sys.executable, "-m", "benchmarks.bench_streaming", "--child", mode, "--pdf", pdf_path]
+            if args.no_embed:
+                cmd.append("--no-embed")
+            result = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip().splitlines()[-1])
+            rows.append([
+                result["mode"], result["chunks"], result["wall_s"],
+                result["peak_rss_mb"], round(result["peak_rss_mb"] - result["rss_before_mb"], 1)
+            ])
+
+    print_table(["mode", "chunks", "wall_s", "peak_rss_mb", "rss_growth_mb"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import math
+import os
+import resource
+import sys
+from typing import List
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_table(headers: List[str], rows: List[list]) -> None:
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
+
+
+def repo_path(*parts: str) -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), *parts)
+
+
+_WORDS = (
+    "the policy refund customer warranty section clause invoice part number shipping "
+    "period days within product service agreement terms payment account order return "
+    "manual device installation safety notice maintenance schedule report data value"
+).split()
+
+
+def make_synthetic_pdf(path: str, pages: int, paragraphs_per_page: int = 6, seed: int = 0) -> str:
+    """Write a text-only PDF with `pages` pages of deterministic pseudo-random prose."""
+    import random
+
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        paragraphs = []
+        for _ in range(paragraphs_per_page):
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(25, 60))]
+            paragraphs.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(f"Clause {page_no + 1}-{rng.randint(100, 999)} applies to part PN-{rng.randint(10000, 99999)}.")
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), "\n\n".join(paragraphs), fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_row(label, samples_s: List[float]) -> list:
+    """Table row with mean/p50/p95/p99 latency in milliseconds."""
+    ms = [s * 1000 for s in samples_s]
+    return [
+        label,
+        len(ms),
+        f"{sum(ms) / len(ms):.1f}" if ms else "-",
+        f"{percentile(ms, 50):.1f}",
+        f"{percentile(ms, 95):.1f}",
+        f"{percentile(ms, 99):.1f}",
+    ]
+
+
+LATENCY_HEADERS = ["path", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]
+
+DEFAULT_QUESTIONS = [
+    "What is described in the document?",
+    "What is Hugging Face known for?",
+    "Which libraries does Hugging Face provide?",
+    "What models are hosted on the hub?",
+    "How can models be fine-tuned?",
+    "What are Spaces used for?",
+    "Which company started as a chatbot company?",
+    "What is the Inference API?",
+]
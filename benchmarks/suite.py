@@ -0,0 +1,264 @@
+"""
+End-to-end benchmark of the ingest and query paths on synthetic PDFs of
+controlled size. Each stage is timed on its own: model loading, extraction,
+chunking, embedding, indexing, and per-question retrieval, reading and the
+whole uncached answer. The JSON report has the wall time, throughput,
+p50/p95/p99 latency and peak RSS of every stage. With --baseline, it exits
+with status 1 if any figure regressed by more than --tolerance.
+
+    python -m benchmarks.suite --pages 50 500 --out report.json
+    python -m benchmarks.suite --pages 50 500 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --pages 50 500 --baseline benchmarks/baseline.json
+
+Every PDF size runs in its own subprocess, so peak RSS is per size and the
+models are loaded fresh each time. Answer and embedding caches are off.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Iterable, List, Optional
+
+from benchmarks.bench_hybrid import exact_token_queries
+from benchmarks.common import DEFAULT_QUESTIONS, make_synthetic_pdf, peak_rss_mb, percentile, print_table
+
+REPORT_VERSION = 1
+
+STAGES = ("load_models", "extraction", "chunking", "embedding", "indexing", "retrieve", "read", "answer")
+# Figures where a bigger number is worse; throughput is the one where smaller is worse
+LATENCY_METRICS = ("wall_s", "p50_ms", "p95_ms", "p99_ms")
+
+
+def stage_stats(unit: str, count: int, wall_s: float, samples_s: Optional[List[float]] = None) -> dict:
+    """Summary of one stage: `count` items of `unit` in `wall_s`, with per-sample latencies if timed."""
+    stats = {
+        "unit": unit,
+        "n": count,
+        "wall_s": round(wall_s, 4),
+        "throughput": round(count / wall_s, 2) if wall_s > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if samples_s:
+        ms = [s * 1000 for s in samples_s]
+        stats.update({f"p{pct}_ms": round(percentile(ms, pct), 3) for pct in (50, 95, 99)})
+    return stats
+
+
+def timed_items(items: Iterable) -> tuple[list, List[float]]:
+    """Drain `items`, timing how long each took to produce."""
+    values, samples = [], []
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            value = next(iterator)
+        except StopIteration:
+            break
+        samples.append(time.perf_counter() - start)
+        values.append(value)
+    return values, samples
+
+
+def timed_calls(call: Callable, inputs: list) -> tuple[list, List[float]]:
+    values, samples = [], []
+    for item in inputs:
+        start = time.perf_counter()
+        values.append(call(item))
+        samples.append(time.perf_counter() - start)
+    return values, samples
+
+
+def run_size(pdf_path: str, pages: int, args) -> dict:
+    """Time every stage on one PDF, in this process."""
+    from model_registry import ModelRegistry
+    from qa_chain import QAChain
+
+    stages = {}
+    start = time.perf_counter()
+    qa = QAChain(
+        registry=ModelRegistry(embedding_cache_size=0, answer_cache_size=0, rerank_cache_size=0),
+        reader_mode=args.reader_mode,
+        retrieval_mode=args.retrieval_mode,
+        chunking=args.chunking
+    )
+    stages["load_models"] = stage_stats("chains", 1, time.perf_counter() - start)
+    processor = qa.doc_processor
+
+    start = time.perf_counter()
+    page_contents, samples = timed_items(processor.iter_pages(pdf_path, layout=processor.chunker is not None))
+    stages["extraction"] = stage_stats("pages", len(page_contents), time.perf_counter() - start, samples)
+
+    start = time.perf_counter()
+    if processor.chunker is not None:
+        located = list(processor.chunker.iter_chunks(page_contents))
+    else:
+        located = [(chunk, {"page": page}) for chunk, page in processor.iter_chunks_with_pages(page_contents)]
+    stages["chunking"] = stage_stats("chunks", len(located), time.perf_counter() - start)
+    texts = [chunk for chunk, _ in located]
+    locations = [location for _, location in located]
+    batch_size = processor.embed_batch_size
+    batches = [(i, texts[i:i + batch_size], locations[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+
+    start = time.perf_counter()
+    vectors, samples = timed_calls(lambda batch: processor._embed(batch[1]), batches)
+    stages["embedding"] = stage_stats("chunks", len(texts), time.perf_counter() - start, samples)
+
+    def index(batch_and_vectors):
+        (offset, batch, batch_locations), batch_vectors = batch_and_vectors
+        with qa._lock:
+            qa._index_chunks("bench", os.path.basename(pdf_path), "bench", offset, batch, batch_vectors, batch_locations)
+
+    start = time.perf_counter()
+    _, samples = timed_calls(index, list(zip(batches, vectors)))
+    stages["indexing"] = stage_stats("chunks", len(texts), time.perf_counter() - start, samples)
+
+    pool = [question for question, _ in exact_token_queries(texts)] + DEFAULT_QUESTIONS
+    questions = [pool[i % len(pool)] for i in range(args.queries)]
+    qa._retrieve_ranked(questions[:1], qa.top_k) # warm-up
+    qa._read(questions[:1], [[doc for doc, _ in qa._retrieve_ranked(questions[:1], qa.top_k)[0]]])
+
+    start = time.perf_counter()
+    retrieved, samples = timed_calls(lambda question: [doc for doc, _ in qa._retrieve_ranked([question], qa.top_k)[0]], questions)
+    stages["retrieve"] = stage_stats("questions", len(questions), time.perf_counter() - start, samples)
+
+    start = time.perf_counter()
+    _, samples = timed_calls(lambda pair: qa._read([pair[0]], [pair[1]]), list(zip(questions, retrieved)))
+    stages["read"] = stage_stats("questions", len(questions), time.perf_counter() - start, samples)
+
+    start = time.perf_counter()
+    _, samples = timed_calls(lambda question: qa._answer_uncached([question], None), questions)
+    stages["answer"] = stage_stats("questions", len(questions), time.perf_counter() - start, samples)
+
+    return {"pages": pages, "chunks": len(texts), "peak_rss_mb": round(peak_rss_mb(), 1), "stages": stages}
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float = 0.25, slack_ms: float = 1.0) -> List[dict]:
+    """
+    Figures in `report` worse than in `baseline` by more than `tolerance` (a fraction).
+    Latencies must also be worse by more than `slack_ms`, and throughput is only compared
+    for stages that took longer than that, so noise on near-instant stages is not
+    reported. Runs are matched by page count.
+    """
+    regressions = []
+    current_runs = {run["pages"]: run for run in report["runs"]}
+
+    def check(pages, stage, metric, old, new, higher_is_worse, slack=0.0):
+        if old is None or new is None:
+            return
+        worse = new - old if higher_is_worse else old - new
+        if worse > tolerance * old and worse > slack:
+            regressions.append({
+                "pages": pages, "stage": stage, "metric": metric, "baseline": old, "current": new,
+                "change": round((new - old) / old, 3) if old else None,
+            })
+
+    for old_run in baseline["runs"]:
+        run = current_runs.get(old_run["pages"])
+        if run is None:
+            continue
+        check(run["pages"], "all", "peak_rss_mb", old_run["peak_rss_mb"], run["peak_rss_mb"], True)
+        for stage, old_stats in old_run["stages"].items():
+            stats = run["stages"].get(stage)
+            if stats is None:
+                continue
+            for metric in LATENCY_METRICS:
+                slack = slack_ms / 1000 if metric == "wall_s" else slack_ms
+                check(run["pages"], stage, metric, old_stats.get(metric), stats.get(metric), True, slack)
+            if old_stats["wall_s"] * 1000 > slack_ms: # throughput of a near-instant stage is mostly noise
+                check(run["pages"], stage, "throughput", old_stats.get("throughput"), stats.get("throughput"), False)
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--reader-mode", default="stuff")
+    parser.add_argument("--retrieval-mode", default="hybrid")
+    parser.add_argument("--chunking", default="tokens")
+    parser.add_argument("--out", default="benchmark_report.json")
+    parser.add_argument("--baseline", help="Fail if this run regressed against the report in this file.")
+    parser.add_argument("--save-baseline", help="Also write the report here, as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression, as a fraction.")
+    parser.add_argument("--slack-ms", type=float, default=1.0, help="Latency changes smaller than this never count.")
+    parser.add_argument("--child-pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_pdf:
+        print(json.dumps(run_size(args.child_pdf, args.pages[0], args)))
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = make_synthetic_pdf(os.path.join(tmp, f"synthetic_{pages}.pdf"), pages)
+            cmd = [
+                sys.executable, "-m", "benchmarks.suite", "--child-pdf", pdf_path, "--pages", str(pages),
+                "--queries", str(args.queries), "--reader-mode", args.reader_mode,
+                "--retrieval-mode", args.retrieval_mode, "--chunking", args.chunking,
+            ]
+            output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": _git_commit(),
+        },
+        "settings": {
+            "queries": args.queries,
+            "reader_mode": args.reader_mode,
+            "retrieval_mode": args.retrieval_mode,
+            "chunking": args.chunking,
+        },
+        "runs": runs,
+    }
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    rows = []
+    for run in runs:
+        for stage in STAGES:
+            stats = run["stages"][stage]
+            rows.append([
+                run["pages"], stage, stats["n"], stats["wall_s"], stats["throughput"], stats["unit"] + "/s",
+                *(stats.get(f"p{pct}_ms", "-") for pct in (50, 95, 99)), stats["peak_rss_mb"],
+            ])
+    print_table(["pages", "stage", "n", "wall_s", "throughput", "unit", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"], rows)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            print_table(
+                ["pages", "stage", "metric", "baseline", "current", "change"],
+                [[r["pages"], r["stage"], r["metric"], r["baseline"], r["current"], f"{r['change']:+.0%}" if r["change"] is not None else "-"]
+                 for r in regressions]
+            )
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Token-sized, layout-aware chunking for DocumentProcessor.
+
+Chunks are measured in the embedding model's own tokens, so none is silently
+truncated by the encoder and none wastes most of its window. Text is packed a
+sentence at a time within the PDF's text blocks; a heading always starts a new
+chunk and is kept with the text under it. Every chunk is an exact slice of its
+page's text (the page's blocks joined by newlines), and is located by its first
+page, last page, character offset on the first page and the heading it falls under.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional
+
+from metrics import get_metrics
+from pdf_extraction import TextBlock
+
+# A sentence runs to its closing punctuation, or to the end of the block
+_SENTENCE_RE = re.compile(r"[^.!?\s][^.!?]*(?:[.!?]+|$)")
+
+
+@dataclass
+class _Unit:
+    """A sentence (or a window of a very long one) and where it sits."""
+    text: str
+    tokens: int
+    page: int
+    offset: int # within the page text
+    heading: bool
+
+
+class TokenChunker:
+    def __init__(self, tokenizer: Any, max_tokens: int = 254, overlap_tokens: int = 32, lock: Optional[threading.Lock] = None):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.tokenizer = tokenizer
+        # Held around every tokenizer call; pass the embedder's lock when the tokenizer is shared with it
+        self.lock = lock or threading.Lock()
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Model tokens in each text, without special tokens."""
+        if not texts:
+            return []
+        with self.lock:
+            encoded = self.tokenizer(texts, add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _page_units(self, blocks: List[TextBlock], page_no: int) -> tuple[str, List[_Unit]]:
+        """(page text, units) for one page; all of the page's sentences are tokenized in one call."""
+        pieces = [] # (text, offset, heading)
+        offset = 0
+        for block in blocks:
+            if block.heading:
+                pieces.append((block.text, offset, True))
+            else:
+                pieces.extend((m.group(), offset + m.start(), False) for m in _SENTENCE_RE.finditer(block.text))
+            offset += len(block.text) + 1
+        page_text = "\n".join(block.text for block in blocks)
+
+        units = []
+        for (text, start, heading), tokens in zip(pieces, self.count_tokens([text for text, _, _ in pieces])):
+            if tokens <= self.max_tokens:
+                units.append(_Unit(text, tokens, page_no, start, heading))
+            else:
+                units.extend(self._windows(text, start, page_no, heading))
+        return page_text, units
+
+    def _windows(self, text: str, start: int, page_no: int, heading: bool) -> Iterator[_Unit]:
+        """Cut a sentence longer than max_tokens at token boundaries."""
+        with self.lock:
+            offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        for first in range(0, len(offsets), self.max_tokens):
+            window = offsets[first:first + self.max_tokens]
+            lo, hi = window[0][0], window[-1][1]
+            yield _Unit(text[lo:hi], len(window), page_no, start + lo, heading)
+
+    def iter_chunks(self, pages: Iterable[List[TextBlock]]) -> Iterator[tuple[str, dict]]:
+        """
+        Yield (chunk, location) for a stream of pages given as TextBlock lists, where
+        location is {"page", "page_end", "offset", "section"} with 1-based pages.
+        Only the chunk being filled and the text of the pages it spans are buffered.
+        """
+        current: List[_Unit] = []
+        tokens = 0
+        section: Optional[str] = None
+        chunk_section: Optional[str] = None
+        page_texts = {}
+
+        def emit() -> tuple[str, dict]:
+            get_metrics().inc("chunk_tokens_total", sum(unit.tokens for unit in current))
+            text = self._slice(current, page_texts)
+            return text, {
+                "page": current[0].page,
+                "page_end": current[-1].page,
+                "offset": current[0].offset,
+                "section": chunk_section,
+            }
+
+        for page_no, blocks in enumerate(pages, start=1):
+            page_text, units = self._page_units(blocks, page_no)
+            page_texts[page_no] = page_text
+            for unit in units:
+                has_body = any(not u.heading for u in current)
+                if unit.heading and has_body:
+                    # A new section: no overlap with the previous one
+                    yield emit()
+                    current, tokens = [], 0
+                elif tokens + unit.tokens > self.max_tokens and current:
+                    yield emit()
+                    current = self._overlap(current, self.max_tokens - unit.tokens)
+                    tokens = sum(u.tokens for u in current)
+                if unit.heading:
+                    section = unit.text
+                if not current:
+                    chunk_section = section
+                current.append(unit)
+                tokens += unit.tokens
+            # Page texts before the chunk being filled are no longer needed
+            first_page = current[0].page if current else page_no + 1
+            for old in [p for p in page_texts if p < first_page]:
+                del page_texts[old]
+        if current:
+            yield emit()
+
+    def _overlap(self, units: List[_Unit], room: int) -> List[_Unit]:
+        """Trailing sentences of the finished chunk, up to overlap_tokens, that still leave `room` tokens free."""
+        budget = min(self.overlap_tokens, room)
+        tail = []
+        for unit in reversed(units):
+            if unit.heading or unit.tokens > budget:
+                break
+            tail.append(unit)
+            budget -= unit.tokens
+        return tail[::-1]
+
+    @staticmethod
+    def _slice(units: List[_Unit], page_texts: dict) -> str:
+        """The chunk's text, cut from each page's text it spans."""
+        parts = []
+        for page_no in dict.fromkeys(unit.page for unit in units):
+            on_page = [unit for unit in units if unit.page == page_no]
+            parts.append(page_texts[page_no][on_page[0].offset:on_page[-1].offset + len(on_page[-1].text)])
+        return "\n".join(parts)
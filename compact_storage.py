@@ -0,0 +1,157 @@
+"""
+Compact, memory-mappable storage for chunk texts and their embeddings.
+
+    ChunkTexts      every chunk's UTF-8 bytes in one contiguous buffer plus an
+                    int64 array of offsets, instead of one Python str per chunk
+    CompactVectors  embeddings as float32, float16 (half the size) or int8
+                    codes with one float32 scale per vector (about a quarter)
+
+Both are saved as .npy files and loaded with np.load(mmap_mode="r"), so
+processes that load the same index cache entry read the same pages from the
+OS page cache instead of each holding a private copy.
+"""
+import os
+from typing import Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+CHUNK_TEXT_FILE = "chunk_text.npy"
+CHUNK_OFFSETS_FILE = "chunk_offsets.npy"
+VECTOR_CODES_FILE = "vectors.npy"
+VECTOR_SCALES_FILE = "vector_scales.npy"
+
+
+class ChunkTexts(Sequence[str]):
+    """
+    Read-only sequence of chunk texts; chunk i is buffer[offsets[i]:offsets[i + 1]]
+    decoded. Only the chunks that are read are turned into str.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer # uint8
+        self.offsets = offsets # int64, one more than there are chunks
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str]) -> "ChunkTexts":
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def concat(cls, parts: Sequence["ChunkTexts"]) -> "ChunkTexts":
+        buffers = [np.zeros(0, dtype=np.uint8)]
+        offsets = [np.zeros(1, dtype=np.int64)]
+        size = 0
+        for part in parts:
+            start, end = int(part.offsets[0]), int(part.offsets[-1])
+            buffers.append(part.buffer[start:end])
+            offsets.append(part.offsets[1:] - start + size)
+            size += end - start
+        return cls(np.concatenate(buffers), np.concatenate(offsets))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes + self.offsets.nbytes
+
+    def save(self, directory: str) -> None:
+        np.save(os.path.join(directory, CHUNK_TEXT_FILE), np.ascontiguousarray(self.buffer))
+        np.save(os.path.join(directory, CHUNK_OFFSETS_FILE), np.ascontiguousarray(self.offsets))
+
+    @classmethod
+    def load(cls, directory: str) -> "ChunkTexts":
+        """Memory-map the chunks saved in `directory`."""
+        return cls(
+            np.load(os.path.join(directory, CHUNK_TEXT_FILE), mmap_mode="r"),
+            np.load(os.path.join(directory, CHUNK_OFFSETS_FILE), mmap_mode="r")
+        )
+
+
+class CompactVectors:
+    """
+    Embeddings in one of VECTOR_DTYPES. int8 codes are the vector divided by its largest
+    absolute component and scaled to [-127, 127]; the scale is kept per vector, so batches
+    quantized separately can be concatenated. np.asarray() gives the float32 vectors back.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.codes = codes
+        self.scales = scales # float32 per vector, int8 only
+
+    @classmethod
+    def encode(cls, vectors: np.ndarray, dtype: str = "float32") -> "CompactVectors":
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype '{dtype}'. Choose one of: {', '.join(VECTOR_DTYPES)}")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dtype != "int8":
+            return cls(vectors.astype(dtype, copy=False))
+        if len(vectors) == 0:
+            return cls(vectors.astype(np.int8), np.zeros(0, dtype=np.float32))
+        scales = np.abs(vectors).max(axis=1, initial=0.0) / 127
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    @classmethod
+    def concat(cls, parts: Sequence["CompactVectors"]) -> "CompactVectors":
+        codes = np.concatenate([part.codes for part in parts])
+        scales = np.concatenate([part.scales for part in parts]) if parts[0].scales is not None else None
+        return cls(codes, scales)
+
+    @property
+    def dtype(self) -> str:
+        return self.codes.dtype.name
+
+    @property
+    def shape(self) -> tuple:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def decode(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """float32 vectors start..stop."""
+        codes = self.codes[start:stop]
+        if self.scales is None:
+            return codes.astype(np.float32)
+        return codes.astype(np.float32) * self.scales[start:stop, None]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        vectors = self.decode()
+        return vectors if dtype is None else vectors.astype(dtype, copy=False)
+
+    def save(self, directory: str) -> None:
+        np.save(os.path.join(directory, VECTOR_CODES_FILE), np.ascontiguousarray(self.codes))
+        if self.scales is not None:
+            np.save(os.path.join(directory, VECTOR_SCALES_FILE), np.ascontiguousarray(self.scales))
+
+    @classmethod
+    def load(cls, directory: str) -> "CompactVectors":
+        """Memory-map the vectors saved in `directory`."""
+        codes = np.load(os.path.join(directory, VECTOR_CODES_FILE), mmap_mode="r")
+        scales = None
+        if codes.dtype == np.int8:
+            scales = np.load(os.path.join(directory, VECTOR_SCALES_FILE), mmap_mode="r")
+        return cls(codes, scales)
@@ -0,0 +1,147 @@
+"""
+Offline stand-ins for the models, shared by the tests, so none of them needs the hub.
+
+    def test_answers(qa_chain, qa_pipeline): # sample.pdf loaded on the fake models
+    def test_index(make_qa_chain): make_qa_chain(index_type="hnsw")
+
+Helpers the fixtures do not cover (the fake classes, tiny_qa_model) are imported
+from here with `from conftest import ...`.
+"""
+import time
+
+import numpy as np
+import pytest
+import torch
+from langchain_core.embeddings import Embeddings
+from transformers import BertTokenizerFast, DistilBertConfig, DistilBertForQuestionAnswering
+
+import model_registry
+from qa_chain import QAChain
+
+PDF_PATH = "sample.pdf"
+
+WORDS = (
+    "what when where how long do refunds take are issued within days of the return being "
+    "received shipping costs policy warranty covers parts and labour for two years"
+).split()
+
+CHUNKS = [
+    "Refunds are issued within 14 days of the return being received.",
+    "Shipping costs are not covered by the refund policy.",
+    "The warranty covers parts and labour for two years. " * 40,
+]
+
+
+class CountingEncoder:
+    """Stand-in for SentenceTransformer that records every text it encodes."""
+
+    def __init__(self):
+        self.encoded_texts = []
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        batch = [sentences] if single else list(sentences)
+        self.encoded_texts.extend(batch)
+        vectors = np.array([[len(s), s.count(" "), s.count("."), 1.0] for s in batch], dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+class CountingEmbeddings(Embeddings):
+    instances = 0
+
+    def __init__(self, model_name=None, **kwargs):
+        CountingEmbeddings.instances += 1
+        self.client = CountingEncoder()
+
+    def embed_documents(self, texts):
+        return self.client.encode([t.replace("\n", " ") for t in texts]).tolist()
+
+    def embed_query(self, text):
+        return self.client.encode(text.replace("\n", " ")).tolist()
+
+
+class RecordingPipeline:
+    """Stand-in for the transformers QA pipeline that answers with the question's last word."""
+
+    def __init__(self):
+        self.calls = []
+        self.inputs = []
+
+    def __call__(self, inputs, batch_size=None, **kwargs):
+        batch = inputs if isinstance(inputs, list) else [inputs]
+        self.calls.append(len(batch))
+        self.inputs.extend(batch)
+        if any("boom" in item["question"] for item in batch):
+            raise ValueError("bad input")
+        results = [{"answer": item["question"].split()[-1], "score": 1.0} for item in batch]
+        return results if isinstance(inputs, list) and len(inputs) > 1 else results[0]
+
+
+class CountingModel(torch.nn.Module):
+    """Wraps a model and records the shape of every batch it runs."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.batch_shapes = []
+
+    @property
+    def device(self):
+        return self.model.device
+
+    def forward(self, **inputs):
+        self.batch_shapes.append(tuple(inputs["input_ids"].shape))
+        return self.model(**inputs)
+
+
+def tiny_qa_model(tmp_path):
+    """A randomly initialised DistilBERT QA model with a word-level vocab, built offline."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", "?", *[str(d) for d in range(10)], *sorted(set(WORDS))]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True)
+    torch.manual_seed(0)
+    config = DistilBertConfig(
+        vocab_size=len(vocab), dim=32, n_layers=1, n_heads=2, hidden_dim=64, max_position_embeddings=512
+    )
+    return DistilBertForQuestionAnswering(config).eval(), tokenizer
+
+
+def upload_pdf(client, path=PDF_PATH):
+    """POST a PDF to the API's TestClient and wait for its ingest job to end."""
+    with open(path, "rb") as f:
+        response = client.post("/documents", files={"file": ("sample.pdf", f, "application/pdf")})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    for _ in range(600):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("ingest did not finish")
+
+
+@pytest.fixture
+def qa_pipeline(monkeypatch):
+    """Every ModelRegistry loads the fakes: CountingEmbeddings and this RecordingPipeline."""
+    pipeline = RecordingPipeline()
+    CountingEmbeddings.instances = 0
+    monkeypatch.setattr(model_registry, "load_embeddings", CountingEmbeddings)
+    monkeypatch.setattr(model_registry, "load_qa_pipeline", lambda *args, **kwargs: pipeline)
+    return pipeline
+
+
+@pytest.fixture
+def make_qa_chain(qa_pipeline):
+    """Factory for QAChains on the fake models, each with its own registry; keyword arguments go to QAChain."""
+    def make(**kwargs):
+        return QAChain(registry=model_registry.ModelRegistry(), **kwargs)
+    return make
+
+
+@pytest.fixture
+def qa_chain(make_qa_chain):
+    """A QAChain on the fake models with sample.pdf loaded."""
+    qa = make_qa_chain()
+    qa.load_document(PDF_PATH)
+    return qa
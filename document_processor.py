@@ -1,34 +1,168 @@
-import fitz  # PyMuPDF
+import threading
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+
+from chunking import TokenChunker
+from metrics import get_metrics
+from pdf_extraction import TextBlock, iter_pages_parallel, iter_pages_serial
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(
+        self,
+        embedder: Optional["SentenceTransformer"] = None,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        embed_batch_size: int = 64,
+        extract_workers: int = 1,
+        chunking: str = "characters",
+        chunk_tokens: Optional[int] = None,
+        chunk_overlap_tokens: int = 32,
+        lock: Optional[threading.Lock] = None
+    ):
         # Initialize text splitter
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
             length_function=len
         )
-        # Initialize embedding model
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        # Initialize embedding model (reuse the caller's model when one is shared with the vector store)
+        if embedder is None:
+            # Imported here: sentence-transformers pulls in torch, which is slow to import
+            from sentence_transformers import SentenceTransformer
+            embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedder = embedder
+        # Held while the embedder (or its tokenizer) runs; a shared embedder comes with the registry's lock
+        self.lock = lock or threading.Lock()
+        # "characters" splits page text with the splitter above; "tokens" packs the PDF's text
+        # blocks into chunks of at most `chunk_tokens` embedder tokens (by default as many as
+        # the embedder reads, less [CLS] and [SEP]), starting a new chunk at every heading.
+        if chunking not in ("characters", "tokens"):
+            raise ValueError(f"Unknown chunking: {chunking}")
+        self.chunking = chunking
+        self.chunk_tokens = None
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        self.chunker = None
+        if chunking == "tokens":
+            self.chunk_tokens = chunk_tokens or self.embedder.max_seq_length - 2
+            self.chunker = TokenChunker(self.embedder.tokenizer, self.chunk_tokens, chunk_overlap_tokens, lock=self.lock)
+        # Chunks are embedded in batches of this size as they come out of the splitter
+        self.embed_batch_size = embed_batch_size
+        # Processes used for PyMuPDF text extraction; 1 extracts in this process
+        self.extract_workers = extract_workers
         self.text_chunks = []
+        # 1-based page number each chunk starts on, parallel to text_chunks
+        self.chunk_pages = []
+        # Where each chunk came from: {"page"}, plus "page_end", "offset" and "section" with token chunking
+        self.chunk_locations = []
         self.embeddings = None
 
+    def iter_pages(self, pdf_path: str, layout: bool = False) -> Iterator[Union[str, list[TextBlock]]]:
+        """
+        Yield the text of each page in order (its TextBlocks with `layout`), extracting on
+        a process pool when configured.
+        """
+        if self.extract_workers > 1:
+            pages = iter_pages_parallel(pdf_path, self.extract_workers, layout=layout)
+        else:
+            pages = iter_pages_serial(pdf_path, layout)
+        return get_metrics().timed_iter(pages, "extract")
+
+    def iter_chunk_locations(self, pdf_path: str) -> Iterator[tuple[str, dict]]:
+        """Yield (chunk, location) for the whole PDF with the configured chunking."""
+        # Chunking time excludes the page extraction it pulls in, which is timed as "extract"
+        if self.chunker is not None:
+            yield from get_metrics().timed_iter(self.chunker.iter_chunks(self.iter_pages(pdf_path, layout=True)), "chunk")
+            return
+        for chunk, page in get_metrics().timed_iter(self.iter_chunks_with_pages(self.iter_pages(pdf_path)), "chunk"):
+            yield chunk, {"page": page}
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """
+        Split a stream of page texts into chunks that may span page boundaries.
+        Only the current page and the unfinished tail of the previous one are buffered.
+        """
+        for chunk, _ in self.iter_chunks_with_pages(pages):
+            yield chunk
+
+    def iter_chunks_with_pages(self, pages: Iterable[str]) -> Iterator[tuple[str, int]]:
+        """Like iter_chunks, but yields (chunk, page) where page is the 1-based page the chunk starts on."""
+        carry = ""
+        carry_page = 1
+        for page_no, page_text in enumerate(pages, start=1):
+            buffer = carry + page_text
+            chunks = self.text_splitter.split_text(buffer)
+            if not chunks:
+                carry = buffer
+                continue
+            starts = self._chunk_starts(buffer, chunks)
+            for chunk, start in zip(chunks[:-1], starts[:-1]):
+                yield chunk, carry_page if start < len(carry) else page_no
+            # The last chunk may continue on the next page, so keep its raw text
+            # (including trailing whitespace) and re-split it with the next page.
+            if starts[-1] >= len(carry):
+                carry_page = page_no
+            carry = buffer[starts[-1]:]
+        for chunk in self.text_splitter.split_text(carry):
+            yield chunk, carry_page
+
+    @staticmethod
+    def _chunk_starts(buffer: str, chunks: list[str]) -> list[int]:
+        """Offsets of each (stripped, possibly overlapping) chunk within the text it was split from."""
+        starts = []
+        cursor = 0
+        for chunk in chunks:
+            pos = buffer.find(chunk, cursor)
+            if pos == -1:
+                pos = cursor
+            starts.append(pos)
+            cursor = pos + 1
+        return starts
+
+    def _embed(self, chunks: list[str]) -> np.ndarray:
+        # Newlines are flattened the same way HuggingFaceEmbeddings.embed_documents does,
+        # so these vectors can go straight into the FAISS index.
+        metrics = get_metrics()
+        with metrics.span("embed"), self.lock:
+            vectors = self.embedder.encode(
+                [chunk.replace("\n", " ") for chunk in chunks],
+                convert_to_numpy=True
+            )
+        metrics.inc("chunks_embedded_total", len(chunks))
+        return vectors
+
+    def iter_embedded_batches(self, pdf_path: str) -> Iterator[tuple[list[str], np.ndarray, list[dict]]]:
+        """Yield (chunks, embeddings, locations) in batches of `embed_batch_size` while the PDF is being read."""
+        batch = []
+        batch_locations = []
+        for chunk, location in self.iter_chunk_locations(pdf_path):
+            batch.append(chunk)
+            batch_locations.append(location)
+            if len(batch) == self.embed_batch_size:
+                yield batch, self._embed(batch), batch_locations
+                batch = []
+                batch_locations = []
+        if batch:
+            yield batch, self._embed(batch), batch_locations
+
     def process_pdf(self, pdf_path: str) -> tuple[int, list[str], np.ndarray]:
         """Extract text from PDF and generate embeddings."""
-        # Extract text from PDF
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-
-        # Split text into chunks
-        self.text_chunks = self.text_splitter.split_text(text)
-
-        # Generate embeddings
-        self.embeddings = self.embedder.encode(self.text_chunks, convert_to_numpy=True)
+        self.text_chunks = []
+        self.chunk_pages = []
+        self.chunk_locations = []
+        vectors = []
+        for chunks, embeddings, locations in self.iter_embedded_batches(pdf_path):
+            self.text_chunks.extend(chunks)
+            self.chunk_pages.extend(location["page"] for location in locations)
+            self.chunk_locations.extend(locations)
+            vectors.append(embeddings)
+
+        self.embeddings = np.vstack(vectors) if vectors else self._embed([])
 
         return len(self.text_chunks), self.text_chunks, self.embeddings
\ No newline at end of file
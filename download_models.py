@@ -0,0 +1,34 @@
+"""
+Download every model into a local directory, so a container can load them
+without contacting the Hugging Face hub:
+
+    python download_models.py /app/models
+    PDF_QA_MODEL_DIR=/app/models HF_HUB_OFFLINE=1 streamlit run app.py
+
+Only the PyTorch weights are fetched; the onnx backend exports its models from them.
+"""
+import argparse
+
+from huggingface_hub import snapshot_download
+
+from inference_backends import hub_name
+from model_registry import ALL_MODELS, local_model_path
+
+# Weights for other frameworks, which none of the backends read
+SKIPPED_FILES = ["*.h5", "*.msgpack", "*.ot", "tf_model*", "flax_model*", "rust_model*", "onnx/*", "openvino/*"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_dir")
+    parser.add_argument("--models", nargs="+", default=list(ALL_MODELS))
+    args = parser.parse_args()
+
+    for model_name in args.models:
+        path = local_model_path(args.model_dir, model_name)
+        snapshot_download(repo_id=hub_name(model_name), local_dir=path, ignore_patterns=SKIPPED_FILES)
+        print(f"{model_name} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
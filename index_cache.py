@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from compact_storage import ChunkTexts, CompactVectors
+from vector_index import ChunkDocstore
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_qa_chatbot", "index")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Bump when the layout of an entry changes so old entries are never read back
+INDEX_FORMAT_VERSION = 4
+
+META_FILE = "meta.json"
+FAISS_FILE = "index.faiss"
+
+
+@dataclass
+class CachedIndex:
+    key: str
+    chunks: ChunkTexts # memory-mapped
+    locations: List[dict] # per chunk, as yielded by DocumentProcessor.iter_chunk_locations
+    embeddings: CompactVectors # memory-mapped
+    vector_store: FAISS
+    source: str = "" # document name it was stored under
+
+
+class IndexCache:
+    """
+    On-disk cache of processed documents, keyed by the SHA-256 of the PDF bytes
+    plus the chunking and model settings. Each entry holds the chunk texts and
+    embeddings in the compact_storage layout (memory-mapped on load, so processes
+    sharing the cache directory share their pages), the chunk locations and the
+    FAISS index. The least recently used entries are evicted once the cache
+    exceeds `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(pdf_path: str, settings: Dict[str, Any]) -> str:
+        """Hash the PDF contents together with the settings that shape its index."""
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        digest.update(json.dumps({**settings, "format": INDEX_FORMAT_VERSION}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str, embeddings: Any) -> Optional[CachedIndex]:
+        """Return the cached index for `key`, or None on a miss."""
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, META_FILE), encoding="utf-8") as f:
+                entry = json.load(f)
+            chunks = ChunkTexts.load(entry_dir)
+            vectors = CompactVectors.load(entry_dir)
+            docstore = ChunkDocstore()
+            if len(chunks):
+                docstore.add_chunks(entry["doc_id"], entry["source"], 0, chunks, entry["locations"])
+            vector_store = FAISS(
+                embeddings,
+                faiss.read_index(os.path.join(entry_dir, FAISS_FILE)),
+                docstore,
+                dict(zip(entry["labels"], entry["ids"]))
+            )
+            # Touch the entry so eviction sees it as recently used
+            os.utime(entry_dir)
+        except (OSError, ValueError, KeyError, RuntimeError):
+            # Also when another process sharing the directory evicted the entry meanwhile
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return CachedIndex(
+            key=key,
+            chunks=chunks,
+            locations=entry["locations"],
+            embeddings=vectors,
+            vector_store=vector_store,
+            source=entry["source"]
+        )
+
+    def store(
+        self,
+        key: str,
+        chunks: Sequence[str],
+        embeddings: Union[np.ndarray, CompactVectors],
+        vector_store: FAISS,
+        locations: Optional[List[dict]] = None,
+        source: str = ""
+    ) -> Tuple[ChunkTexts, CompactVectors]:
+        """
+        Write an entry atomically, then evict old entries if over the size cap. `vector_store`
+        holds this one document. Returns the chunks and embeddings memory-mapped from the entry,
+        for the caller to hold instead of its own copies. Plain arrays are stored as float32.
+        """
+        entry_dir = self._entry_dir(key)
+        if not isinstance(chunks, ChunkTexts):
+            chunks = ChunkTexts.from_texts(chunks)
+        if not isinstance(embeddings, CompactVectors):
+            embeddings = CompactVectors.encode(embeddings)
+        labels, ids = zip(*sorted(vector_store.index_to_docstore_id.items())) if len(chunks) else ((), ())
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.cache_dir)
+        try:
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "doc_id": ids[0].rpartition(":")[0] if ids else "",
+                    "source": source,
+                    "locations": locations or [],
+                    "labels": list(labels),
+                    "ids": list(ids),
+                }, f)
+            chunks.save(tmp_dir)
+            embeddings.save(tmp_dir)
+            faiss.write_index(vector_store.index, os.path.join(tmp_dir, FAISS_FILE))
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another process may have stored the same document first; keep theirs
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                raise
+        self._evict(keep=key)
+        try:
+            # Pages mapped here stay valid even if another process evicts the entry later
+            return ChunkTexts.load(entry_dir), CompactVectors.load(entry_dir)
+        except OSError:
+            # ...or already has; keep serving the caller's own copies
+            return chunks, embeddings
+
+    def invalidate(self, key: str) -> None:
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _entries(self) -> List[tuple]:
+        """(last_used, size_bytes, key) for every complete entry."""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = self._entry_dir(key)
+            if key.startswith(".") or not os.path.isdir(entry_dir):
+                continue
+            try:
+                size = 0
+                for root, _, files in os.walk(entry_dir):
+                    size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+                entries.append((os.path.getmtime(entry_dir), size, key))
+            except OSError:
+                # Evicted by another process sharing the directory while it was being measured
+                continue
+        return entries
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                total -= size
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+
+_default_cache: Optional[IndexCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_index_cache() -> IndexCache:
+    """Process-wide cache configured from PDF_QA_CACHE_DIR and PDF_QA_CACHE_MAX_MB."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                max_mb = os.environ.get("PDF_QA_CACHE_MAX_MB")
+                _default_cache = IndexCache(
+                    cache_dir=os.environ.get("PDF_QA_CACHE_DIR", DEFAULT_CACHE_DIR),
+                    max_bytes=int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES
+                )
+    return _default_cache
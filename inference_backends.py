@@ -0,0 +1,189 @@
+"""
+Inference backends for the QA reader and the sentence embedder.
+
+    torch       full-precision PyTorch (the default)
+    torch-int8  PyTorch with dynamic int8 quantization of every nn.Linear (CPU only)
+    onnx        model exported to ONNX and run with onnxruntime, via optimum
+
+Every backend returns objects with the same interface as the torch ones: a
+transformers question-answering pipeline, a LangChain Embeddings whose
+`.client` has a SentenceTransformer-style `encode`, a (model, tokenizer) pair for
+the generative reader whose model has transformers' `generate`, and a (model,
+tokenizer) pair for the re-ranker whose model returns classification `logits`.
+
+torch, transformers and sentence-transformers are imported by the loaders, not
+at module level: together they take seconds to import, which would otherwise
+be paid on every process start before anything needs a model.
+"""
+from typing import TYPE_CHECKING, Any, List, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+if TYPE_CHECKING:
+    import torch
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+def check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    return backend
+
+
+def quantize_int8(model: "torch.nn.Module") -> "torch.nn.Module":
+    """Dynamic int8 quantization of the Linear layers, which hold almost all transformer weights."""
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _require_optimum():
+    try:
+        from optimum import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "The 'onnx' backend needs optimum with onnxruntime: pip install 'optimum[onnxruntime]'"
+        ) from e
+    return onnxruntime
+
+
+def hub_name(model_name: str) -> str:
+    # SentenceTransformer resolves bare names under the sentence-transformers org; optimum does not
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def load_qa_pipeline(model_name: str, backend: str = "torch") -> Any:
+    check_backend(backend)
+    import torch
+    from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline
+
+    if backend == "torch":
+        return pipeline(
+            "question-answering",
+            model=model_name,
+            tokenizer=model_name,
+            device=0 if torch.cuda.is_available() else -1
+        )
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "torch-int8":
+        model = quantize_int8(AutoModelForQuestionAnswering.from_pretrained(model_name).eval())
+    else:
+        model = _require_optimum().ORTModelForQuestionAnswering.from_pretrained(model_name, export=True)
+    # Quantized and ONNX models run on CPU
+    return pipeline("question-answering", model=model, tokenizer=tokenizer, device=-1)
+
+
+def load_generator(model_name: str, backend: str = "torch") -> tuple[Any, Any]:
+    """(model, tokenizer) of a seq2seq or causal LM for GenerativeReader."""
+    check_backend(backend)
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    seq2seq = AutoConfig.from_pretrained(model_name).is_encoder_decoder
+    if backend == "onnx":
+        onnxruntime = _require_optimum()
+        model_class = onnxruntime.ORTModelForSeq2SeqLM if seq2seq else onnxruntime.ORTModelForCausalLM
+        return model_class.from_pretrained(model_name, export=True, use_cache=True), tokenizer
+
+    model = (AutoModelForSeq2SeqLM if seq2seq else AutoModelForCausalLM).from_pretrained(model_name).eval()
+    if backend == "torch-int8":
+        model = quantize_int8(model)
+    elif torch.cuda.is_available():
+        model = model.to("cuda")
+    return model, tokenizer
+
+
+def load_cross_encoder(model_name: str, backend: str = "torch") -> tuple[Any, Any]:
+    """(model, tokenizer) of a sequence-classification cross-encoder for the Reranker."""
+    check_backend(backend)
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "onnx":
+        return _require_optimum().ORTModelForSequenceClassification.from_pretrained(model_name, export=True), tokenizer
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    if backend == "torch-int8":
+        model = quantize_int8(model)
+    elif torch.cuda.is_available():
+        model = model.to("cuda")
+    return model, tokenizer
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer-compatible `encode` for an ONNX export of a mean-pooling
+    sentence model such as all-MiniLM-L6-v2.
+    """
+
+    def __init__(self, model_name: str, max_seq_length: int = 256, normalize: bool = True):
+        from transformers import AutoTokenizer
+
+        onnxruntime = _require_optimum()
+        source = hub_name(model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(source)
+        self.model = onnxruntime.ORTModelForFeatureExtraction.from_pretrained(source, export=True)
+        self.max_seq_length = max_seq_length
+        self.normalize = normalize
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        **kwargs: Any
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            hidden = self.model(**encoded).last_hidden_state
+            hidden = hidden.numpy() if hasattr(hidden, "numpy") else np.asarray(hidden)
+            # Mean pooling over real tokens, as in the sentence-transformers Pooling layer
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+
+        vectors = np.vstack(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+class EncoderEmbeddings(Embeddings):
+    """LangChain Embeddings over any object with a SentenceTransformer-style `encode`."""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Same newline handling as HuggingFaceEmbeddings, so vectors match the torch backend
+        return self.client.encode([text.replace("\n", " ") for text in texts]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings(model_name: str, backend: str = "torch") -> Embeddings:
+    check_backend(backend)
+    if backend == "onnx":
+        return EncoderEmbeddings(OnnxSentenceEncoder(model_name))
+
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    if backend == "torch-int8":
+        embeddings.client = quantize_int8(embeddings.client.to("cpu").eval())
+    return embeddings
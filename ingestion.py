@@ -0,0 +1,122 @@
+"""
+Background ingestion of PDFs on a worker pool shared by every session, so that
+reading and embedding a large document never blocks the Streamlit script thread.
+Chunks become searchable as they are indexed (see QAChain.add_document).
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from qa_chain import DocumentRemoved, QAChain
+
+
+class IngestCancelled(Exception):
+    """Raised inside the worker to stop a job whose ingest was cancelled."""
+
+
+@dataclass
+class IngestJob:
+    """Progress of one PDF being ingested; updated from the worker thread."""
+    name: str
+    status: str = "queued" # queued -> running -> done | failed | cancelled
+    pages_done: int = 0
+    pages_total: int = 0
+    chunks_done: int = 0
+    doc_id: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancelled: bool = False
+    future: Optional[Future] = field(default=None, repr=False)
+    # Set by runners that do not call _update in this process (worker_pool), to pass the cancel on
+    on_cancel: Optional[Callable[[], None]] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self) -> None:
+        """Stop the ingest at its next batch; the chunks indexed so far are removed again."""
+        self.cancelled = True
+        if self.on_cancel is not None:
+            self.on_cancel()
+
+    @property
+    def fraction(self) -> float:
+        """Share of pages read so far, between 0 and 1."""
+        if self.status == "done":
+            return 1.0
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+
+    def _update(self, progress: dict) -> None:
+        if self.cancelled:
+            raise IngestCancelled()
+        self.pages_done = progress["pages_done"]
+        self.pages_total = progress["pages_total"]
+        self.chunks_done = progress["chunks_done"]
+
+
+def _run(job: IngestJob, qa_chain: QAChain, pdf_path: str, replace: bool, remove_file: bool) -> None:
+    job.started_at = time.perf_counter()
+    try:
+        if job.cancelled:
+            raise IngestCancelled()
+        job.status = "running"
+        if replace:
+            qa_chain.clear()
+        job.doc_id = qa_chain.add_document(pdf_path, name=job.name, progress=job._update)
+        job.status = "done"
+    except (IngestCancelled, DocumentRemoved):
+        job.status = "cancelled"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.perf_counter()
+        if remove_file and os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+
+class IngestPool:
+    """Bounded thread pool that runs ingest jobs; extra jobs wait in its queue."""
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+
+    def submit(
+        self,
+        qa_chain: QAChain,
+        pdf_path: str,
+        name: Optional[str] = None,
+        replace: bool = True,
+        remove_file: bool = False
+    ) -> IngestJob:
+        """
+        Start ingesting `pdf_path` into `qa_chain` and return its job straight away.
+        With `replace`, the PDF replaces the chain's corpus (like load_document);
+        with `remove_file`, the PDF is deleted once it has been read.
+        """
+        job = IngestJob(name=name or os.path.basename(pdf_path))
+        job.future = self._executor.submit(_run, job, qa_chain, pdf_path, replace, remove_file)
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_default_pool: Optional[IngestPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_ingest_pool() -> IngestPool:
+    """Pool shared by the whole process; PDF_QA_INGEST_WORKERS sets its size (default 2)."""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = IngestPool(workers=int(os.environ.get("PDF_QA_INGEST_WORKERS", 2)))
+    return _default_pool
@@ -0,0 +1,321 @@
+"""
+Low-overhead instrumentation: stage timers, counters, Prometheus text export,
+structured request logs and an optional cProfile dump per request.
+
+    metrics = get_metrics()
+    with metrics.trace("ask_questions", questions=3): # one request
+        with metrics.span("search"): # one stage of it
+            ...
+    metrics.inc("chunks_total", 64)
+
+Stage times are exclusive: a span's time does not include the spans nested in
+it, so the stages of a request add up to its total. Recording a span costs a
+couple of microseconds, next to stages that take milliseconds. When a trace
+ends it is logged as one JSON line on the "pdf_qa" logger at INFO, if that
+level is enabled.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("pdf_qa")
+
+METRIC_PREFIX = "pdf_qa_"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Trace:
+    """One request: its stage times (exclusive, in seconds) plus fields for the log line."""
+
+    def __init__(self, name: str, fields: dict):
+        self.name = name
+        self.fields = fields
+        self.stages: Dict[str, float] = {}
+
+    def set(self, **fields) -> None:
+        self.fields.update(fields)
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "start", "child")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.child = 0.0
+        self.metrics._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.start
+        stack = self.metrics._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        own = elapsed - self.child
+        self.metrics.observe("stage_seconds", own, stage=self.stage)
+        trace = getattr(self.metrics._local, "trace", None)
+        if trace is not None:
+            trace.stages[self.stage] = trace.stages.get(self.stage, 0.0) + own
+        if exc_type is not None:
+            self.metrics.inc("errors_total", stage=self.stage)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Metrics:
+    """
+    Thread-safe counters and latency histograms. With `enabled` False every call is a
+    no-op. With `profile_dir` set, each top-level trace runs under cProfile and its
+    stats are written there as <name>-<ms since epoch>-<thread>.prof.
+    """
+
+    def __init__(self, enabled: bool = True, profile_dir: Optional[str] = None, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.buckets = tuple(buckets)
+        self._counters: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, _Histogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[bucket] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def span(self, stage: str):
+        """Context manager timing one stage."""
+        return _Span(self, stage) if self.enabled else _NO_SPAN
+
+    def timed_iter(self, items: Iterable, stage: str) -> Iterator:
+        """Yield from `items`, timing only the work of producing each item as `stage`."""
+        if not self.enabled:
+            yield from items
+            return
+        iterator = iter(items)
+        while True:
+            with _Span(self, stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    @contextmanager
+    def trace(self, name: str, **fields) -> Iterator[Optional[Trace]]:
+        """
+        Context manager for one request. Inside another trace it only times a span and
+        yields the outer trace, so a request calling another is logged once.
+        """
+        if not self.enabled:
+            yield None
+            return
+        outer = getattr(self._local, "trace", None)
+        if outer is not None:
+            with _Span(self, name):
+                yield outer
+            return
+
+        trace = self._local.trace = Trace(name, fields)
+        profiler = self._start_profiler()
+        start = time.perf_counter()
+        failed = False
+        try:
+            with _Span(self, name):
+                yield trace
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.trace = None
+            if profiler is not None:
+                profiler.disable()
+                path = os.path.join(self.profile_dir, f"{name}-{int(time.time() * 1000)}-{threading.get_ident()}.prof")
+                profiler.dump_stats(path)
+            self.observe("request_seconds", elapsed, request=name)
+            self.inc("requests_total", request=name)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({
+                    "event": name,
+                    "ms": round(elapsed * 1000, 3),
+                    "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in trace.stages.items()},
+                    "failed": failed,
+                    **trace.fields,
+                }, default=str))
+
+    def annotate(self, **fields) -> None:
+        """Add fields to the log line of the current thread's trace, if there is one."""
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.set(**fields)
+
+    def _start_profiler(self) -> Optional[cProfile.Profile]:
+        if not self.profile_dir:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError: # another profiler is already running in this thread
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        return profiler
+
+    def snapshot(self) -> dict:
+        """{"counters": {(name, labels): value}, "histograms": {(name, labels): (count, sum)}}."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {key: (h.count, h.sum) for key, h in self._histograms.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def export(self) -> dict:
+        """Like snapshot, with the bucket counts; picklable, for merge in another process."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()},
+            }
+
+    def merge(self, state: dict) -> None:
+        """Add another Metrics' export() (with the same buckets), e.g. a worker process's, to this one."""
+        with self._lock:
+            for key, value in state["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, (counts, total, count) in state["histograms"].items():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = _Histogram(len(self.buckets) + 1)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+
+    def render_prometheus(self, extra_counters: Optional[Dict[tuple, float]] = None) -> str:
+        """
+        Every metric in the Prometheus text format. `extra_counters` maps (name, labels)
+        to a value for counts kept elsewhere, e.g. the caches' own hit counters.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+        counters.update(extra_counters or {})
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{METRIC_PREFIX}{name}{_labels(labels)} {_number(value)}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def traced(name: str) -> Callable:
+    """Decorator running every call of a function as a trace named `name`."""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().trace(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+_default_metrics: Optional[Metrics] = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """
+    The process-wide Metrics. PDF_QA_METRICS=0 turns instrumentation off;
+    PDF_QA_PROFILE_DIR writes a cProfile dump of every request to that directory.
+    """
+    global _default_metrics
+    if _default_metrics is None:
+        with _default_metrics_lock:
+            if _default_metrics is None:
+                _default_metrics = Metrics(
+                    enabled=os.environ.get("PDF_QA_METRICS", "1") != "0",
+                    profile_dir=os.environ.get("PDF_QA_PROFILE_DIR") or None
+                )
+    return _default_metrics
@@ -0,0 +1,177 @@
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from inference_backends import check_backend, load_cross_encoder, load_embeddings, load_generator, load_qa_pipeline
+from query_cache import LRUCache, SemanticCache
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+QA_MODEL = "distilbert-base-cased-distilled-squad"
+GENERATIVE_MODEL = "google/flan-t5-small"
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Every model a QAChain may load, in the order download_models.py fetches them
+ALL_MODELS = (EMBEDDING_MODEL, QA_MODEL, GENERATIVE_MODEL, RERANK_MODEL)
+
+
+def local_model_path(model_dir: str, model_name: str) -> str:
+    """Where a model is kept under a local model directory: <model_dir>/<org>--<name>."""
+    return os.path.join(model_dir, model_name.replace("/", "--"))
+
+
+class ModelRegistry:
+    """
+    Process-wide store of loaded models.
+    Each model is loaded once, on first request, and the same instance is handed
+    to every QAChain so that concurrent Streamlit sessions share weights. Callers run
+    a shared model only while holding its `inference_lock`.
+    `backend` picks how models run: "torch", "torch-int8" or "onnx" (see inference_backends).
+    With `model_dir` set, models are read from that directory (as laid out by
+    download_models.py) instead of being looked up on the Hugging Face hub.
+
+    The registry also owns the caches of model outputs that every QAChain shares:
+    question embeddings, re-ranker scores per (question, chunk) pair, and answers
+    keyed by corpus content and question.
+    With `semantic_threshold` set, answers are also found for paraphrases whose
+    embedding has at least that cosine similarity to a cached question.
+    """
+
+    def __init__(
+        self,
+        backend: str = "torch",
+        embedding_cache_size: int = 4096,
+        answer_cache_size: int = 1024,
+        answer_ttl: Optional[float] = 3600,
+        semantic_threshold: Optional[float] = None,
+        semantic_cache_size: int = 256,
+        rerank_cache_size: int = 16384,
+        model_dir: Optional[str] = None
+    ):
+        self.backend = check_backend(backend)
+        self.model_dir = model_dir
+        self.embedding_cache = LRUCache(maxsize=embedding_cache_size)
+        self.answer_cache = LRUCache(maxsize=answer_cache_size, ttl=answer_ttl)
+        self.rerank_cache = LRUCache(maxsize=rerank_cache_size)
+        self.semantic_threshold = semantic_threshold
+        self.semantic_cache_size = semantic_cache_size
+        # One SemanticCache per corpus and reader configuration; the least recently used corpora are dropped
+        self.semantic_caches = LRUCache(maxsize=64)
+        self._lock = threading.Lock()
+        self._models: Dict[str, Any] = {}
+        # One lock per model so loading DistilBERT does not block a MiniLM lookup
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # One lock per loaded model (by identity), held while it runs
+        self._inference_locks: Dict[int, threading.Lock] = {}
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the model stored under `key`, calling `loader` only if it is not loaded yet."""
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we were waiting
+            model = self._models.get(key)
+            if model is None:
+                model = loader()
+                self._models[key] = model
+        return model
+
+    def inference_lock(self, model: Any) -> threading.Lock:
+        """
+        The lock to hold while running `model`, as returned by one of the get_* methods.
+        Fast tokenizers are not thread-safe ("Already borrowed"), so every component
+        sharing a model takes turns on this lock; different models still run in parallel.
+        """
+        with self._lock:
+            return self._inference_locks.setdefault(id(model), threading.Lock())
+
+    def model_path(self, model_name: str) -> str:
+        """What the loaders are given for `model_name`: its local directory, or the hub name."""
+        if self.model_dir is None:
+            return model_name
+        path = local_model_path(self.model_dir, model_name)
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Model {model_name} not found in {self.model_dir}; run: python download_models.py {self.model_dir}")
+        return path
+
+    def get_embeddings(self, model_name: str = EMBEDDING_MODEL) -> Embeddings:
+        return self.get(
+            f"embeddings:{self.backend}:{model_name}",
+            lambda: load_embeddings(self.model_path(model_name), backend=self.backend)
+        )
+
+    def get_qa_pipeline(self, model_name: str = QA_MODEL) -> Any:
+        return self.get(
+            f"qa_pipeline:{self.backend}:{model_name}",
+            lambda: load_qa_pipeline(self.model_path(model_name), backend=self.backend)
+        )
+
+    def get_generator(self, model_name: str = GENERATIVE_MODEL) -> tuple[Any, Any]:
+        """(model, tokenizer) for the generative reader."""
+        return self.get(
+            f"generator:{self.backend}:{model_name}",
+            lambda: load_generator(self.model_path(model_name), backend=self.backend)
+        )
+
+    def get_cross_encoder(self, model_name: str = RERANK_MODEL) -> tuple[Any, Any]:
+        """(model, tokenizer) for the re-ranker."""
+        return self.get(
+            f"cross_encoder:{self.backend}:{model_name}",
+            lambda: load_cross_encoder(self.model_path(model_name), backend=self.backend)
+        )
+
+    def loaded_models(self) -> List[str]:
+        return sorted(self._models)
+
+    def get_semantic_cache(self, scope: tuple, dim: int) -> Optional[SemanticCache]:
+        """The paraphrase cache for `scope` (created on first use), or None when disabled."""
+        if self.semantic_threshold is None:
+            return None
+        with self._lock:
+            cache = self.semantic_caches.get(scope)
+            if cache is None:
+                cache = SemanticCache(dim, threshold=self.semantic_threshold, maxsize=self.semantic_cache_size)
+                self.semantic_caches.put(scope, cache)
+            return cache
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._load_locks.clear()
+            self._inference_locks.clear()
+        self.embedding_cache.clear()
+        self.answer_cache.clear()
+        self.rerank_cache.clear()
+        self.semantic_caches.clear()
+
+
+_default_registry: Optional[ModelRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Return the registry shared by the whole process. PDF_QA_BACKEND selects its backend;
+    PDF_QA_ANSWER_CACHE_SIZE and PDF_QA_ANSWER_TTL (seconds) size the answer cache, and
+    PDF_QA_SEMANTIC_THRESHOLD (a cosine similarity, e.g. 0.9) turns on the paraphrase cache.
+    PDF_QA_MODEL_DIR loads the models from a local directory (see download_models.py).
+    """
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry(
+                    backend=os.environ.get("PDF_QA_BACKEND", "torch"),
+                    answer_cache_size=int(os.environ.get("PDF_QA_ANSWER_CACHE_SIZE", 1024)),
+                    answer_ttl=float(os.environ.get("PDF_QA_ANSWER_TTL", 3600)),
+                    semantic_threshold=(
+                        float(os.environ["PDF_QA_SEMANTIC_THRESHOLD"]) if os.environ.get("PDF_QA_SEMANTIC_THRESHOLD") else None
+                    ),
+                    model_dir=os.environ.get("PDF_QA_MODEL_DIR") or None
+                )
+    return _default_registry
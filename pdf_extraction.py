@@ -0,0 +1,110 @@
+"""
+Page text extraction for DocumentProcessor.
+Kept free of model imports so process-pool workers start quickly.
+"""
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Union
+
+import fitz  # PyMuPDF
+
+# A heading is a short block set noticeably larger than the page's body text, or in bold when the body is not
+HEADING_SIZE_RATIO = 1.15
+HEADING_MAX_CHARS = 120
+_BOLD = 16 # fitz span flag
+
+
+class TextBlock(NamedTuple):
+    text: str
+    heading: bool
+
+
+def page_blocks(page: "fitz.Page") -> List[TextBlock]:
+    """The text blocks of a page in PyMuPDF's reading order, with headings marked."""
+    blocks = []
+    body_sizes = Counter()
+    body_bold = Counter()
+    for block in page.get_text("dict")["blocks"]:
+        if block.get("type") != 0: # image block
+            continue
+        spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+        text = "\n".join("".join(span["text"] for span in line["spans"]) for line in block["lines"]).strip()
+        if not spans or not text:
+            continue
+        for span in spans:
+            body_sizes[round(span["size"], 1)] += len(span["text"])
+            body_bold[bool(span["flags"] & _BOLD)] += len(span["text"])
+        blocks.append((text, max(span["size"] for span in spans), all(span["flags"] & _BOLD for span in spans)))
+    if not blocks:
+        return []
+
+    # Body text is whatever size and weight cover the most characters on the page
+    body_size = body_sizes.most_common(1)[0][0]
+    body_is_bold = body_bold.most_common(1)[0][0]
+    return [
+        TextBlock(
+            text,
+            len(text) <= HEADING_MAX_CHARS and (size >= body_size * HEADING_SIZE_RATIO or (bold and not body_is_bold))
+        )
+        for text, size, bold in blocks
+    ]
+
+
+def _page_content(page: "fitz.Page", layout: bool) -> Union[str, List[TextBlock]]:
+    return page_blocks(page) if layout else page.get_text()
+
+
+def page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def iter_pages_serial(pdf_path: str, layout: bool = False) -> Iterator[Union[str, List[TextBlock]]]:
+    """
+    Yield the text of each page, keeping only one page in memory at a time.
+    With `layout`, each page is its list of TextBlocks instead.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        for page in doc:
+            yield _page_content(page, layout)
+    finally:
+        doc.close()
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int, layout: bool = False) -> list:
+    """Worker entry point: open the PDF independently and extract pages [start, stop)."""
+    with fitz.open(pdf_path) as doc:
+        return [_page_content(doc[page_no], layout) for page_no in range(start, stop)]
+
+
+def iter_pages_parallel(
+    pdf_path: str,
+    workers: int,
+    pages_per_task: int = 0,
+    layout: bool = False
+) -> Iterator[Union[str, List[TextBlock]]]:
+    """
+    Extract pages on a pool of `workers` processes and yield them in page order.
+    The page range is cut into tasks of `pages_per_task` pages (by default about four
+    tasks per worker) and only `2 * workers` tasks are in flight at once, so
+    memory stays bounded when the consumer is slower than extraction.
+    """
+    total = page_count(pdf_path)
+    if workers <= 1 or total < 2 * workers:
+        yield from iter_pages_serial(pdf_path, layout)
+        return
+
+    if pages_per_task <= 0:
+        pages_per_task = max(1, -(-total // (workers * 4)))
+    ranges = deque((start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task))
+
+    # "spawn" keeps workers from inheriting torch/tokenizer thread state from the parent
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        while ranges or pending:
+            while ranges and len(pending) < 2 * workers:
+                start, stop = ranges.popleft()
+                pending.append(pool.submit(extract_page_range, pdf_path, start, stop, layout))
+            yield from pending.popleft().result()
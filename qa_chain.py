@@ -1,31 +1,146 @@
-import torch
-from typing import Any, List, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import faiss
+import numpy as np
 
 # LangChain components
 from langchain.chains import RetrievalQA
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_core.language_models.llms import BaseLLM
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.callbacks import CallbackManagerForLLMRun
 from langchain_core.outputs import LLMResult, Generation # Ensure these are imported
 
-# Hugging Face transformers pipeline
-from transformers import pipeline
-
 # Local modules
+from compact_storage import VECTOR_DTYPES, ChunkTexts, CompactVectors
 from document_processor import DocumentProcessor
+from index_cache import CachedIndex, IndexCache
+from metrics import get_metrics, traced
+from model_registry import EMBEDDING_MODEL, RERANK_MODEL, ModelRegistry, get_registry
+from pdf_extraction import page_count
+from query_cache import normalize_question
+from sparse_index import BM25Index, reciprocal_rank_fusion
+from vector_index import INDEX_TYPES, ChunkDocstore, add_to_store, build_index, empty_copy, needs_training, remove_from_store, search_params, supports_removal
+
+# Start of the answer given for an input the pipeline failed on; such answers are not cached
+PIPELINE_ERROR_PREFIX = "An internal error occurred"
+
+
+class DocumentRemoved(Exception):
+    """Raised by add_document when its document is removed (or the corpus cleared) mid-ingest."""
+
+
+logger = logging.getLogger("pdf_qa.qa_chain")
 
 # --- CustomHuggingFacePipeline (LLM Wrapper) ---
 class CustomHuggingFacePipeline(BaseLLM):
     pipeline: Any
+    batch_size: int = 8
+    # Held while the pipeline runs; pass the registry's inference_lock when the pipeline is shared
+    lock: Any = None
 
-    def __init__(self, pipeline: Any, **kwargs: Any):
-        super().__init__(pipeline=pipeline, **kwargs)
+    def __init__(self, pipeline: Any, lock: Optional[threading.Lock] = None, **kwargs: Any):
+        super().__init__(pipeline=pipeline, lock=lock or threading.Lock(), **kwargs)
 
     @property
     def _llm_type(self) -> str:
         return "custom_huggingface_pipeline"
 
+    def _parse_prompt(self, prompt_str: str) -> tuple[str, str]:
+        """Split LangChain's standard QA prompt into (question, context)."""
+        question = ""
+        context = ""
+
+        # --- Refined Prompt Parsing Logic ---
+        # Look for the "Question:" marker. Everything before it is context.
+        # Everything after it (and before "Helpful Answer:") is the question.
+        try:
+            # Split the prompt by "Question:"
+            parts = prompt_str.split("Question:", 1)
+            if len(parts) > 1:
+                context_part = parts[0].strip()
+                question_and_answer_part = parts[1].strip()
+
+                # Extract the question (before "Helpful Answer:")
+                q_parts = question_and_answer_part.split("Helpful Answer:", 1)
+                if len(q_parts) > 0: # Question should be the first part
+                    question = q_parts[0].strip()
+                
+                # Clean up the context part: remove the initial instruction and "context:" label
+                # Example: "Use the following pieces of context to answer the question at the end.\ncontext:\n..."
+                # Or: "context:\n..."
+                if context_part.startswith("Use the following pieces of context to answer the question at the end."):
+                    context = context_part[len("Use the following pieces of context to answer the question at the end."):].replace("context:", "").strip()
+                elif context_part.startswith("context:"):
+                     context = context_part[len("context:"):].strip()
+                else:
+                    # Fallback if no specific instruction or "context:" prefix is found
+                    context = context_part.strip()
+            else:
+                # If "Question:" not found, assume the entire prompt is a simple question
+                question = prompt_str.strip()
+                context = "" # No explicit context found
+            
+            # Further refine context: remove "Document(page_content=" if present from LangChain
+            # Sometimes LangChain might put Document objects string representation directly.
+            if context.startswith("Document(page_content='"):
+                context = context[len("Document(page_content='"):].rsplit("')", 1)[0] # Remove prefix and suffix
+
+        except Exception as e:
+            # Log or print a warning, but still attempt to answer
+            logger.warning("Complex prompt parsing failed: %s. Attempting fallback.", e)
+            question = prompt_str.split("Question:", 1)[-1].split("Helpful Answer:", 1)[0].strip() if "Question:" in prompt_str else prompt_str
+            context = prompt_str.split("Question:", 1)[0].replace("Use the following pieces of context to answer the question at the end.", "").replace("context:", "").strip() if "Question:" in prompt_str else ""
+
+        if not question:
+            logger.warning("Extracted question is empty from prompt: %s...", prompt_str[:100])
+        return question, context
+
+    def answer_batch(self, qa_inputs: List[dict]) -> List[str]:
+        """
+        Answer a list of {"question", "context"} dicts, sending them to the
+        transformers pipeline as one batch. The returned answers line up with the inputs.
+        """
+        answers: List[Optional[str]] = [None] * len(qa_inputs)
+        to_run = []
+        for i, qa_input in enumerate(qa_inputs):
+            # Ensure context and question are not empty or just whitespace
+            if not qa_input.get("question"):
+                answers[i] = "I couldn't identify a clear question to answer."
+            else:
+                # Ensure context is a string, even if empty
+                to_run.append((i, {"question": qa_input["question"], "context": qa_input.get("context") or ""}))
+
+        if not to_run:
+            return answers
+
+        with self.lock:
+            try:
+                results = self.pipeline([qa_input for _, qa_input in to_run], batch_size=self.batch_size)
+                # The pipeline returns a bare dict for a single input
+                if isinstance(results, dict):
+                    results = [results]
+                for (i, _), result in zip(to_run, results):
+                    answers[i] = result["answer"]
+            except Exception as batch_error:
+                # One bad input fails the whole batch; rerun one by one so each error maps to its own prompt
+                logger.warning("Batched pipeline inference failed (%s). Retrying inputs individually.", batch_error)
+                for i, qa_input in to_run:
+                    try:
+                        answers[i] = self.pipeline(qa_input)["answer"]
+                    except Exception as e:
+                        logger.error("Error during Hugging Face pipeline inference: %s", e)
+                        get_metrics().inc("errors_total", stage="pipeline")
+                        answers[i] = f"{PIPELINE_ERROR_PREFIX}: {e}. Could not generate answer."
+        return answers
+
     def _generate(
         self,
         prompts: List[str],
@@ -35,72 +150,15 @@ class CustomHuggingFacePipeline(BaseLLM):
     ) -> LLMResult:
         """
         Generates responses using the Hugging Face pipeline.
-        Parses LangChain's standard QA prompt to extract question and context.
+        Parses LangChain's standard QA prompt to extract question and context,
+        then answers all prompts in one batched pipeline call.
         """
-        list_of_generations = []
-
+        qa_inputs = []
         for prompt_str in prompts: # Renamed 'prompt' to 'prompt_str' to avoid confusion with the pipeline's 'prompt' dict
-            question = ""
-            context = ""
-
-            # --- Refined Prompt Parsing Logic ---
-            # Look for the "Question:" marker. Everything before it is context.
-            # Everything after it (and before "Helpful Answer:") is the question.
-            try:
-                # Split the prompt by "Question:"
-                parts = prompt_str.split("Question:", 1)
-                if len(parts) > 1:
-                    context_part = parts[0].strip()
-                    question_and_answer_part = parts[1].strip()
-
-                    # Extract the question (before "Helpful Answer:")
-                    q_parts = question_and_answer_part.split("Helpful Answer:", 1)
-                    if len(q_parts) > 0: # Question should be the first part
-                        question = q_parts[0].strip()
-                    
-                    # Clean up the context part: remove the initial instruction and "context:" label
-                    # Example: "Use the following pieces of context to answer the question at the end.\ncontext:\n..."
-                    # Or: "context:\n..."
-                    if context_part.startswith("Use the following pieces of context to answer the question at the end."):
-                        context = context_part[len("Use the following pieces of context to answer the question at the end."):].replace("context:", "").strip()
-                    elif context_part.startswith("context:"):
-                         context = context_part[len("context:"):].strip()
-                    else:
-                        # Fallback if no specific instruction or "context:" prefix is found
-                        context = context_part.strip()
-                else:
-                    # If "Question:" not found, assume the entire prompt is a simple question
-                    question = prompt_str.strip()
-                    context = "" # No explicit context found
-                
-                # Further refine context: remove "Document(page_content=" if present from LangChain
-                # Sometimes LangChain might put Document objects string representation directly.
-                if context.startswith("Document(page_content='"):
-                    context = context[len("Document(page_content='"):].rsplit("')", 1)[0] # Remove prefix and suffix
-
-            except Exception as e:
-                # Log or print a warning, but still attempt to answer
-                print(f"Warning: Complex prompt parsing failed: {e}. Attempting fallback.")
-                question = prompt_str.split("Question:", 1)[-1].split("Helpful Answer:", 1)[0].strip() if "Question:" in prompt_str else prompt_str
-                context = prompt_str.split("Question:", 1)[0].replace("Use the following pieces of context to answer the question at the end.", "").replace("context:", "").strip() if "Question:" in prompt_str else ""
-
-            # Ensure context and question are not empty or just whitespace
-            if not question:
-                print(f"Warning: Extracted question is empty from prompt: {prompt_str[:100]}...")
-                answer_text = "I couldn't identify a clear question to answer."
-            else:
-                try:
-                    # Call the transformers pipeline
-                    # Ensure context is a string, even if empty
-                    qa_input = {"question": question, "context": context if context else ""}
-                    result = self.pipeline(qa_input)
-                    answer_text = result["answer"]
-                except Exception as e:
-                    print(f"Error during Hugging Face pipeline inference: {e}")
-                    answer_text = f"An internal error occurred: {e}. Could not generate answer."
-
-            list_of_generations.append([Generation(text=answer_text)])
+            question, context = self._parse_prompt(prompt_str)
+            qa_inputs.append({"question": question, "context": context})
 
+        list_of_generations = [[Generation(text=answer_text)] for answer_text in self.answer_batch(qa_inputs)]
         return LLMResult(generations=list_of_generations)
 
 
@@ -113,52 +171,884 @@ class CustomHuggingFacePipeline(BaseLLM):
 
 # --- QAChain Class ---
 class QAChain:
-    def __init__(self):
-        self.doc_processor = DocumentProcessor()
-        # Ensure HuggingFaceEmbeddings import is correct as per earlier fix
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        self.qa_pipeline = pipeline(
-            "question-answering",
-            model="distilbert-base-cased-distilled-squad",
-            tokenizer="distilbert-base-cased-distilled-squad",
-            device=0 if torch.cuda.is_available() else -1
-        )
-        self.llm = CustomHuggingFacePipeline(pipeline=self.qa_pipeline)
+    def __init__(
+        self,
+        registry: Optional[ModelRegistry] = None,
+        index_cache: Optional[IndexCache] = None,
+        pipeline_mode: str = "native",
+        reader_mode: str = "stuff",
+        chunks_per_pass: Optional[int] = None,
+        confident_score: Optional[float] = None,
+        index_type: str = "flat",
+        index_params: Optional[dict] = None,
+        retrieval_mode: str = "dense",
+        rerank: bool = False,
+        chunking: str = "characters",
+        vector_dtype: str = "float32",
+        lazy: bool = False
+    ):
+        # Models come from a process-wide registry and are shared by every QAChain;
+        # the vector store and chain below stay per instance (i.e. per session).
+        # With `lazy`, no model is loaded here: each is loaded on first use (see warm_up).
+        self.registry = registry if registry is not None else get_registry()
+        self.embedding_model = EMBEDDING_MODEL
+        # `chunking` is "characters" or "tokens" (sized in MiniLM tokens, split at headings)
+        if chunking not in ("characters", "tokens"):
+            raise ValueError(f"Unknown chunking: {chunking}")
+        self.chunking = chunking
+        # Reader, re-ranker and document processor, built on first use by _lazy
+        self._lazy_objects: Dict[str, Any] = {}
+        self._lazy_lock = threading.RLock()
+        # Optional on-disk cache so a PDF seen before is not re-parsed or re-embedded
+        self.index_cache = index_cache
+        self.document_hash = None
+        # Number of chunks retrieved as context for each question
+        self.top_k = 3
+        # "native" retrieves chunks and passes (question, context) straight to the reader;
+        # "retrieval_qa" goes through LangChain's RetrievalQA and the prompt parser above.
+        if pipeline_mode not in ("native", "retrieval_qa"):
+            raise ValueError(f"Unknown pipeline_mode: {pipeline_mode}")
+        self.pipeline_mode = pipeline_mode
+        # "stuff" joins the top chunks into one context for the pipeline;
+        # "per_chunk" reads every chunk in its own window and keeps the best-scoring span;
+        # "generative" writes the answer with a small seq2seq model and can stream it.
+        if reader_mode not in ("stuff", "per_chunk", "generative"):
+            raise ValueError(f"Unknown reader_mode: {reader_mode}")
+        if reader_mode == "generative" and pipeline_mode != "native":
+            raise ValueError("The generative reader only runs on the native pipeline")
+        self.reader_mode = reader_mode
+        # per_chunk only: read `chunks_per_pass` chunks at a time in retrieval order and stop
+        # once the best span scores `confident_score` (see ExtractiveReader); None reads them all
+        self.chunks_per_pass = chunks_per_pass
+        self.confident_score = confident_score
+        # FAISS index type ("flat", "ivf", "hnsw" or "ivfpq") and its build options, see vector_index
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type: {index_type}")
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        # How the index and the per-document copies hold vectors: "float32", "float16" or "int8".
+        # Chunk texts are always packed into one UTF-8 buffer per document (see compact_storage).
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector_dtype: {vector_dtype}")
+        self.vector_dtype = vector_dtype
+        # "dense" searches FAISS only; "sparse" a BM25 index of the chunk words only; "hybrid"
+        # both, merged with reciprocal rank fusion over the top `fusion_depth` of each.
+        # The BM25 index is built alongside FAISS as chunks are indexed.
+        if retrieval_mode not in ("dense", "sparse", "hybrid"):
+            raise ValueError(f"Unknown retrieval_mode: {retrieval_mode}")
+        self.retrieval_mode = retrieval_mode
+        self.fusion_depth = 20
+        self.sparse_index = BM25Index() if retrieval_mode != "dense" else None
+        # With `rerank`, up to `rerank_candidates` chunks are retrieved per question and a
+        # cross-encoder picks the top_k of them. Fewer candidates are fetched when scoring
+        # them all would take longer than `rerank_budget_ms` at the measured speed.
+        if rerank and pipeline_mode != "native":
+            raise ValueError("Re-ranking only runs on the native pipeline")
+        self.rerank = rerank
+        self.rerank_candidates = 50
+        self.rerank_budget_ms: Optional[float] = 250.0
         self.qa_chain = None
         self.vector_store = None
+        # Corpus of loaded documents: doc_id -> {"name", "chunks", "hash"}
+        self.documents: Dict[str, dict] = {}
+        # Bumped on every add/remove so derived state (filters, caches) can be invalidated
+        self.corpus_version = 0
+        self._filter_positions = {}
+        # Content-derived ID of the loaded corpus; keys the registry's shared answer cache
+        self.corpus_key = None
+        # Guards the vector store and corpus, which a background ingest may change while questions are answered
+        self._lock = threading.RLock()
+        # doc_id -> token of the add_document call ingesting it; remove_document and clear
+        # drop the token, which stops that ingest before its next batch is indexed
+        self._ingests: Dict[str, object] = {}
+        if not lazy:
+            self.load_models()
+
+    # --- Models ---
+    def _lazy(self, name: str, build: Callable[[], Any]) -> Any:
+        """The object stored under `name`, calling `build` only on first use."""
+        value = self._lazy_objects.get(name)
+        if value is None:
+            with self._lazy_lock:
+                value = self._lazy_objects.get(name)
+                if value is None:
+                    value = self._lazy_objects[name] = build()
+        return value
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.registry.get_embeddings(self.embedding_model)
+
+    @property
+    def doc_processor(self) -> DocumentProcessor:
+        # Shares the registry's SentenceTransformer so MiniLM is held in memory once
+        return self._lazy("doc_processor", lambda: DocumentProcessor(
+            embedder=self.embeddings.client, chunking=self.chunking, lock=self._model_lock(self.embeddings)
+        ))
+
+    @property
+    def qa_pipeline(self) -> Any:
+        # DistilBERT is not needed at all in generative mode, so it is never loaded
+        return self.registry.get_qa_pipeline() if self.reader_mode != "generative" else None
+
+    @property
+    def llm(self) -> Optional[CustomHuggingFacePipeline]:
+        if self.reader_mode == "generative":
+            return None
+        return self._lazy("llm", lambda: CustomHuggingFacePipeline(
+            pipeline=self.qa_pipeline, lock=self._model_lock(self.qa_pipeline)
+        ))
+
+    @property
+    def reader(self) -> Any:
+        """The GenerativeReader or ExtractiveReader of the generative and per_chunk modes, else None."""
+        # reader.py imports torch, so it is only imported once a reader is needed
+        if self.reader_mode == "generative":
+            from reader import GenerativeReader
+            generator = self.registry.get_generator()
+            return self._lazy("reader", lambda: GenerativeReader(*generator, lock=self._model_lock(generator)))
+        if self.reader_mode == "per_chunk":
+            from reader import ExtractiveReader
+            return self._lazy("reader", lambda: ExtractiveReader(
+                self.qa_pipeline.model,
+                self.qa_pipeline.tokenizer,
+                chunks_per_pass=self.chunks_per_pass,
+                confident_score=self.confident_score,
+                lock=self._model_lock(self.qa_pipeline)
+            ))
+        return None
+
+    @property
+    def reranker(self) -> Any:
+        if not self.rerank:
+            return None
+        from reranker import Reranker
+        cross_encoder = self.registry.get_cross_encoder()
+        return self._lazy("reranker", lambda: Reranker(
+            *cross_encoder,
+            cache=self.registry.rerank_cache,
+            name=f"{RERANK_MODEL}:{self.registry.backend}",
+            lock=self._model_lock(cross_encoder)
+        ))
+
+    def _model_lock(self, model: Any) -> threading.Lock:
+        """The registry's inference lock for a shared model; every session running it takes turns."""
+        return self.registry.inference_lock(model)
+
+    def load_models(self) -> None:
+        """Load every model this chain uses now instead of on first use."""
+        for name in ("doc_processor", "llm", "reader", "reranker"):
+            getattr(self, name)
+
+    @traced("warm_up")
+    def warm_up(self) -> None:
+        """
+        Load the models and run one dummy input through each, so the first real question
+        does not also pay for one-time kernel and allocator initialisation. Safe to call
+        from a background thread while the chain is in use.
+        """
+        question, context = "What is this document about?", "This document is about warming up the models."
+        self.load_models()
+        with self._model_lock(self.embeddings):
+            self.embeddings.embed_query(question)
+        if self.reranker is not None:
+            self.reranker._score_pairs([question], [context])
+        if self.reader_mode == "generative":
+            self.reader.generate_batch([question], [[context]])
+        elif self.reader_mode == "per_chunk":
+            self.reader.read_batch([question], [[context]])
+        else:
+            self.llm.answer_batch([{"question": question, "context": context}])
+
+    def index_settings(self) -> dict:
+        """Settings that change the index built for a PDF; part of the cache key."""
+        return {
+            "chunk_size": self.doc_processor.chunk_size,
+            "chunk_overlap": self.doc_processor.chunk_overlap,
+            "chunking": self.doc_processor.chunking,
+            "chunk_tokens": self.doc_processor.chunk_tokens,
+            "chunk_overlap_tokens": self.doc_processor.chunk_overlap_tokens,
+            "embedding_model": self.embedding_model,
+            "embedding_backend": self.registry.backend,
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+            "vector_dtype": self.vector_dtype,
+        }
+
+    def clear(self) -> None:
+        """Unload every document."""
+        with self._lock:
+            self.documents = {}
+            self._ingests = {}
+            self.vector_store = None
+            if self.sparse_index is not None:
+                self.sparse_index = BM25Index()
+            self._corpus_changed()
+
+    @traced("load_document")
+    def load_document(self, pdf_path: str, progress: Optional[Callable[[dict], None]] = None) -> int:
+        """Replace whatever is loaded with this one PDF; returns its chunk count."""
+        self.clear()
+        doc_id = self.add_document(pdf_path, progress=progress)
+        return self.documents[doc_id]["chunks"]
+
+    @traced("add_document")
+    def add_document(
+        self,
+        pdf_path: str,
+        doc_id: Optional[str] = None,
+        name: Optional[str] = None,
+        progress: Optional[Callable[[dict], None]] = None
+    ) -> str:
+        """
+        Add a PDF to the corpus without rebuilding the index for the documents already in it.
+        Chunks become searchable batch by batch while the PDF is read (except for trained
+        index types), so questions asked from another thread are answered from what is
+        indexed so far. `progress` is called with {"pages_done", "pages_total", "chunks_done"};
+        if it raises (as a cancelled IngestJob's does), the document is removed again.
+        Removing the document while it is ingested stops the ingest with DocumentRemoved;
+        a PDF without extractable text (blank or scanned pages) raises ValueError.
+        Returns the document ID (by default derived from the PDF's content hash).
+        """
+        cache_key = IndexCache.make_key(pdf_path, self.index_settings())
+        doc_id = doc_id or cache_key[:16]
+        with self._lock:
+            if doc_id in self.documents:
+                self.remove_document(doc_id)
+            # Also supersedes another ingest of the same doc_id that has not indexed anything yet
+            ingest = self._ingests[doc_id] = object()
+        source = name or os.path.basename(pdf_path)
+        pages_total = page_count(pdf_path)
+
+        try:
+            cached = self.index_cache.load(cache_key, self.embeddings) if self.index_cache is not None else None
+            if cached is not None:
+                texts, embeddings, locations = cached.chunks, cached.embeddings, cached.locations
+                with self._lock:
+                    self._check_ingest(doc_id, ingest)
+                    self._add_cached(doc_id, source, cache_key, cached)
+            else:
+                incremental = not needs_training(self.index_type, self.vector_dtype)
+                # Each batch is packed as soon as it is embedded; untrained indexes get float32 batches
+                text_parts, locations, vector_parts, batches = [], [], [], []
+                chunks_done = 0
+                # Whether this ingest created the corpus store (it was empty when the first chunks went in)
+                created_store = False
+                for batch, batch_embeddings, batch_locations in self.doc_processor.iter_embedded_batches(pdf_path):
+                    batch_texts = ChunkTexts.from_texts(batch)
+                    if incremental:
+                        with self._lock:
+                            self._check_ingest(doc_id, ingest)
+                            created_store = created_store or self.vector_store is None
+                            self._index_chunks(doc_id, source, cache_key, chunks_done, batch_texts, batch_embeddings, batch_locations)
+                    else:
+                        batches.append(batch_embeddings)
+                    chunks_done += len(batch)
+                    text_parts.append(batch_texts)
+                    locations.extend(batch_locations)
+                    vector_parts.append(CompactVectors.encode(batch_embeddings, self.vector_dtype))
+                    if progress is not None:
+                        pages_done = batch_locations[-1].get("page_end", batch_locations[-1]["page"])
+                        progress({"pages_done": pages_done, "pages_total": pages_total, "chunks_done": chunks_done})
+                if not text_parts:
+                    # Blank or image-only pages: there is nothing to embed or search
+                    raise ValueError(f"No extractable text in {source}")
+                texts = ChunkTexts.concat(text_parts)
+                embeddings = CompactVectors.concat(vector_parts)
+                if not incremental:
+                    with self._lock:
+                        self._check_ingest(doc_id, ingest)
+                        created_store = self.vector_store is None
+                        self._index_chunks(doc_id, source, cache_key, 0, texts, np.vstack(batches), locations)
+                del batches
+            self.doc_processor.text_chunks = texts
+            self.doc_processor.chunk_pages = [location["page"] for location in locations]
+            self.doc_processor.chunk_locations = locations
+            self.doc_processor.embeddings = embeddings
+
+            if self.index_cache is not None and cached is None:
+                with self._lock:
+                    self._check_ingest(doc_id, ingest)
+                    if created_store and list(self.documents) == [doc_id]:
+                        # The corpus store was built by this ingest and holds nothing else; cache it as is
+                        store = self.vector_store
+                    else:
+                        # Other documents (possibly ingested at the same time) share the corpus store, so
+                        # cache an index of this one alone, reusing the corpus store's training
+                        store = self._new_vector_store(
+                            doc_id, source, 0, texts, embeddings, locations, like=self.vector_store.index
+                        )
+                    texts, embeddings = self.index_cache.store(cache_key, texts, embeddings, store, locations=locations, source=source)
+                    # Serve the chunks from the entry's pages, which other processes on this cache share
+                    self.vector_store.docstore.replace_chunks(doc_id, texts, locations)
+                self.doc_processor.text_chunks = texts
+                self.doc_processor.embeddings = embeddings
+
+            get_metrics().annotate(doc_id=doc_id, pages=pages_total, chunks=len(texts), index_cache_hit=cached is not None)
+            if progress is not None:
+                progress({"pages_done": pages_total, "pages_total": pages_total, "chunks_done": len(texts)})
+        except Exception:
+            with self._lock:
+                # Drop whatever part of the document was indexed before the failure or cancellation,
+                # unless it was removed already or another ingest has taken the doc_id over
+                if self._ingests.get(doc_id) is ingest and doc_id in self.documents:
+                    self.remove_document(doc_id)
+            raise
+        finally:
+            with self._lock:
+                if self._ingests.get(doc_id) is ingest:
+                    del self._ingests[doc_id]
+        self.document_hash = cache_key
+        return doc_id
+
+    @traced("add_cached_document")
+    def add_cached_document(self, cache_key: str, doc_id: Optional[str] = None, name: Optional[str] = None) -> str:
+        """
+        Add a document from its index cache entry alone, without the PDF. Worker processes
+        sharing a cache directory pick up what another worker ingested this way (see worker_pool).
+        Raises KeyError when the entry is not in the cache (never stored, or evicted since).
+        """
+        if self.index_cache is None:
+            raise ValueError("add_cached_document needs an index cache")
+        doc_id = doc_id or cache_key[:16]
+        with self._lock:
+            if doc_id in self.documents:
+                self.remove_document(doc_id)
+            # Takes the doc_id over from any ingest of it, as add_document does
+            ingest = self._ingests[doc_id] = object()
+        try:
+            cached = self.index_cache.load(cache_key, self.embeddings)
+            if cached is None:
+                raise KeyError(f"Not in the index cache: {cache_key}")
+            with self._lock:
+                self._check_ingest(doc_id, ingest)
+                self._add_cached(doc_id, name or cached.source, cache_key, cached)
+        finally:
+            with self._lock:
+                if self._ingests.get(doc_id) is ingest:
+                    del self._ingests[doc_id]
+        self.document_hash = cache_key
+        get_metrics().annotate(doc_id=doc_id, chunks=len(cached.chunks), index_cache_hit=True)
+        return doc_id
+
+    def _add_cached(self, doc_id: str, source: str, cache_key: str, cached: CachedIndex) -> None:
+        texts = cached.chunks
+        with self._lock:
+            if self.vector_store is None and texts and cached.vector_store.index_to_docstore_id.get(0) == f"{doc_id}:0":
+                # The saved index was built for exactly this document ID; use it as is
+                self.vector_store = cached.vector_store
+                if self.sparse_index is not None:
+                    self.sparse_index.add([f"{doc_id}:{i}" for i in range(len(texts))], texts)
+                self.documents[doc_id] = {"name": source, "chunks": len(texts), "hash": cache_key}
+                self._corpus_changed()
+            else:
+                self._index_chunks(doc_id, source, cache_key, 0, texts, cached.embeddings, cached.locations)
+
+    def _check_ingest(self, doc_id: str, ingest: object) -> None:
+        """Raise DocumentRemoved unless `ingest` still owns `doc_id`; call with the lock held."""
+        if self._ingests.get(doc_id) is not ingest:
+            raise DocumentRemoved(f"Document {doc_id} was removed while it was being ingested")
+
+    def _index_chunks(
+        self,
+        doc_id: str,
+        source: str,
+        cache_key: str,
+        start: int,
+        texts: Sequence[str],
+        embeddings: Union[np.ndarray, CompactVectors],
+        locations: List[dict]
+    ) -> None:
+        """Index chunks `start`.. of a document and record it in the corpus; call with the lock held."""
+        with get_metrics().span("index"):
+            # Chunk IDs are "<doc_id>:<n>" so a document's chunks can be found and deleted later
+            ids = [f"{doc_id}:{start + i}" for i in range(len(texts))]
+            if self.vector_store is None:
+                self.vector_store = self._new_vector_store(doc_id, source, start, texts, embeddings, locations)
+            elif texts:
+                # Index the vectors computed by the processor instead of encoding every chunk again
+                add_to_store(self.vector_store, doc_id, source, start, texts, embeddings, locations)
+            if self.sparse_index is not None:
+                self.sparse_index.add(ids, texts)
+            self.documents[doc_id] = {"name": source, "chunks": start + len(texts), "hash": cache_key}
+            self._corpus_changed()
+        get_metrics().inc("chunks_indexed_total", len(texts))
+
+    def _new_vector_store(
+        self,
+        doc_id: str,
+        source: str,
+        start: int,
+        texts: Sequence[str],
+        embeddings: Union[np.ndarray, CompactVectors],
+        locations: List[dict],
+        like: Optional[faiss.Index] = None
+    ) -> FAISS:
+        """
+        Vector store over a fresh index of the configured type, holding chunks `start`..
+        of a document. Trained index types (IVF, IVF-PQ, int8 codes) are trained on these
+        first vectors; documents added later are assigned to the same cells and ranges.
+        With `like`, a trained index is copied empty from it instead of trained again.
+        """
+        if like is not None and needs_training(self.index_type, self.vector_dtype):
+            index = empty_copy(like)
+        else:
+            index = build_index(
+                self.index_type, np.asarray(embeddings, dtype=np.float32), vector_dtype=self.vector_dtype, **self.index_params
+            )
+        vector_store = FAISS(self.embeddings, index, ChunkDocstore(), {})
+        if texts:
+            # Index the vectors computed by the processor instead of encoding every chunk again
+            add_to_store(vector_store, doc_id, source, start, texts, embeddings, locations)
+        return vector_store
+
+    def remove_document(self, doc_id: str) -> None:
+        """
+        Delete one document's chunks from the index; the other documents are untouched.
+        A document still being ingested is removed too, and its ingest stops.
+        """
+        with self._lock:
+            if doc_id not in self.documents:
+                if doc_id not in self._ingests:
+                    raise KeyError(f"Unknown document id: {doc_id}")
+                # Nothing indexed yet; the ingest stops before its first batch
+                del self._ingests[doc_id]
+                return
+            if len(self.documents) > 1 and not supports_removal(self.vector_store.index):
+                raise ValueError(f"A {self.index_type} index cannot remove vectors; reload the remaining documents instead.")
+            info = self.documents.pop(doc_id)
+            self._ingests.pop(doc_id, None)
+            if not self.documents:
+                self.vector_store = None
+            elif info["chunks"]:
+                remove_from_store(self.vector_store, [f"{doc_id}:{i}" for i in range(info["chunks"])])
+            if self.sparse_index is not None:
+                self.sparse_index.remove_document(doc_id)
+            self._corpus_changed()
+
+    def list_documents(self) -> List[dict]:
+        with self._lock:
+            return [{"doc_id": doc_id, **info} for doc_id, info in self.documents.items()]
+
+    def _corpus_changed(self) -> None:
+        self.corpus_version += 1
+        self._filter_positions = {}
+        self.qa_chain = None # Rebuilt on demand for the new vector store
+        old_key = self.corpus_key
+        self.corpus_key = None
+        if self.documents:
+            # Document IDs, content hashes (which already cover the index settings)
+            # and chunk counts, so answers given while a document is still being indexed are told apart
+            fingerprint = json.dumps(
+                sorted((doc_id, info["hash"], info["chunks"]) for doc_id, info in self.documents.items())
+            )
+            self.corpus_key = hashlib.sha256(fingerprint.encode()).hexdigest()
+        if old_key is not None and old_key != self.corpus_key:
+            # Answers for the corpus as it was are stale once a document is removed or reloaded
+            self.registry.answer_cache.invalidate(lambda key: key[0] == old_key)
+            self.registry.semantic_caches.invalidate(lambda key: key[0] == old_key)
+
+    def _cache_scope(self, doc_ids: Optional[List[str]]) -> tuple:
+        """What a cached answer depends on besides the question; starts with the corpus key."""
+        return (
+            self.corpus_key,
+            self.top_k,
+            self.pipeline_mode,
+            self.reader_mode,
+            self.retrieval_mode,
+            self.rerank,
+            tuple(sorted(doc_ids)) if doc_ids is not None else None,
+        )
+
+    def _answer_key(self, question: str, doc_ids: Optional[List[str]]) -> tuple:
+        return (*self._cache_scope(doc_ids), normalize_question(question))
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the shared question-embedding, answer, re-ranker score and paraphrase caches."""
+        stats = {
+            "embedding": self.registry.embedding_cache.stats(),
+            "answer": self.registry.answer_cache.stats(),
+            "rerank": self.registry.rerank_cache.stats(),
+        }
+        semantic_cache = self.registry.semantic_caches.get(self._cache_scope(None))
+        if semantic_cache is not None:
+            stats["semantic"] = semantic_cache.stats()
+        return stats
 
-    def load_document(self, pdf_path: str) -> int:
-        chunk_count, texts, embeddings = self.doc_processor.process_pdf(pdf_path)
-        self.vector_store = FAISS.from_texts(texts, self.embeddings)
-        
+    def _build_retrieval_qa(self, doc_ids: Optional[List[str]] = None) -> RetrievalQA:
+        search_kwargs = {"k": self.top_k}
+        if doc_ids is not None:
+            search_kwargs["filter"] = {"doc_id": list(doc_ids)}
         # Important: Ensure the prompt template is suitable for your HF QA model
         # Using "stuff" chain type, which puts all context into one prompt.
         # Default prompt template works fine if parsing in _generate is correct.
-        self.qa_chain = RetrievalQA.from_chain_type(
+        return RetrievalQA.from_chain_type(
             llm=self.llm,
             chain_type="stuff",
-            retriever=self.vector_store.as_retriever(search_kwargs={"k": 3}),
+            retriever=self.vector_store.as_retriever(search_kwargs=search_kwargs),
             return_source_documents=True
         )
-        return chunk_count
 
-    def ask_question(self, question: str) -> dict:
-        if self.qa_chain is None:
+    @traced("ask_question")
+    def ask_question(self, question: str, doc_ids: Optional[List[str]] = None) -> dict:
+        """Answer one question; `doc_ids` restricts retrieval to those documents."""
+        if self.vector_store is None:
             return {"error": "No document loaded. Please load a PDF first.", "answer": "", "source_documents": []}
-        
+
+        if self.pipeline_mode == "native":
+            return self.ask_questions([question], doc_ids=doc_ids)[0]
+
+        answer_key = self._answer_key(question, doc_ids)
+        cached = self.registry.answer_cache.get(answer_key)
+        if cached is not None:
+            return _copy_result(cached)
+
         try:
-            result = self.qa_chain.invoke({"query": question})
+            # RetrievalQA searches (and embeds the question) inside the chain, so the whole call holds both locks
+            with self._lock, self._model_lock(self.embeddings):
+                if doc_ids is not None:
+                    qa_chain = self._build_retrieval_qa(doc_ids)
+                else:
+                    if self.qa_chain is None:
+                        self.qa_chain = self._build_retrieval_qa()
+                    qa_chain = self.qa_chain
+                with get_metrics().span("retrieval_qa"):
+                    result = qa_chain.invoke({"query": question})
             answer = result.get("result", "I could not find a relevant answer in the document.")
             source_docs = [doc.page_content for doc in result.get("source_documents", [])]
             
-            return {
+            response = {
                 "answer": answer,
                 "source_documents": source_docs
             }
+            self.registry.answer_cache.put(answer_key, _copy_result(response))
+            return response
         except Exception as e:
-            print(f"Error in ask_question (LangChain chain invocation): {e}")
+            logger.exception("Error in ask_question (LangChain chain invocation)")
             return {
                 "answer": f"An error occurred while getting the answer: {e}. Please check the console.",
                 "source_documents": [],
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    def _positions_for(self, doc_ids: List[str]) -> np.ndarray:
+        """FAISS row positions of every chunk belonging to `doc_ids` (cached until the corpus changes)."""
+        key = frozenset(doc_ids)
+        positions = self._filter_positions.get(key)
+        if positions is None:
+            positions = np.fromiter(
+                (
+                    position
+                    for position, chunk_id in self.vector_store.index_to_docstore_id.items()
+                    if chunk_id.rsplit(":", 1)[0] in key
+                ),
+                dtype=np.int64
+            )
+            self._filter_positions[key] = positions
+        return positions
+
+    def _retrieve_batch(
+        self,
+        questions: List[str],
+        k: int,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[List[tuple[Document, float]]]:
+        """
+        Top-k chunks per question, best first, searched only among `doc_ids` if given.
+        Dense retrieval returns (chunk, L2 distance) pairs, sparse (chunk, BM25 score)
+        and hybrid (chunk, reciprocal rank fusion score) of the two rankings.
+        """
+        # Encoding is the slow part and needs no lock
+        query_vectors = self._embed_questions(questions) if self.retrieval_mode != "sparse" else None
+        depth = k if self.retrieval_mode == "dense" else max(k, self.fusion_depth)
+        with self._lock, get_metrics().span("search"):
+            if self.vector_store is None: # the corpus was cleared while the questions were embedded
+                return [[] for _ in questions]
+            rankings = []
+            if query_vectors is not None:
+                rankings.append(self._dense_search(query_vectors, depth, doc_ids))
+            if self.retrieval_mode != "dense":
+                allowed = self.sparse_index.rows_for(doc_ids) if doc_ids is not None else None
+                rankings.append(self.sparse_index.search_batch(questions, depth, allowed=allowed))
+
+            if len(rankings) == 1:
+                hits_per_question = rankings[0]
+            else:
+                hits_per_question = [
+                    reciprocal_rank_fusion([[chunk_id for chunk_id, _ in hits] for hits in per_question], k)
+                    for per_question in zip(*rankings)
+                ]
+            docstore = self.vector_store.docstore
+            return [
+                [(docstore.search(chunk_id), score) for chunk_id, score in hits[:k]]
+                for hits in hits_per_question
+            ]
+
+    def _dense_search(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[List[tuple[str, float]]]:
+        """
+        One FAISS search for the whole batch; returns (chunk ID, L2 distance) pairs per
+        question, nearest first. With `doc_ids`, FAISS only considers chunks of those
+        documents. Call with the lock held.
+        """
+        filter_params = None
+        if doc_ids is not None:
+            positions = self._positions_for(doc_ids)
+            if len(positions) == 0:
+                return [[] for _ in query_vectors]
+            filter_params = search_params(self.vector_store.index, faiss.IDSelectorBatch(positions))
+
+        distances, indices = self.vector_store.index.search(query_vectors, k, params=filter_params)
+        return [
+            [
+                (self.vector_store.index_to_docstore_id[idx], float(distance))
+                for distance, idx in zip(row_distances, row_indices)
+                if idx != -1 # FAISS pads with -1 when the index has fewer than k vectors
+            ]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
+
+    def _embed_questions(self, questions: List[str]) -> np.ndarray:
+        """Question embeddings, encoding only the texts not already in the registry's embedding cache."""
+        cache = self.registry.embedding_cache
+        keys = [(self.embedding_model, self.registry.backend, question) for question in questions]
+        vectors = [cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Repeats within the batch are encoded once
+            texts = list(dict.fromkeys(questions[i] for i in missing))
+            with get_metrics().span("embed_query"), self._model_lock(self.embeddings):
+                encoded = dict(zip(texts, np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)))
+            for i in missing:
+                vectors[i] = encoded[questions[i]]
+                cache.put(keys[i], vectors[i])
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def retrieve(
+        self,
+        question: str,
+        k: Optional[int] = None,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[tuple[str, float]]:
+        """
+        Return (chunk text, score) for the k best chunks for `question`: the cross-encoder
+        logit with re-ranking on, else the L2 distance (lower is better) in dense mode,
+        otherwise a BM25 or fusion score (higher is better).
+        """
+        if self.vector_store is None:
+            return []
+        hits = self._retrieve_ranked([question], k or self.top_k, doc_ids=doc_ids)[0]
+        return [(doc.page_content, score) for doc, score in hits]
+
+    def _retrieve_ranked(
+        self,
+        questions: List[str],
+        k: int,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[List[tuple[Document, float]]]:
+        """Top-k chunks per question, re-ranked by the cross-encoder (scores are then its logits) if enabled."""
+        if self.reranker is None:
+            return self._retrieve_batch(questions, k, doc_ids)
+        depth = self.reranker.candidate_count(len(questions), self.rerank_candidates, self.rerank_budget_ms, min_candidates=k)
+        candidates = self._retrieve_batch(questions, depth, doc_ids)
+        with get_metrics().span("rerank"):
+            ranked = self.reranker.rerank(
+                [question.strip() for question in questions],
+                [[doc.page_content for doc, _ in hits] for hits in candidates],
+                k
+            )
+        return [[(hits[i][0], score) for i, score in order] for hits, order in zip(candidates, ranked)]
+
+    @traced("ask_questions")
+    def ask_questions(self, questions: List[str], doc_ids: Optional[List[str]] = None) -> List[dict]:
+        """
+        Answer many questions against the loaded documents (or only `doc_ids`).
+        Retrieved chunks go straight to the reader as (question, context) pairs, with no
+        prompt rendering. Retrieval and answering are both batched, so this is much cheaper
+        than calling ask_question in a loop. Results are in the same order as `questions`.
+        """
+        if self.vector_store is None:
+            return [
+                {"error": "No document loaded. Please load a PDF first.", "answer": "", "source_documents": []}
+                for _ in questions
+            ]
+        if not questions:
+            return []
+
+        # Repeat questions are answered from the shared cache; only the rest are retrieved and read
+        answer_keys = [self._answer_key(question, doc_ids) for question in questions]
+        results = [self.registry.answer_cache.get(key) for key in answer_keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        # Paraphrases of a cached question reuse its answer when the embeddings are close enough
+        semantic_cache = None
+        vectors = {}
+        if missing:
+            semantic_cache = self.registry.get_semantic_cache(self._cache_scope(doc_ids), self.vector_store.index.d)
+        if semantic_cache is not None:
+            lookup = [i for i in missing if answer_keys[i][-1]] # blank questions never match
+            if lookup:
+                embedded = self._embed_questions([questions[i] for i in lookup])
+                vectors = dict(zip(lookup, embedded))
+                for i, result in zip(lookup, semantic_cache.lookup(embedded)):
+                    if result is not None:
+                        results[i] = result
+                        self.registry.answer_cache.put(answer_keys[i], result)
+            missing = [i for i in missing if results[i] is None]
+        get_metrics().annotate(questions=len(questions), cache_hits=len(questions) - len(missing))
+
+        if missing:
+            fresh = self._answer_uncached([questions[i] for i in missing], doc_ids)
+            for i, result in zip(missing, fresh):
+                results[i] = result
+                if "error" not in result and not result["answer"].startswith(PIPELINE_ERROR_PREFIX):
+                    self.registry.answer_cache.put(answer_keys[i], result)
+                    if semantic_cache is not None and i in vectors:
+                        semantic_cache.add(vectors[i], result)
+        return [_copy_result(result) for result in results]
+
+    def _answer_uncached(self, questions: List[str], doc_ids: Optional[List[str]]) -> List[dict]:
+        try:
+            retrieved = [[doc for doc, _ in hits] for hits in self._retrieve_ranked(questions, self.top_k, doc_ids)]
+            return self._read(questions, retrieved)
+        except Exception as e:
+            logger.exception("Error in ask_questions (retrieval/reader)")
+            return [
+                {
+                    "answer": f"An error occurred while getting the answer: {e}. Please check the console.",
+                    "source_documents": [],
+                    "error": str(e)
+                }
+                for _ in questions
+            ]
+
+    def _read(self, questions: List[str], retrieved: List[List[Document]]) -> List[dict]:
+        """Answer each question from its retrieved chunks with the configured reader."""
+        with get_metrics().span("read"):
+            if self.reader_mode == "per_chunk":
+                return self._read_per_chunk(questions, retrieved)
+            if self.reader_mode == "generative":
+                return self._read_generative(questions, retrieved)
+
+            # Same context layout as the "stuff" chain: chunk texts separated by blank lines
+            qa_inputs = [
+                {"question": question.strip(), "context": "\n\n".join(doc.page_content for doc in docs)}
+                for question, docs in zip(questions, retrieved)
+            ]
+            answers = self.llm.answer_batch(qa_inputs)
+            return [
+                {
+                    "answer": answer,
+                    "source_documents": [doc.page_content for doc in docs]
+                }
+                for answer, docs in zip(answers, retrieved)
+            ]
+
+    def _read_generative(self, questions: List[str], retrieved: List[List[Document]]) -> List[dict]:
+        questions = [question.strip() for question in questions]
+        to_read = [i for i, question in enumerate(questions) if question and retrieved[i]]
+        generated = self.reader.generate_batch(
+            [questions[i] for i in to_read],
+            [[doc.page_content for doc in retrieved[i]] for i in to_read]
+        ) if to_read else []
+        answers = dict(zip(to_read, generated))
+        return [
+            {
+                "answer": self._generated_or_fallback(questions[i], answers.get(i)),
+                "source_documents": [doc.page_content for doc in docs]
+            }
+            for i, docs in enumerate(retrieved)
+        ]
+
+    @staticmethod
+    def _generated_or_fallback(question: str, answer: Optional[str]) -> str:
+        if not question:
+            return "I couldn't identify a clear question to answer."
+        return answer or "I could not find a relevant answer in the document."
+
+    @traced("stream_answer")
+    def stream_answer(self, question: str, doc_ids: Optional[List[str]] = None) -> dict:
+        """
+        Like ask_question, but "answer_stream" is an iterator of answer text pieces,
+        e.g. for st.write_stream, and there is no "answer" key. The generative reader
+        yields tokens as they are decoded; the other readers yield the whole answer at
+        once. Cached answers are replayed, and streamed answers are cached when done.
+        """
+        if self.vector_store is None or self.reader_mode != "generative":
+            result = self.ask_question(question, doc_ids=doc_ids)
+            answer = result.pop("answer")
+            return {**result, "answer_stream": iter([answer])}
+
+        answer_key = self._answer_key(question, doc_ids)
+        cached = self.registry.answer_cache.get(answer_key)
+        if cached is not None:
+            result = _copy_result(cached)
+            answer = result.pop("answer")
+            return {**result, "answer_stream": iter([answer])}
+
+        try:
+            docs = [doc for doc, _ in self._retrieve_ranked([question], self.top_k, doc_ids)[0]]
+        except Exception as e:
+            logger.exception("Error in stream_answer (retrieval)")
+            message = f"An error occurred while getting the answer: {e}. Please check the console."
+            return {"answer_stream": iter([message]), "source_documents": [], "error": str(e)}
+        sources = [doc.page_content for doc in docs]
+        question = question.strip()
+
+        def tokens():
+            if not question or not docs:
+                yield self._generated_or_fallback(question, None)
+                return
+            pieces = []
+            start = time.perf_counter()
+            for piece in self.reader.stream(question, sources):
+                pieces.append(piece)
+                yield piece
+            # Includes the time the consumer took between pieces, so it is not a span
+            get_metrics().observe("stage_seconds", time.perf_counter() - start, stage="generate_stream")
+            answer = "".join(pieces).strip()
+            if not answer:
+                yield self._generated_or_fallback(question, None)
+                return
+            self.registry.answer_cache.put(answer_key, {"answer": answer, "source_documents": list(sources)})
+
+        return {"answer_stream": tokens(), "source_documents": sources}
+
+    def _read_per_chunk(self, questions: List[str], retrieved: List[List[Document]]) -> List[dict]:
+        """Score every retrieved chunk separately and report the winning chunk and its page."""
+        questions = [question.strip() for question in questions]
+        to_read = [i for i, question in enumerate(questions) if question and retrieved[i]]
+        best = self.reader.read_batch(
+            [questions[i] for i in to_read],
+            [[doc.page_content for doc in retrieved[i]] for i in to_read]
+        )
+        best_by_question = dict(zip(to_read, best))
+
+        results = []
+        for i, docs in enumerate(retrieved):
+            result = {"answer": "", "source_documents": [doc.page_content for doc in docs]}
+            found = best_by_question.get(i)
+            if not questions[i]:
+                result["answer"] = "I couldn't identify a clear question to answer."
+            elif found is None or not found.answer:
+                result["answer"] = "I could not find a relevant answer in the document."
+            else:
+                source = docs[found.chunk_index]
+                result.update({
+                    "answer": found.answer,
+                    "score": found.score,
+                    "source_chunk": source.page_content,
+                    "source_page": source.metadata.get("page"),
+                    "source_document_id": source.metadata.get("doc_id")
+                })
+            results.append(result)
+        return results
+
+
+def _copy_result(result: dict) -> dict:
+    """Copy of a cached result, so callers can modify what they get back."""
+    return {**result, "source_documents": list(result["source_documents"])}
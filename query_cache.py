@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import faiss
+import numpy as np
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache with least-recently-used eviction, an optional
+    time-to-live per entry and hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+class SemanticCache:
+    """
+    Answers to past questions, found again by the cosine similarity of question
+    embeddings so paraphrases of a cached question skip retrieval and reading.
+    Holds at most `maxsize` questions in a flat inner-product FAISS index and
+    evicts the least recently used one beyond that.
+    """
+
+    def __init__(self, dim: int, threshold: float = 0.9, maxsize: int = 256):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self._values: "OrderedDict[int, Any]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalized(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2) # copy; normalize_L2 works in place
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def lookup(self, vectors: np.ndarray) -> List[Optional[Any]]:
+        """For each question vector, the value of the most similar cached question within the threshold."""
+        queries = self._normalized(vectors)
+        with self._lock:
+            if self.index.ntotal == 0:
+                self.misses += len(queries)
+                return [None] * len(queries)
+            similarities, ids = self.index.search(queries, 1)
+            found = []
+            for similarity, entry_id in zip(similarities[:, 0], ids[:, 0]):
+                if entry_id != -1 and similarity >= self.threshold:
+                    self._values.move_to_end(int(entry_id))
+                    self.hits += 1
+                    found.append(self._values[int(entry_id)])
+                else:
+                    self.misses += 1
+                    found.append(None)
+            return found
+
+    def add(self, vector: np.ndarray, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(self._normalized(vector), np.array([entry_id], dtype=np.int64))
+            self._values[entry_id] = value
+            if len(self._values) > self.maxsize:
+                evicted, _ = self._values.popitem(last=False)
+                self.index.remove_ids(np.array([evicted], dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._values),
+            "maxsize": self.maxsize,
+        }
+
+
+def normalize_question(question: str) -> str:
+    """
+    Whitespace-insensitive form of a question, ignoring trailing punctuation. Case is kept:
+    the reader is cased, so "US" and "us" may get different answers.
+    """
+    return " ".join(question.split()).rstrip(" ?!.")
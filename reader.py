@@ -0,0 +1,222 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import torch
+from transformers import TextIteratorStreamer
+
+from metrics import get_metrics
+
+
+@dataclass
+class ReaderAnswer:
+    answer: str
+    score: float # start logit + end logit of the chosen span
+    chunk_index: int # position of the source chunk in the contexts given for this question
+    start: int # character offsets of the answer inside that chunk
+    end: int
+
+
+class ExtractiveReader:
+    """
+    Extractive QA over retrieved chunks, one (question, chunk) window per chunk.
+    Each window is truncated to `max_seq_len` tokens, so a question costs at most one
+    fixed-size forward pass per chunk however long the chunks are. Windows are scored
+    in batches and the span with the highest start+end logit wins.
+
+    With `chunks_per_pass` set, chunks are read in retrieval order a few at a time and
+    reading stops for a question once its best score reaches `confident_score`.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        max_seq_len: int = 384,
+        max_answer_len: int = 30,
+        batch_size: int = 16,
+        chunks_per_pass: Optional[int] = None,
+        confident_score: Optional[float] = None,
+        lock: Optional[threading.Lock] = None
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_seq_len = max_seq_len
+        self.max_answer_len = max_answer_len
+        self.batch_size = batch_size
+        self.chunks_per_pass = chunks_per_pass
+        self.confident_score = confident_score
+        # Held while the model runs; pass the registry's inference_lock when the model is shared
+        self.lock = lock or threading.Lock()
+        # PyTorch and optimum ONNX Runtime models both expose .device
+        self.device = model.device
+        self._span_masks: Dict[int, torch.Tensor] = {}
+
+    def _span_mask(self, length: int) -> torch.Tensor:
+        """Valid (start, end) pairs: end >= start and span no longer than max_answer_len tokens."""
+        mask = self._span_masks.get(length)
+        if mask is None:
+            ones = torch.ones(length, length, dtype=torch.bool)
+            mask = ones.triu() & ~ones.triu(diagonal=self.max_answer_len)
+            self._span_masks[length] = mask
+        return mask
+
+    def _score_pairs(self, questions: List[str], chunks: List[str]) -> List[tuple[float, int, int]]:
+        """One forward pass over the pairs; returns (score, char_start, char_end) per chunk."""
+        with self.lock:
+            encoded = self.tokenizer(
+                questions,
+                chunks,
+                truncation="only_second",
+                max_length=self.max_seq_len,
+                padding=True,
+                return_offsets_mapping=True,
+                return_tensors="pt"
+            )
+            inputs = {
+                name: encoded[name].to(self.device)
+                for name in ("input_ids", "attention_mask")
+            }
+            with torch.inference_mode():
+                outputs = self.model(**inputs)
+        offsets = encoded["offset_mapping"].tolist()
+        start_logits = outputs.start_logits.float().cpu()
+        end_logits = outputs.end_logits.float().cpu()
+
+        spans = []
+        for i in range(len(chunks)):
+            context_mask = torch.tensor([sequence_id == 1 for sequence_id in encoded.sequence_ids(i)])
+            if not context_mask.any():
+                spans.append((float("-inf"), 0, 0))
+                continue
+            start = start_logits[i].masked_fill(~context_mask, float("-inf"))
+            end = end_logits[i].masked_fill(~context_mask, float("-inf"))
+            scores = (start[:, None] + end[None, :]).masked_fill(~self._span_mask(start.shape[0]), float("-inf"))
+            start_token, end_token = divmod(int(torch.argmax(scores)), scores.shape[1])
+            spans.append((float(scores[start_token, end_token]), offsets[i][start_token][0], offsets[i][end_token][1]))
+        return spans
+
+    def read_batch(self, questions: List[str], contexts: List[List[str]]) -> List[Optional[ReaderAnswer]]:
+        """Best answer for each question over its own list of chunks (None if it has no chunks)."""
+        best: List[Optional[ReaderAnswer]] = [None] * len(questions)
+        most_chunks = max((len(chunks) for chunks in contexts), default=0)
+        step = self.chunks_per_pass or max(most_chunks, 1)
+
+        for offset in range(0, most_chunks, step):
+            pairs = [
+                (qi, ci)
+                for qi, chunks in enumerate(contexts)
+                if not self._is_confident(best[qi])
+                for ci in range(offset, min(offset + step, len(chunks)))
+            ]
+            if not pairs:
+                break
+            for batch_start in range(0, len(pairs), self.batch_size):
+                batch = pairs[batch_start:batch_start + self.batch_size]
+                spans = self._score_pairs(
+                    [questions[qi] for qi, _ in batch],
+                    [contexts[qi][ci] for qi, ci in batch]
+                )
+                for (qi, ci), (score, start, end) in zip(batch, spans):
+                    if best[qi] is None or score > best[qi].score:
+                        best[qi] = ReaderAnswer(contexts[qi][ci][start:end], score, ci, start, end)
+        return best
+
+    def read(self, question: str, chunks: List[str]) -> Optional[ReaderAnswer]:
+        return self.read_batch([question], [chunks])[0]
+
+    def _is_confident(self, answer: Optional[ReaderAnswer]) -> bool:
+        return self.confident_score is not None and answer is not None and answer.score >= self.confident_score
+
+
+class GenerativeReader:
+    """
+    Generative QA over retrieved chunks with a small seq2seq (e.g. flan-t5-small) or
+    causal LM. The chunks are joined into one prompt, cut to `max_input_tokens`, and
+    the answer is decoded greedily with the KV cache on and at most `max_new_tokens`
+    new tokens, which bounds CPU latency. `stream` yields text as it is generated.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        max_new_tokens: int = 64,
+        max_input_tokens: int = 512,
+        lock: Optional[threading.Lock] = None
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.max_input_tokens = max_input_tokens
+        # Held while the model or tokenizer runs; pass the registry's inference_lock when they are shared
+        self.lock = lock or threading.Lock()
+        self.is_encoder_decoder = bool(getattr(model.config, "is_encoder_decoder", False))
+        if not self.is_encoder_decoder:
+            # Decoder-only models continue the prompt, so batches must be padded on the left
+            tokenizer.padding_side = "left"
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.device = model.device
+
+    def build_prompt(self, question: str, chunks: List[str]) -> str:
+        """Instruction prompt; the context is trimmed so the question and answer cue always fit."""
+        head = "Answer the question using only the context.\n\nContext: "
+        tail = f"\n\nQuestion: {question}\nAnswer:"
+        fixed = len(self.tokenizer(head + tail, add_special_tokens=True)["input_ids"])
+        context_ids = self.tokenizer(
+            "\n\n".join(chunks),
+            add_special_tokens=False,
+            truncation=True,
+            max_length=max(self.max_input_tokens - fixed, 1)
+        )["input_ids"]
+        return head + self.tokenizer.decode(context_ids, skip_special_tokens=True) + tail
+
+    def _generate_kwargs(self, prompts: List[str]) -> dict:
+        encoded = self.tokenizer(prompts, padding=True, truncation=True, max_length=self.max_input_tokens, return_tensors="pt")
+        return {
+            "input_ids": encoded["input_ids"].to(self.device),
+            "attention_mask": encoded["attention_mask"].to(self.device),
+            "max_new_tokens": self.max_new_tokens,
+            "do_sample": False,
+            "use_cache": True,
+            "pad_token_id": self.pad_token_id,
+        }
+
+    def generate_batch(self, questions: List[str], contexts: List[List[str]]) -> List[str]:
+        """Full answers for many questions in one generate call."""
+        with self.lock:
+            kwargs = self._generate_kwargs([self.build_prompt(q, chunks) for q, chunks in zip(questions, contexts)])
+            with torch.inference_mode():
+                output = self.model.generate(**kwargs)
+            if not self.is_encoder_decoder:
+                output = output[:, kwargs["input_ids"].shape[1]:] # drop the echoed prompt
+            texts = self.tokenizer.batch_decode(output, skip_special_tokens=True)
+        metrics = get_metrics()
+        metrics.inc("prompt_tokens_total", int(kwargs["attention_mask"].sum()))
+        metrics.inc("generated_tokens_total", int((output != self.pad_token_id).sum()))
+        return [text.strip() for text in texts]
+
+    def stream(self, question: str, chunks: List[str]) -> Iterator[str]:
+        """Yield the answer piece by piece while generate runs on a background thread."""
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        with self.lock:
+            kwargs = self._generate_kwargs([self.build_prompt(question, chunks)])
+        errors = []
+
+        def run():
+            try:
+                # The streamer decodes on this thread, inside generate
+                with self.lock, torch.inference_mode():
+                    self.model.generate(**kwargs, streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        for text in streamer:
+            if text:
+                yield text
+        thread.join()
+        if errors:
+            raise errors[0]
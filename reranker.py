@@ -0,0 +1,108 @@
+"""
+Cross-encoder re-ranking of retrieved chunks. The bi-encoder search fetches a wide
+candidate set cheaply; the cross-encoder then reads each (question, chunk) pair
+together and its relevance score picks the chunks handed to the reader.
+
+Scores are cached per (question, chunk) pair, so a repeated question or a chunk
+retrieved again for it costs nothing. The number of candidates scored per call is
+bounded by a latency budget, using the measured time per scored pair: as the CPU
+gets busier each pair takes longer and fewer candidates are scored.
+"""
+import threading
+import time
+from typing import Any, List, Optional
+
+import torch
+
+from query_cache import LRUCache
+
+
+class Reranker:
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        max_seq_len: int = 256,
+        batch_size: int = 64,
+        cache: Optional[LRUCache] = None,
+        name: str = "",
+        lock: Optional[threading.Lock] = None
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_seq_len = max_seq_len
+        self.batch_size = batch_size
+        self.cache = cache
+        # Part of every cache key, so rerankers with different models can share one cache
+        self.name = name
+        # PyTorch and optimum ONNX Runtime models both expose .device
+        self.device = model.device
+        # Held while the model runs; pass the registry's inference_lock when the model is shared
+        self.lock = lock or threading.Lock()
+        # Moving average of the wall time per scored pair; None until something is scored
+        self.seconds_per_pair: Optional[float] = None
+
+    def _score_pairs(self, questions: List[str], chunks: List[str]) -> List[float]:
+        """One forward pass over the pairs; returns the relevance logit of each."""
+        with self.lock:
+            encoded = self.tokenizer(
+                questions,
+                chunks,
+                truncation="only_second",
+                max_length=self.max_seq_len,
+                padding=True,
+                return_tensors="pt"
+            )
+            with torch.inference_mode():
+                logits = self.model(**{name: tensor.to(self.device) for name, tensor in encoded.items()}).logits
+        # MS MARCO cross-encoders have one relevance logit; two-label models put "relevant" last
+        return logits[:, -1].float().cpu().tolist()
+
+    def score(self, questions: List[str], candidates: List[List[str]]) -> List[List[float]]:
+        """Relevance of every candidate chunk to its question; only uncached pairs are run through the model."""
+        scores = [[None] * len(chunks) for chunks in candidates]
+        pending = []
+        for qi, (question, chunks) in enumerate(zip(questions, candidates)):
+            for ci, chunk in enumerate(chunks):
+                cached = self.cache.get((self.name, question, chunk)) if self.cache is not None else None
+                if cached is None:
+                    pending.append((qi, ci))
+                else:
+                    scores[qi][ci] = cached
+
+        for batch_start in range(0, len(pending), self.batch_size):
+            batch = pending[batch_start:batch_start + self.batch_size]
+            start = time.perf_counter()
+            batch_scores = self._score_pairs(
+                [questions[qi] for qi, _ in batch],
+                [candidates[qi][ci] for qi, ci in batch]
+            )
+            self._record_time((time.perf_counter() - start) / len(batch))
+            for (qi, ci), score in zip(batch, batch_scores):
+                scores[qi][ci] = score
+                if self.cache is not None:
+                    self.cache.put((self.name, questions[qi], candidates[qi][ci]), score)
+        return scores
+
+    def rerank(self, questions: List[str], candidates: List[List[str]], k: int) -> List[List[tuple[int, float]]]:
+        """The k best candidates per question as (index into its candidates, score), best first."""
+        return [
+            sorted(enumerate(chunk_scores), key=lambda pair: pair[1], reverse=True)[:k]
+            for chunk_scores in self.score(questions, candidates)
+        ]
+
+    def candidate_count(self, questions: int, max_candidates: int, budget_ms: Optional[float], min_candidates: int) -> int:
+        """
+        Candidates to fetch per question so that scoring `questions` questions' worth fits
+        in `budget_ms`, between `min_candidates` and `max_candidates`.
+        """
+        if budget_ms is None or self.seconds_per_pair is None:
+            return max_candidates
+        affordable = int(budget_ms / 1000 / (self.seconds_per_pair * max(questions, 1)))
+        return max(min_candidates, min(max_candidates, affordable))
+
+    def _record_time(self, seconds: float) -> None:
+        if self.seconds_per_pair is None:
+            self.seconds_per_pair = seconds
+        else:
+            self.seconds_per_pair = 0.8 * self.seconds_per_pair + 0.2 * seconds
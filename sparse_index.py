@@ -0,0 +1,181 @@
+"""
+BM25 keyword index over the chunks, for the exact tokens dense retrieval misses
+(part numbers, clause IDs). Postings are kept CSR-style in flat numpy arrays:
+for term t, rows[indptr[t]:indptr[t + 1]] are the chunk rows containing it and
+tfs[...] the matching term frequencies, i.e. about 6 bytes per (term, chunk) pair.
+
+Chunks are added in batches while a document is indexed; new postings are kept
+aside and merged into the arrays on the next search. Removed chunks are masked
+out; once more than `compact_ratio` of the rows are dead, the arrays are rebuilt
+without them (and without terms no live chunk uses), so add/remove cycles do not
+grow the index. Row numbers change then: a rows_for() mask is only valid until
+the next remove_document.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Words, plus compounds such as "PN-48213" or "4.2.1" kept whole
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased tokens; a compound token is emitted whole and as its parts."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-_./]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.terms: Dict[str, int] = {}
+        self.chunk_ids: List[str] = [] # row -> docstore ID ("<doc_id>:<n>")
+        self._doc_codes: Dict[str, int] = {}
+        self._row_doc = np.zeros(0, dtype=np.int32) # row -> document code
+        self._lengths = np.zeros(0, dtype=np.float32) # row -> tokens in the chunk
+        self._alive = np.zeros(0, dtype=bool)
+        # Frozen CSR postings
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.uint16)
+        # Postings added since the last freeze, as (term, row, tf) triples
+        self._pending: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str]) -> None:
+        counted = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            triples = []
+            lengths = []
+            doc_codes = []
+            start = len(self.chunk_ids)
+            for offset, (chunk_id, counts) in enumerate(zip(chunk_ids, counted)):
+                lengths.append(sum(counts.values()))
+                doc_codes.append(self._doc_codes.setdefault(chunk_id.rsplit(":", 1)[0], len(self._doc_codes)))
+                for term, tf in counts.items():
+                    term_id = self.terms.setdefault(term, len(self.terms))
+                    triples.append((term_id, start + offset, min(tf, 65535)))
+            self.chunk_ids.extend(chunk_ids)
+            self._row_doc = np.concatenate([self._row_doc, np.asarray(doc_codes, dtype=np.int32)])
+            self._lengths = np.concatenate([self._lengths, np.asarray(lengths, dtype=np.float32)])
+            self._alive = np.concatenate([self._alive, np.ones(len(lengths), dtype=bool)])
+            if triples:
+                self._pending.append(np.asarray(triples, dtype=np.int64))
+
+    def remove_document(self, doc_id: str) -> None:
+        code = self._doc_codes.get(doc_id)
+        if code is not None:
+            with self._lock:
+                self._alive &= self._row_doc != code
+                dead = len(self._alive) - int(self._alive.sum())
+                if dead > self.compact_ratio * len(self._alive):
+                    self._compact()
+
+    def _freeze(self) -> None:
+        """Merge pending postings into the CSR arrays; call with the lock held."""
+        if not self._pending:
+            return
+        counts = np.diff(self._indptr)
+        old_terms = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+        pending = np.concatenate(self._pending)
+        terms = np.concatenate([old_terms, pending[:, 0]])
+        rows = np.concatenate([self._rows, pending[:, 1].astype(np.int32)])
+        tfs = np.concatenate([self._tfs, pending[:, 2].astype(np.uint16)])
+        order = np.lexsort((rows, terms))
+        self._rows = rows[order]
+        self._tfs = tfs[order]
+        self._indptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.terms)), out=self._indptr[1:])
+        self._pending = []
+
+    def _compact(self) -> None:
+        """Drop the dead rows, and the terms only they used, from every array; call with the lock held."""
+        self._freeze()
+        keep_rows = np.flatnonzero(self._alive)
+        new_row = np.full(len(self._alive), -1, dtype=np.int64)
+        new_row[keep_rows] = np.arange(len(keep_rows))
+        terms = np.repeat(np.arange(len(self.terms), dtype=np.int64), np.diff(self._indptr))
+        keep = self._alive[self._rows]
+        terms, rows, tfs = terms[keep], new_row[self._rows[keep]], self._tfs[keep]
+        # Postings stay sorted by (term, row): both renumberings keep the order
+        used = np.bincount(terms, minlength=len(self.terms)) > 0
+        new_term = np.cumsum(used) - 1
+        self.terms = {term: int(new_term[term_id]) for term, term_id in self.terms.items() if used[term_id]}
+        terms = new_term[terms]
+        self._rows = rows.astype(np.int32)
+        self._tfs = tfs
+        self._indptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.terms)), out=self._indptr[1:])
+
+        self.chunk_ids = [self.chunk_ids[row] for row in keep_rows]
+        codes, row_doc = np.unique(self._row_doc[keep_rows], return_inverse=True)
+        old_codes = {code: doc_id for doc_id, code in self._doc_codes.items()}
+        self._doc_codes = {old_codes[int(code)]: new_code for new_code, code in enumerate(codes)}
+        self._row_doc = row_doc.astype(np.int32)
+        self._lengths = self._lengths[keep_rows]
+        self._alive = np.ones(len(keep_rows), dtype=bool)
+
+    def rows_for(self, doc_ids: Sequence[str]) -> np.ndarray:
+        """Boolean mask of the rows belonging to `doc_ids`."""
+        codes = [self._doc_codes[doc_id] for doc_id in doc_ids if doc_id in self._doc_codes]
+        return np.isin(self._row_doc, np.asarray(codes, dtype=np.int32))
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[List[tuple[str, float]]]:
+        """Top-k (chunk ID, BM25 score) per query, best first; only chunks with a matching term."""
+        with self._lock:
+            self._freeze()
+            alive = self._alive if allowed is None else self._alive & allowed[:len(self._alive)]
+            n_alive = int(self._alive.sum())
+            if n_alive == 0:
+                return [[] for _ in queries]
+            avg_length = float(self._lengths[self._alive].mean()) or 1.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths / avg_length)
+
+            results = []
+            for query in queries:
+                scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+                for term in set(tokenize(query)):
+                    term_id = self.terms.get(term)
+                    if term_id is None or term_id + 1 >= len(self._indptr):
+                        continue
+                    lo, hi = self._indptr[term_id], self._indptr[term_id + 1]
+                    rows, tfs = self._rows[lo:hi], self._tfs[lo:hi]
+                    keep = self._alive[rows]
+                    rows, tfs = rows[keep], tfs[keep].astype(np.float32)
+                    if len(rows) == 0:
+                        continue
+                    idf = math.log(1 + (n_alive - len(rows) + 0.5) / (len(rows) + 0.5))
+                    scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+                scores[~alive] = 0
+                top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+                top = top[np.argsort(-scores[top], kind="stable")]
+                results.append([(self.chunk_ids[row], float(scores[row])) for row in top if scores[row] > 0])
+            return results
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, rrf_k: int = 60) -> List[tuple[str, float]]:
+    """Merge ranked ID lists by sum of 1 / (rrf_k + rank); returns the top k (ID, score), best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
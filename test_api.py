@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+import api
+from benchmarks.common import make_synthetic_pdf
+from conftest import CountingEncoder, upload_pdf
+
+
+@pytest.fixture
+def client(make_qa_chain):
+    app = api.create_app(make_qa_chain, workers=2, max_pending=4)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_ingest_ask_and_delete(client):
+    assert client.post("/ask", json={"question": "what is it?"}).status_code == 409
+
+    job = upload_pdf(client)
+    assert job["status"] == "done" and job["chunks_done"] > 0
+    assert [doc["doc_id"] for doc in client.get("/documents").json()["documents"]] == [job["doc_id"]]
+
+    answer = client.post("/ask", json={"question": "what is the hub?", "doc_ids": [job["doc_id"]]}).json()
+    assert answer["answer"] == "hub?"
+    assert len(answer["source_documents"]) == 3
+
+    batch = client.post("/ask/batch", json={"questions": ["first one", "second two"]}).json()["results"]
+    assert [result["answer"] for result in batch] == ["one", "two"]
+
+    assert client.delete(f"/documents/{job['doc_id']}").status_code == 200
+    assert client.delete(f"/documents/{job['doc_id']}").status_code == 404
+    assert client.get("/documents").json()["documents"] == []
+
+
+def test_full_queue_is_rejected_with_503():
+    executor = api.BoundedExecutor(workers=1, max_pending=2)
+
+    async def flood():
+        return await asyncio.gather(*(executor.run(time.sleep, 0.2) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(flood())
+    assert sum(isinstance(result, api.Overloaded) for result in results) == 1
+    executor.shutdown()
+
+
+def test_metrics_endpoint(client):
+    upload_pdf(client)
+    client.post("/ask", json={"question": "what is the hub?"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert 'pdf_qa_cache_misses_total{cache="answer"}' in response.text
+    assert "pdf_qa_microbatch_questions_total" in response.text
+
+
+def test_questions_only_run_on_the_batcher_thread(make_qa_chain, qa_pipeline, monkeypatch):
+    threads = set()
+    answer = qa_pipeline.__call__
+
+    def record_thread(pipeline, inputs, **kwargs):
+        threads.add(threading.current_thread().name)
+        return answer(inputs, **kwargs)
+
+    monkeypatch.setattr(type(qa_pipeline), "__call__", record_thread)
+    # max_batch_size 1 turns batching off, but not the single inference thread
+    app = api.create_app(make_qa_chain, workers=4, max_pending=8, max_batch_size=1)
+    with TestClient(app) as client:
+        upload_pdf(client)
+        threads.clear()  # warm-up ran at startup, before any request
+        assert client.post("/ask", json={"question": "what is the hub?"}).json()["answer"] == "hub?"
+        batch = client.post("/ask/batch", json={"questions": ["first one", "second two"]}).json()["results"]
+        assert [result["answer"] for result in batch] == ["one", "two"]
+
+    assert threads == {"micro-batcher"}
+
+
+def test_uploads_are_ingested_one_at_a_time(make_qa_chain, monkeypatch, tmp_path):
+    # Block every embedding call after the first, so the first upload stalls after one batch
+    release = threading.Event()
+    encode = CountingEncoder.encode
+    calls = []
+
+    def stall_after_first_batch(encoder, sentences, **kwargs):
+        calls.append(len(sentences))
+        if len(calls) > 1:
+            release.wait(timeout=30)
+        return encode(encoder, sentences, **kwargs)
+
+    monkeypatch.setattr(CountingEncoder, "encode", stall_after_first_batch)
+
+    def make_chain():
+        qa = make_qa_chain()
+        qa.doc_processor.embed_batch_size = 8
+        return qa
+
+    app = api.create_app(make_chain, workers=2, max_pending=4, warm_up=False)
+    with TestClient(app) as client:
+        job_ids = []
+        for i in range(2):
+            path = make_synthetic_pdf(str(tmp_path / f"{i}.pdf"), pages=10, seed=i)
+            with open(path, "rb") as f:
+                job_ids.append(client.post("/documents", files={"file": (f"{i}.pdf", f, "application/pdf")}).json()["job_id"])
+
+        for _ in range(600):
+            documents = client.get("/documents").json()["documents"]
+            if documents:
+                break
+            time.sleep(0.05)
+        first_doc = documents[0]["doc_id"]
+        assert client.get(f"/jobs/{job_ids[1]}").json()["status"] == "queued"
+
+        # Deleted while it is still being ingested: it stays deleted
+        assert client.delete(f"/documents/{first_doc}").status_code == 200
+        release.set()
+        jobs = []
+        for job_id in job_ids:
+            for _ in range(600):
+                job = client.get(f"/jobs/{job_id}").json()
+                if job["status"] in ("done", "failed", "cancelled"):
+                    break
+                time.sleep(0.05)
+            jobs.append(job)
+
+        assert [job["status"] for job in jobs] == ["cancelled", "done"]
+        documents = client.get("/documents").json()["documents"]
+        assert [doc["doc_id"] for doc in documents] == [jobs[1]["doc_id"]]
+        assert app.state.qa_chain.vector_store.index.ntotal == documents[0]["chunks"]
+        assert client.delete(f"/documents/{jobs[1]['doc_id']}").status_code == 200
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import torch
+
+from conftest import CHUNKS, CountingEncoder, tiny_qa_model
+from inference_backends import EncoderEmbeddings, check_backend, quantize_int8
+from model_registry import ModelRegistry
+from reader import ExtractiveReader
+
+QUESTIONS = [
+    "What is Hugging Face known for?",
+    "Which libraries does Hugging Face provide?",
+    "What did Hugging Face start as?",
+]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        check_backend("tensorrt")
+    with pytest.raises(ValueError):
+        ModelRegistry(backend="fp8")
+
+
+def test_int8_quantization_keeps_logits_close(tmp_path):
+    model, tokenizer = tiny_qa_model(tmp_path)
+    quantized = quantize_int8(model)
+    inputs = tokenizer(["how long do refunds take?"], [CHUNKS[0]], return_tensors="pt")
+    inputs.pop("token_type_ids", None)
+
+    with torch.inference_mode():
+        reference = model(**inputs).start_logits.flatten()
+        result = quantized(**inputs).start_logits.flatten()
+
+    assert torch.nn.functional.cosine_similarity(reference, result, dim=0) > 0.98
+    assert ExtractiveReader(quantized, tokenizer, max_seq_len=64).read("how long do refunds take?", CHUNKS)
+
+
+def test_encoder_embeddings_flattens_newlines_like_huggingface_embeddings():
+    embeddings = EncoderEmbeddings(CountingEncoder())
+
+    embeddings.embed_documents(["line one\nline two"])
+    embeddings.embed_query("a\nquestion")
+
+    assert embeddings.client.encoded_texts == ["line one line two", "a question"]
+
+
+def _token_f1(a: str, b: str) -> float:
+    a_tokens, b_tokens = a.lower().split(), b.lower().split()
+    common = sum(min(a_tokens.count(t), b_tokens.count(t)) for t in set(a_tokens))
+    if not common:
+        return 0.0
+    precision, recall = common / len(a_tokens), common / len(b_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _load_or_skip(backend):
+    if backend == "onnx":
+        pytest.importorskip("optimum.onnxruntime")
+    registry = ModelRegistry(backend=backend)
+    try:
+        return registry.get_embeddings(), registry.get_qa_pipeline()
+    except OSError as e:
+        pytest.skip(f"models unavailable: {e}")
+
+
+@pytest.mark.parametrize("backend", ["torch-int8", "onnx"])
+def test_backend_parity_with_fp32(backend):
+    reference_embeddings, reference_qa = _load_or_skip("torch")
+    embeddings, qa = _load_or_skip(backend)
+    from document_processor import DocumentProcessor
+
+    chunks = DocumentProcessor(embedder=reference_embeddings.client).process_pdf("sample.pdf")[1]
+
+    expected = np.asarray(reference_embeddings.embed_documents(chunks))
+    actual = np.asarray(embeddings.embed_documents(chunks))
+    cosine = (expected * actual).sum(axis=1) / (np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    assert cosine.min() > 0.98
+
+    context = "\n\n".join(chunks)
+    overlaps = [
+        _token_f1(reference_qa({"question": q, "context": context})["answer"], qa({"question": q, "context": context})["answer"])
+        for q in QUESTIONS
+    ]
+    assert sum(overlaps) / len(overlaps) >= 0.8
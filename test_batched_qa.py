@@ -0,0 +1,34 @@
+def test_generate_sends_prompts_as_one_batch(qa_chain, qa_pipeline):
+    prompts = [f"context:\nsome text\n\nQuestion: what about item{i}\nHelpful Answer:" for i in range(5)]
+
+    result = qa_chain.llm._generate(prompts)
+
+    assert qa_pipeline.calls == [5]
+    assert [g[0].text for g in result.generations] == [f"item{i}" for i in range(5)]
+
+
+def test_batch_errors_map_back_to_their_prompt(qa_chain):
+    answers = qa_chain.llm.answer_batch([
+        {"question": "first one", "context": "x"},
+        {"question": "boom", "context": "x"},
+        {"question": "", "context": "x"},
+        {"question": "last one", "context": "x"},
+    ])
+
+    assert answers[0] == "one"
+    assert answers[1].startswith("An internal error occurred: bad input")
+    assert answers[2] == "I couldn't identify a clear question to answer."
+    assert answers[3] == "one"
+
+
+def test_ask_questions_batches_retrieval_and_answering(qa_chain, qa_pipeline):
+    encoder = qa_chain.embeddings.client
+    encoder.encoded_texts.clear()
+    questions = [f"question number {i}" for i in range(10)]
+
+    results = qa_chain.ask_questions(questions)
+
+    assert len(encoder.encoded_texts) == len(questions)
+    assert qa_pipeline.calls == [len(questions)]
+    assert [r["answer"] for r in results] == [str(i) for i in range(10)]
+    assert all(1 <= len(r["source_documents"]) <= qa_chain.top_k for r in results)
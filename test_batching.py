@@ -0,0 +1,67 @@
+import threading
+
+from batching import MicroBatcher
+
+
+def test_concurrent_questions_share_one_batch(qa_chain, qa_pipeline):
+    encoder = qa_chain.embeddings.client
+    encoder.encoded_texts.clear()
+    batcher = MicroBatcher(qa_chain, max_batch_size=8, max_wait_ms=500)
+    answers = {}
+    start = threading.Barrier(8)
+
+    def client(i):
+        start.wait()
+        answers[i] = batcher.ask(f"what about item{i}")["answer"]
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert answers == {i: f"item{i}" for i in range(8)}
+    assert batcher.batches == 1 and batcher.mean_batch_size == 8
+    assert qa_pipeline.calls == [8]
+    assert len(encoder.encoded_texts) == 8
+
+
+def test_document_filters_are_batched_separately(qa_chain):
+    doc_id = qa_chain.list_documents()[0]["doc_id"]
+    batcher = MicroBatcher(qa_chain, max_batch_size=8, max_wait_ms=200)
+
+    futures = [batcher.submit("first one"), batcher.submit("second two", doc_ids=[doc_id]), batcher.submit("third three")]
+    results = [future.result(timeout=10) for future in futures]
+    batcher.close()
+
+    assert [result["answer"] for result in results] == ["one", "two", "three"]
+    assert batcher.batches == 2
+
+
+def test_question_lists_join_the_batch_and_get_their_own_answers(qa_chain, qa_pipeline):
+    batcher = MicroBatcher(qa_chain, max_batch_size=8, max_wait_ms=200)
+
+    first = batcher.submit("first one")
+    listed = batcher.submit_batch(["second two", "third three"])
+    last = batcher.submit("fourth four")
+    results = first.result(timeout=10), listed.result(timeout=10), last.result(timeout=10)
+    batcher.close()
+
+    assert results[0]["answer"] == "one" and results[2]["answer"] == "four"
+    assert [result["answer"] for result in results[1]] == ["two", "three"]
+    assert batcher.batches == 1 and qa_pipeline.calls == [4]
+
+
+def test_cancelled_question_does_not_stop_the_dispatcher(qa_chain, qa_pipeline):
+    batcher = MicroBatcher(qa_chain, max_batch_size=8, max_wait_ms=200)
+
+    cancelled = batcher.submit("first one")
+    assert cancelled.cancel()
+    answered = batcher.submit("second two")
+    assert answered.result(timeout=10)["answer"] == "two"
+    assert batcher.submit("third three").result(timeout=10)["answer"] == "three"
+    batcher.close()
+
+    # The cancelled question was dropped before it reached the models
+    assert "first one" not in [item["question"] for item in qa_pipeline.inputs]
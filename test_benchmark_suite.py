@@ -0,0 +1,36 @@
+import copy
+
+from benchmarks.suite import find_regressions
+
+
+def _report(p95_ms=10.0, throughput=100.0, rss=500.0):
+    return {
+        "runs": [{
+            "pages": 50,
+            "peak_rss_mb": rss,
+            "stages": {
+                "retrieve": {"wall_s": 0.5, "throughput": throughput, "p50_ms": 5.0, "p95_ms": p95_ms, "p99_ms": 20.0},
+                "chunking": {"wall_s": 0.0002, "throughput": 5000.0},
+            },
+        }],
+    }
+
+
+def test_only_changes_beyond_tolerance_are_regressions():
+    baseline = _report()
+    assert find_regressions(_report(p95_ms=12.0, throughput=90.0), baseline, tolerance=0.25) == []
+
+    regressions = find_regressions(_report(p95_ms=14.0, throughput=70.0, rss=700.0), baseline, tolerance=0.25)
+    assert {(r["stage"], r["metric"]) for r in regressions} == {
+        ("retrieve", "p95_ms"), ("retrieve", "throughput"), ("all", "peak_rss_mb")
+    }
+
+
+def test_noise_on_fast_stages_is_ignored():
+    baseline = _report(p95_ms=0.2)
+    current = copy.deepcopy(_report(p95_ms=0.6))
+    current["runs"][0]["stages"]["chunking"]["throughput"] = 1000.0
+    assert find_regressions(current, baseline, tolerance=0.25, slack_ms=1.0) == []
+    # Runs of a size the baseline does not have are not compared
+    current["runs"][0]["pages"] = 500
+    assert find_regressions(_report(), current) == []
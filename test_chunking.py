@@ -0,0 +1,82 @@
+import fitz
+from transformers import BertTokenizerFast
+
+from benchmarks.common import make_synthetic_pdf
+from chunking import TokenChunker
+from conftest import CountingEncoder
+from document_processor import DocumentProcessor
+from pdf_extraction import iter_pages_serial
+
+WORDS = (
+    "the policy refund customer warranty section clause invoice part number shipping "
+    "period days within product service agreement terms payment account order return "
+    "manual device installation safety notice maintenance schedule report data value "
+    "applies to pn returns overview"
+).split()
+
+
+def word_tokenizer(tmp_path):
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", "-", *[str(d) for d in range(10)], *WORDS]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+    return BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True)
+
+
+def make_sectioned_pdf(path):
+    """Two pages, each with a large-font heading followed by body paragraphs."""
+    doc = fitz.open()
+    for title, body in (("Returns", "refund policy"), ("Warranty", "warranty service")):
+        page = doc.new_page()
+        page.insert_text((40, 60), f"{title} overview", fontsize=18)
+        text = " ".join([f"The {body} applies within days of the order."] * 40)
+        page.insert_textbox(fitz.Rect(40, 90, 560, 800), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+class TokenizingEncoder(CountingEncoder):
+    def __init__(self, tokenizer, max_seq_length):
+        super().__init__()
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+
+
+def test_headings_are_detected_by_font_size(tmp_path):
+    pages = list(iter_pages_serial(make_sectioned_pdf(str(tmp_path / "doc.pdf")), layout=True))
+    assert [[block.text for block in blocks if block.heading] for blocks in pages] == [["Returns overview"], ["Warranty overview"]]
+
+
+def test_chunks_fit_the_token_budget_and_slice_their_pages(tmp_path):
+    tokenizer = word_tokenizer(tmp_path)
+    chunker = TokenChunker(tokenizer, max_tokens=40, overlap_tokens=12)
+    pages = list(iter_pages_serial(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=5), layout=True))
+    page_texts = ["\n".join(block.text for block in blocks) for blocks in pages]
+
+    chunks = list(chunker.iter_chunks(pages))
+
+    assert len(chunks) > 5
+    for text, location in chunks:
+        assert len(tokenizer(text, add_special_tokens=False)["input_ids"]) <= 40
+        first_page = page_texts[location["page"] - 1]
+        assert first_page[location["offset"]:].startswith(text.split("\n")[0])
+    # Every sentence of the document is in some chunk
+    covered = " ".join(text for text, _ in chunks)
+    assert all(block.text.split(".")[0] in covered for blocks in pages for block in blocks)
+
+
+def test_sections_start_new_chunks(tmp_path):
+    encoder = TokenizingEncoder(word_tokenizer(tmp_path), max_seq_length=66)
+    processor = DocumentProcessor(embedder=encoder, chunking="tokens")
+    assert processor.chunk_tokens == 64
+
+    processor.process_pdf(make_sectioned_pdf(str(tmp_path / "doc.pdf")))
+
+    assert processor.text_chunks[0].startswith("Returns overview")
+    sections = [location["section"] for location in processor.chunk_locations]
+    assert sections == sorted(sections, key=["Returns overview", "Warranty overview"].index)
+    warranty = sections.index("Warranty overview")
+    assert processor.text_chunks[warranty].startswith("Warranty overview")
+    assert processor.chunk_locations[warranty]["page"] == 2
+    # No chunk mixes the two sections
+    assert not any("warranty service" in text for text in processor.text_chunks[:warranty])
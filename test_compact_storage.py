@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from benchmarks.common import make_synthetic_pdf
+from compact_storage import ChunkTexts, CompactVectors
+from index_cache import IndexCache
+from vector_index import ChunkDocstore, build_index
+
+
+def _vectors(n, dim=32):
+    return np.random.default_rng(0).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_chunk_texts_round_trip_through_a_memory_map(tmp_path):
+    texts = ["plain", "", "naïve café – ünïcode", "x" * 5000]
+    packed = ChunkTexts.concat([ChunkTexts.from_texts(texts[:2]), ChunkTexts.from_texts(texts[2:])])
+    assert list(packed) == texts
+    assert packed[-1] == texts[-1] and packed[1:3] == texts[1:3]
+
+    packed.save(str(tmp_path))
+    loaded = ChunkTexts.load(str(tmp_path))
+    assert isinstance(loaded.buffer, np.memmap)
+    assert list(loaded) == texts
+    with pytest.raises(IndexError):
+        loaded[len(texts)]
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0.0), ("float16", 0.002), ("int8", 0.02)])
+def test_compact_vectors_decode_close_to_the_originals(tmp_path, dtype, tolerance):
+    vectors = _vectors(100)
+    parts = [CompactVectors.encode(vectors[:40], dtype), CompactVectors.encode(vectors[40:], dtype)]
+    compact = CompactVectors.concat(parts)
+    assert compact.dtype == dtype
+    assert compact.nbytes <= vectors.nbytes * {"float32": 1, "float16": 0.5, "int8": 0.3}[dtype]
+
+    compact.save(str(tmp_path))
+    loaded = CompactVectors.load(str(tmp_path))
+    assert isinstance(loaded.codes, np.memmap)
+    error = np.abs(np.asarray(loaded) - vectors).max() / np.abs(vectors).max()
+    assert error <= tolerance
+
+
+@pytest.mark.parametrize("vector_dtype", ["float16", "int8"])
+def test_compact_indexes_find_exact_matches(vector_dtype):
+    vectors = _vectors(5000)
+    for index_type in ("flat", "ivf", "hnsw"):
+        index = build_index(index_type, vectors, vector_dtype=vector_dtype)
+        index.add(vectors)
+        _, found = index.search(vectors[:50], 1)
+        assert (found[:, 0] == np.arange(50)).mean() >= 0.95, index_type
+
+
+def test_docstore_builds_documents_on_demand():
+    docstore = ChunkDocstore()
+    docstore.add_chunks("a", "a.pdf", 0, ["one", "two"], [{"page": 1}, {"page": 2}])
+    docstore.add_chunks("a", "a.pdf", 2, ["three"], [{"page": 2}])
+    docstore.add_chunks("b", "b.pdf", 0, ["other"], [{"page": 1}])
+
+    doc = docstore.search("a:2")
+    assert doc.page_content == "three"
+    assert doc.metadata == {"doc_id": "a", "source": "a.pdf", "page": 2}
+    assert docstore.search("a:3") == "ID a:3 not found."
+
+    docstore.delete(["a:0", "a:1", "a:2"])
+    assert isinstance(docstore.search("a:0"), str)
+    assert docstore.search("b:0").page_content == "other"
+
+
+@pytest.mark.parametrize("vector_dtype", ["float16", "int8"])
+def test_compact_corpus_retrieves_like_float32(make_qa_chain, tmp_path, vector_dtype):
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=10)
+    questions = ["what does the warranty cover?", "how long do refunds take?", "where is the serial number?"]
+    reference = make_qa_chain()
+    reference.load_document(pdf_path)
+    compact = make_qa_chain(vector_dtype=vector_dtype)
+    compact.load_document(pdf_path)
+
+    assert compact.doc_processor.embeddings.dtype == vector_dtype
+    assert list(compact.doc_processor.text_chunks) == list(reference.doc_processor.text_chunks)
+    expected = [[doc.page_content for doc, _ in hits] for hits in reference._retrieve_batch(questions, k=3)]
+    found = [[doc.page_content for doc, _ in hits] for hits in compact._retrieve_batch(questions, k=3)]
+    assert [hits[0] for hits in found] == [hits[0] for hits in expected]
+
+
+def test_cached_document_is_served_from_the_cache_files(make_qa_chain, tmp_path):
+    cache = IndexCache(cache_dir=str(tmp_path / "cache"))
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=5)
+    first = make_qa_chain(index_cache=cache, vector_dtype="float16")
+    first.load_document(pdf_path)
+    # Even the session that built the entry switches to its memory-mapped pages
+    assert isinstance(first.doc_processor.text_chunks.buffer, np.memmap)
+
+    second = make_qa_chain(index_cache=cache, vector_dtype="float16")
+    second.load_document(pdf_path)
+    assert cache.stats()["hits"] == 1
+    assert isinstance(second.doc_processor.embeddings.codes, np.memmap)
+    doc, _ = second._retrieve_batch(["refund"], k=1)[0][0]
+    assert doc.page_content in list(first.doc_processor.text_chunks)
+    assert {"doc_id", "source", "page"} <= set(doc.metadata)
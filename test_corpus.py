@@ -0,0 +1,68 @@
+import pytest
+
+from benchmarks.common import make_synthetic_pdf
+from index_cache import IndexCache
+
+
+@pytest.fixture
+def qa(make_qa_chain, tmp_path):
+    return make_qa_chain(index_cache=IndexCache(str(tmp_path / "cache")))
+
+
+def _pdfs(tmp_path, count):
+    return [make_synthetic_pdf(str(tmp_path / f"doc{i}.pdf"), pages=4, seed=i) for i in range(count)]
+
+
+def _doc_ids(hits):
+    return {doc.metadata["doc_id"] for doc, _ in hits}
+
+
+def test_documents_are_added_and_removed_incrementally(qa, tmp_path):
+    first, second, third = _pdfs(tmp_path, 3)
+    a = qa.add_document(first, doc_id="a")
+    b = qa.add_document(second, doc_id="b")
+    qa.add_document(third, doc_id="c")
+    sizes = {d["doc_id"]: d["chunks"] for d in qa.list_documents()}
+    assert qa.vector_store.index.ntotal == sum(sizes.values())
+
+    encoded_before = len(qa.embeddings.client.encoded_texts)
+    qa.remove_document(b)
+
+    assert qa.vector_store.index.ntotal == sizes["a"] + sizes["c"]
+    assert len(qa.embeddings.client.encoded_texts) == encoded_before
+    hits = qa._retrieve_batch(["refund policy"], k=50)[0]
+    assert _doc_ids(hits) == {"a", "c"}
+    with pytest.raises(KeyError):
+        qa.remove_document(b)
+
+    qa.remove_document(a)
+    qa.remove_document("c")
+    assert qa.vector_store is None
+    assert qa.ask_question("anything")["error"]
+
+
+def test_queries_can_be_filtered_to_documents(qa, tmp_path):
+    paths = _pdfs(tmp_path, 3)
+    ids = [qa.add_document(path, name=f"policy {i}.pdf") for i, path in enumerate(paths)]
+
+    hits = qa._retrieve_batch(["warranty clause"], k=5, doc_ids=[ids[1]])[0]
+    assert hits and _doc_ids(hits) == {ids[1]}
+    assert all(doc.metadata["source"] == "policy 1.pdf" for doc, _ in hits)
+
+    allowed = [ids[0], ids[2]]
+    assert _doc_ids(qa._retrieve_batch(["refund"], k=10, doc_ids=allowed)[0]) <= set(allowed)
+    assert all(r["source_documents"] for r in qa.ask_questions(["warranty clause", "refund"], doc_ids=allowed))
+
+
+def test_cached_document_is_added_without_encoding(qa, tmp_path):
+    first, second = _pdfs(tmp_path, 2)
+    qa.add_document(first)
+    qa.load_document(second)
+    encoded_before = len(qa.embeddings.client.encoded_texts)
+
+    doc_id = qa.add_document(first)
+
+    assert len(qa.embeddings.client.encoded_texts) == encoded_before
+    assert qa.index_cache.hits == 1
+    assert len(qa.documents) == 2 and doc_id in qa.documents
+    assert qa.vector_store.index.ntotal == sum(d["chunks"] for d in qa.list_documents())
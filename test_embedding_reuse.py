@@ -0,0 +1,26 @@
+import numpy as np
+import sentence_transformers
+
+from conftest import PDF_PATH, CountingEmbeddings
+
+
+def _fail_to_load(*args, **kwargs):
+    raise AssertionError("DocumentProcessor loaded its own SentenceTransformer")
+
+
+def test_each_chunk_is_encoded_once(monkeypatch, make_qa_chain):
+    # DocumentProcessor imports SentenceTransformer only when it has to load its own
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", _fail_to_load)
+
+    qa = make_qa_chain()
+    chunk_count = qa.load_document(PDF_PATH)
+
+    encoder = qa.embeddings.client
+    assert CountingEmbeddings.instances == 1
+    assert qa.doc_processor.embedder is encoder
+    assert len(encoder.encoded_texts) == chunk_count
+    assert qa.vector_store.index.ntotal == chunk_count
+
+    # The index holds exactly the vectors the processor produced
+    stored = qa.vector_store.index.reconstruct_n(0, chunk_count)
+    np.testing.assert_array_equal(stored, qa.doc_processor.embeddings)
@@ -0,0 +1,71 @@
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel, T5Config, T5ForConditionalGeneration
+
+import model_registry
+from conftest import CHUNKS, tiny_qa_model
+from reader import GenerativeReader
+
+
+def tiny_seq2seq(tmp_path):
+    """A randomly initialised T5 sharing the word-level vocab of tiny_qa_model, built offline."""
+    _, tokenizer = tiny_qa_model(tmp_path)
+    torch.manual_seed(0)
+    config = T5Config(
+        vocab_size=len(tokenizer), d_model=32, d_ff=64, d_kv=16, num_layers=1, num_heads=2,
+        pad_token_id=tokenizer.pad_token_id, decoder_start_token_id=tokenizer.pad_token_id, eos_token_id=None
+    )
+    model = T5ForConditionalGeneration(config).eval()
+    # Keep the untrained model from emitting special tokens, which decode to nothing
+    model.generation_config.suppress_tokens = tokenizer.all_special_ids
+    return model, tokenizer
+
+
+def test_stream_matches_batch_generation_and_respects_budget(tmp_path):
+    model, tokenizer = tiny_seq2seq(tmp_path)
+    reader = GenerativeReader(model, tokenizer, max_new_tokens=6, max_input_tokens=48)
+
+    pieces = list(reader.stream("how long do refunds take?", CHUNKS))
+    batch = reader.generate_batch(["how long do refunds take?"], [CHUNKS])
+
+    assert len(pieces) > 1
+    assert "".join(pieces).strip() == batch[0]
+    assert len(tokenizer(batch[0], add_special_tokens=False)["input_ids"]) <= 6
+
+
+def test_prompt_keeps_the_question_when_context_is_long(tmp_path):
+    model, tokenizer = tiny_seq2seq(tmp_path)
+    reader = GenerativeReader(model, tokenizer, max_input_tokens=40)
+
+    prompt = reader.build_prompt("what does the warranty cover?", CHUNKS)
+
+    assert prompt.endswith("Question: what does the warranty cover?\nAnswer:")
+    assert len(tokenizer(prompt)["input_ids"]) <= 40
+
+
+def test_causal_models_return_only_new_tokens(tmp_path):
+    _, tokenizer = tiny_qa_model(tmp_path)
+    torch.manual_seed(0)
+    model = GPT2LMHeadModel(GPT2Config(vocab_size=len(tokenizer), n_embd=32, n_layer=1, n_head=2)).eval()
+    reader = GenerativeReader(model, tokenizer, max_new_tokens=4)
+
+    answers = reader.generate_batch(["how long?", "what does the warranty cover?"], [CHUNKS[:1], CHUNKS[1:2]])
+
+    assert all("question" not in answer for answer in answers)
+    assert all(len(tokenizer(a, add_special_tokens=False)["input_ids"]) <= 4 for a in answers)
+
+
+def test_qa_chain_streams_and_caches_generated_answers(monkeypatch, make_qa_chain, tmp_path):
+    model, tokenizer = tiny_seq2seq(tmp_path)
+    monkeypatch.setattr(model_registry, "load_generator", lambda *args, **kwargs: (model, tokenizer))
+    qa = make_qa_chain(reader_mode="generative")
+    qa.load_document("sample.pdf")
+    qa.reader.max_new_tokens = 5
+
+    streamed = qa.stream_answer("how long do refunds take?")
+    answer = "".join(streamed["answer_stream"]).strip()
+    replay = qa.stream_answer("how long do refunds take?")
+
+    assert qa.qa_pipeline is None # the extractive model is never loaded
+    assert len(streamed["source_documents"]) == 3
+    assert list(replay["answer_stream"]) == [answer]
+    assert qa.ask_question("how long do refunds take?")["answer"] == answer
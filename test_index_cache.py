@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.common import make_synthetic_pdf
+from conftest import PDF_PATH
+from index_cache import IndexCache
+from qa_chain import DocumentRemoved
+
+
+def test_known_document_is_loaded_from_cache(make_qa_chain, tmp_path):
+    cache = IndexCache(cache_dir=str(tmp_path))
+    first = make_qa_chain(index_cache=cache)
+    chunk_count = first.load_document(PDF_PATH)
+    assert cache.stats()["misses"] == 1
+
+    second = make_qa_chain(index_cache=cache)
+    assert second.load_document(PDF_PATH) == chunk_count
+    assert second.embeddings.client.encoded_texts == []
+    assert cache.stats()["hits"] == 1
+    assert second.document_hash == first.document_hash
+    assert isinstance(second.doc_processor.embeddings.codes, np.memmap)
+    assert isinstance(second.doc_processor.text_chunks.buffer, np.memmap)
+    np.testing.assert_array_equal(second.doc_processor.embeddings, first.doc_processor.embeddings)
+    assert second.vector_store.index.ntotal == chunk_count
+
+
+def test_key_depends_on_settings(tmp_path):
+    key = IndexCache.make_key(PDF_PATH, {"chunk_size": 1000})
+    assert key == IndexCache.make_key(PDF_PATH, {"chunk_size": 1000})
+    assert key != IndexCache.make_key(PDF_PATH, {"chunk_size": 500})
+
+
+def test_least_recently_used_entry_is_evicted(make_qa_chain, tmp_path):
+    cache = IndexCache(cache_dir=str(tmp_path))
+    qa = make_qa_chain(index_cache=cache)
+    qa.load_document(PDF_PATH)
+    entry_size = cache.stats()["bytes"]
+    vector_store = qa.vector_store
+    texts = qa.doc_processor.text_chunks
+    vectors = qa.doc_processor.embeddings
+
+    cache.max_bytes = entry_size * 2
+    cache.store("b" * 64, texts, vectors, vector_store)
+    # Make the original entry the most recently used one
+    time.sleep(0.01)
+    assert cache.load(qa.document_hash, qa.embeddings) is not None
+
+    cache.store("c" * 64, texts, vectors, vector_store)
+    remaining = set(os.listdir(tmp_path))
+    assert "b" * 64 not in remaining
+    assert {qa.document_hash, "c" * 64} <= remaining
+
+
+def test_concurrent_ingests_cache_only_their_own_chunks(make_qa_chain, tmp_path):
+    cache = IndexCache(cache_dir=str(tmp_path / "cache"))
+    qa = make_qa_chain(index_cache=cache)
+    qa.doc_processor.embed_batch_size = 8
+    paths = [make_synthetic_pdf(str(tmp_path / f"{name}.pdf"), pages=10, seed=i) for i, name in enumerate("ab")]
+    # Both ingests index their first batch before either finishes
+    barrier = threading.Barrier(2, timeout=30)
+
+    def ingest(path, doc_id):
+        def wait_for_the_other(progress):
+            if progress["chunks_done"] == 8:
+                barrier.wait()
+        qa.add_document(path, doc_id=doc_id, progress=wait_for_the_other)
+
+    threads = [threading.Thread(target=ingest, args=(path, doc_id)) for path, doc_id in zip(paths, "ab")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(qa.list_documents()) == 2
+    for doc in qa.list_documents():
+        cached = cache.load(doc["hash"], qa.embeddings)
+        ids = list(cached.vector_store.index_to_docstore_id.values())
+        assert ids == [f"{doc['doc_id']}:{i}" for i in range(doc["chunks"])]
+        assert cached.vector_store.docstore.search(ids[0]).page_content == cached.chunks[0]
+
+
+def test_entry_evicted_by_another_process_is_skipped(make_qa_chain, tmp_path, monkeypatch):
+    cache = IndexCache(cache_dir=str(tmp_path))
+    qa = make_qa_chain(index_cache=cache)
+    qa.load_document(PDF_PATH)
+    getsize = os.path.getsize
+
+    def evicted_meanwhile(path):
+        # Another worker removes the entry between listing and measuring it
+        cache.invalidate(qa.document_hash)
+        return getsize(path)
+
+    monkeypatch.setattr(os.path, "getsize", evicted_meanwhile)
+    assert cache.stats()["entries"] == 0
+
+
+def test_entry_evicted_during_load_is_a_miss(make_qa_chain, tmp_path, monkeypatch):
+    cache = IndexCache(cache_dir=str(tmp_path))
+    qa = make_qa_chain(index_cache=cache)
+    qa.load_document(PDF_PATH)
+
+    def evicted_meanwhile(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted_meanwhile)
+    assert cache.load(qa.document_hash, qa.embeddings) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_cached_document_takes_over_an_ingest_of_the_same_id(make_qa_chain, tmp_path):
+    cache = IndexCache(cache_dir=str(tmp_path / "cache"))
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=10)
+    make_qa_chain(index_cache=cache).add_document(pdf_path, doc_id="doc")
+    qa = make_qa_chain() # no cache, so the ingest reads the PDF
+    qa.doc_processor.embed_batch_size = 8
+    cache_key = IndexCache.make_key(pdf_path, qa.index_settings())
+
+    def sync_after_first_batch(progress):
+        # A worker syncing its corpus from the cache while it still ingests the same document
+        if progress["chunks_done"] == 8:
+            qa.index_cache = cache
+            qa.add_cached_document(cache_key, doc_id="doc")
+
+    with pytest.raises(DocumentRemoved):
+        qa.add_document(pdf_path, doc_id="doc", progress=sync_after_first_batch)
+
+    chunks = cache.load(cache_key, qa.embeddings).chunks
+    assert qa.documents["doc"]["chunks"] == len(chunks) == qa.vector_store.index.ntotal
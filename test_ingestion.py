@@ -0,0 +1,118 @@
+import shutil
+import threading
+
+import pytest
+
+from benchmarks.common import make_synthetic_pdf
+from index_cache import IndexCache
+from ingestion import IngestCancelled, IngestJob, IngestPool
+from qa_chain import DocumentRemoved
+
+
+@pytest.fixture
+def qa(make_qa_chain):
+    qa = make_qa_chain()
+    qa.doc_processor.embed_batch_size = 8
+    return qa
+
+
+def test_questions_are_answered_while_the_document_is_indexed(qa, tmp_path):
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=10)
+    seen = []
+
+    def on_progress(progress):
+        if not seen:
+            # Called from the ingesting thread after the first batch is searchable
+            seen.append((progress, qa.ask_question("what does clause one cover?")))
+
+    qa.load_document(pdf_path, progress=on_progress)
+
+    progress, partial = seen[0]
+    assert progress["chunks_done"] == 8
+    assert progress["pages_total"] == 10
+    assert "error" not in partial and 0 < len(partial["source_documents"]) <= 3
+    assert qa.list_documents()[0]["chunks"] > 8
+
+
+def test_pool_ingests_in_the_background_and_removes_the_upload(qa, tmp_path):
+    upload = str(tmp_path / "upload.pdf")
+    shutil.copy("sample.pdf", upload)
+    pool = IngestPool(workers=1)
+
+    job = pool.submit(qa, upload, name="sample.pdf", remove_file=True)
+    job.future.result(timeout=60)
+
+    assert job.status == "done" and job.fraction == 1.0
+    assert qa.list_documents()[0]["name"] == "sample.pdf"
+    assert job.chunks_done == qa.list_documents()[0]["chunks"]
+    assert not (tmp_path / "upload.pdf").exists()
+    pool.shutdown()
+
+
+def test_cancelled_job_leaves_the_corpus_alone(qa, tmp_path):
+    qa.load_document("sample.pdf")
+    pool = IngestPool(workers=1)
+    release = threading.Event()
+    pool._executor.submit(release.wait) # keep the only worker busy so the job stays queued
+
+    job = pool.submit(qa, make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=3))
+    job.cancel()
+    release.set()
+    job.future.result(timeout=60)
+
+    assert job.status == "cancelled"
+    assert [doc["name"] for doc in qa.list_documents()] == ["sample.pdf"]
+    pool.shutdown()
+
+
+def test_job_cancelled_during_a_cache_hit_is_removed(make_qa_chain, tmp_path):
+    cache = IndexCache(str(tmp_path / "cache"))
+    make_qa_chain(index_cache=cache).load_document("sample.pdf")
+    qa = make_qa_chain(index_cache=cache)
+    qa.load_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=3))
+    job = IngestJob(name="sample.pdf")
+    job.cancel()
+
+    # A cache hit indexes the whole document at once; the final progress call is where it stops
+    with pytest.raises(IngestCancelled):
+        qa.add_document("sample.pdf", progress=job._update)
+
+    assert cache.stats()["hits"] == 1
+    assert [doc["name"] for doc in qa.list_documents()] == ["doc.pdf"]
+
+
+def test_document_removed_mid_ingest_stays_removed(qa, tmp_path):
+    qa.load_document("sample.pdf")
+    sample_chunks = qa.vector_store.index.ntotal
+
+    def remove_after_first_batch(progress):
+        if progress["chunks_done"] == 8:
+            qa.remove_document("doc")
+
+    with pytest.raises(DocumentRemoved):
+        qa.add_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=10), doc_id="doc", progress=remove_after_first_batch)
+
+    assert [doc["name"] for doc in qa.list_documents()] == ["sample.pdf"]
+    assert qa.vector_store.index.ntotal == sample_chunks
+    with pytest.raises(KeyError):
+        qa.remove_document("doc")
+
+
+@pytest.mark.parametrize("with_cache", [False, True])
+def test_pdf_without_text_fails_with_a_clear_error(make_qa_chain, tmp_path, with_cache):
+    import fitz
+
+    blank = fitz.open()
+    blank.new_page()
+    blank.save(str(tmp_path / "blank.pdf"))
+    blank.close()
+    qa = make_qa_chain(index_cache=IndexCache(str(tmp_path / "cache")) if with_cache else None)
+    qa.load_document("sample.pdf")
+    pool = IngestPool(workers=1)
+
+    job = pool.submit(qa, str(tmp_path / "blank.pdf"), replace=False)
+    job.future.result(timeout=60)
+
+    assert job.status == "failed" and job.error == "No extractable text in blank.pdf"
+    assert [doc["name"] for doc in qa.list_documents()] == ["sample.pdf"]
+    pool.shutdown()
@@ -0,0 +1,87 @@
+import json
+import logging
+import time
+
+import pytest
+
+import metrics
+from benchmarks.common import make_synthetic_pdf
+from metrics import Metrics
+
+
+def test_stage_times_are_exclusive_of_nested_stages():
+    m = Metrics()
+    with m.trace("request") as trace:
+        with m.span("outer"):
+            time.sleep(0.02)
+            with m.span("inner"):
+                time.sleep(0.05)
+
+    assert 0.04 < trace.stages["inner"] < 0.1
+    assert 0.015 < trace.stages["outer"] < 0.045 # the inner sleep is not counted twice
+    histograms = m.snapshot()["histograms"]
+    assert histograms[("stage_seconds", (("stage", "inner"),))][0] == 1
+    assert histograms[("request_seconds", (("request", "request"),))][0] == 1
+
+
+def test_failed_stage_counts_an_error_and_is_logged(caplog):
+    m = Metrics()
+    with caplog.at_level(logging.INFO, logger="pdf_qa"):
+        with pytest.raises(RuntimeError):
+            with m.trace("ask", questions=2):
+                m.annotate(cache_hits=1)
+                with m.span("search"):
+                    raise RuntimeError("boom")
+
+    assert m.snapshot()["counters"][("errors_total", (("stage", "search"),))] == 1
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["event"] == "ask" and line["failed"] is True
+    assert line["questions"] == 2 and line["cache_hits"] == 1
+    assert set(line["stages_ms"]) == {"ask", "search"}
+
+
+def test_prometheus_text_format():
+    m = Metrics(buckets=(0.1, 1.0))
+    m.inc("chunks_total", 3)
+    m.observe("stage_seconds", 0.5, stage="embed")
+    text = m.render_prometheus(extra_counters={("cache_hits_total", (("cache", 'say "hi"'),)): 7})
+
+    assert "# TYPE pdf_qa_chunks_total counter\npdf_qa_chunks_total 3\n" in text
+    assert 'pdf_qa_cache_hits_total{cache="say \\"hi\\""} 7' in text
+    assert 'pdf_qa_stage_seconds_bucket{stage="embed",le="0.1"} 0' in text
+    assert 'pdf_qa_stage_seconds_bucket{stage="embed",le="1.0"} 1' in text
+    assert 'pdf_qa_stage_seconds_bucket{stage="embed",le="+Inf"} 1' in text
+    assert 'pdf_qa_stage_seconds_count{stage="embed"} 1' in text
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    with m.trace("request") as trace:
+        with m.span("search"):
+            m.inc("chunks_total")
+    assert trace is None
+    assert list(m.timed_iter([1, 2], "extract")) == [1, 2]
+    assert m.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_profile_dump_per_request(tmp_path):
+    m = Metrics(profile_dir=str(tmp_path))
+    with m.trace("outer"):
+        with m.trace("nested"): # profiled as part of the outer request only
+            sum(range(1000))
+    dumps = list(tmp_path.iterdir())
+    assert len(dumps) == 1 and dumps[0].name.startswith("outer-") and dumps[0].suffix == ".prof"
+
+
+def test_qa_chain_records_every_stage(monkeypatch, make_qa_chain, tmp_path):
+    monkeypatch.setattr(metrics, "_default_metrics", Metrics())
+    qa = make_qa_chain()
+    qa.load_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=5))
+    qa.ask_questions(["what does the warranty cover?", "how long do refunds take?"])
+
+    snapshot = metrics.get_metrics().snapshot()
+    stages = {dict(labels)["stage"] for name, labels in snapshot["histograms"] if name == "stage_seconds"}
+    assert {"extract", "chunk", "embed", "index", "embed_query", "search", "read"} <= stages
+    requests = {dict(labels)["request"]: value for (name, labels), value in snapshot["counters"].items() if name == "requests_total"}
+    assert requests == {"load_document": 1, "ask_questions": 1}
+    assert snapshot["counters"][("chunks_indexed_total", ())] == len(qa.doc_processor.text_chunks)
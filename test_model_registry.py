@@ -0,0 +1,154 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import model_registry
+import qa_chain
+from conftest import PDF_PATH, CountingEmbeddings, CountingEncoder, RecordingPipeline
+
+
+def test_loader_runs_once_under_concurrency():
+    registry = model_registry.ModelRegistry()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("model", slow_loader)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+@pytest.mark.usefixtures("qa_pipeline")
+def test_sessions_share_models_but_not_documents():
+    registry = model_registry.ModelRegistry()
+
+    first = qa_chain.QAChain(registry=registry)
+    second = qa_chain.QAChain(registry=registry)
+    first.load_document(PDF_PATH)
+
+    assert first.embeddings is second.embeddings
+    assert first.qa_pipeline is second.qa_pipeline
+    assert first.vector_store is not None
+    assert second.vector_store is None
+    assert second.ask_question("anything")["error"]
+
+
+def test_importing_the_app_modules_does_not_import_torch():
+    code = "import sys, api, qa_chain; sys.exit(any(m in sys.modules for m in ('torch', 'transformers', 'sentence_transformers')))"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+@pytest.mark.usefixtures("qa_pipeline")
+def test_lazy_chain_loads_each_model_on_first_use():
+    registry = model_registry.ModelRegistry()
+
+    qa = qa_chain.QAChain(registry=registry, lazy=True)
+    assert registry.loaded_models() == []
+    qa.load_document(PDF_PATH)
+    assert registry.loaded_models() == ["embeddings:torch:all-MiniLM-L6-v2"]
+    assert qa.ask_question("what is the hub?")["answer"] == "hub?"
+    assert len(registry.loaded_models()) == 2
+
+
+def test_warm_up_runs_one_input_through_each_model(make_qa_chain, qa_pipeline):
+    qa = make_qa_chain(lazy=True)
+
+    # A document loaded while the warm-up runs waits for the same models instead of loading them again
+    warm_up = threading.Thread(target=qa.warm_up)
+    warm_up.start()
+    qa.load_document(PDF_PATH)
+    warm_up.join()
+
+    assert CountingEmbeddings.instances == 1
+    assert qa_pipeline.calls == [1]
+
+
+def test_models_load_from_a_local_directory(monkeypatch, tmp_path):
+    loaded = []
+    monkeypatch.setattr(model_registry, "load_embeddings", lambda path, backend: loaded.append(path) or object())
+    (tmp_path / "all-MiniLM-L6-v2").mkdir()
+    registry = model_registry.ModelRegistry(model_dir=str(tmp_path))
+
+    registry.get_embeddings()
+    assert loaded == [str(tmp_path / "all-MiniLM-L6-v2")]
+    (tmp_path / "cross-encoder--ms-marco-MiniLM-L-6-v2").mkdir()
+    assert registry.model_path("cross-encoder/ms-marco-MiniLM-L-6-v2") == str(tmp_path / "cross-encoder--ms-marco-MiniLM-L-6-v2")
+    with pytest.raises(FileNotFoundError, match="download_models.py"):
+        registry.get_qa_pipeline()
+
+
+def run_alone(busy, run):
+    """Fail the way a fast tokenizer does ("Already borrowed") when another thread is running it."""
+    if not busy.acquire(blocking=False):
+        raise RuntimeError("Already borrowed")
+    try:
+        time.sleep(0.002)
+        return run()
+    finally:
+        busy.release()
+
+
+class ExclusiveEncoder(CountingEncoder):
+    def __init__(self):
+        super().__init__()
+        self.busy = threading.Lock()
+
+    def encode(self, sentences, **kwargs):
+        return run_alone(self.busy, lambda: super(ExclusiveEncoder, self).encode(sentences, **kwargs))
+
+
+class ExclusiveEmbeddings(CountingEmbeddings):
+    def __init__(self, model_name=None, **kwargs):
+        self.client = ExclusiveEncoder()
+
+
+class ExclusivePipeline(RecordingPipeline):
+    def __init__(self):
+        super().__init__()
+        self.busy = threading.Lock()
+
+    def __call__(self, inputs, **kwargs):
+        return run_alone(self.busy, lambda: super(ExclusivePipeline, self).__call__(inputs, **kwargs))
+
+
+def test_sessions_take_turns_on_each_shared_model(monkeypatch):
+    qa_pipeline = ExclusivePipeline()
+    monkeypatch.setattr(model_registry, "load_embeddings", ExclusiveEmbeddings)
+    monkeypatch.setattr(model_registry, "load_qa_pipeline", lambda *args, **kwargs: qa_pipeline)
+    registry = model_registry.ModelRegistry()
+    asking = qa_chain.QAChain(registry=registry)
+    asking.load_document(PDF_PATH)
+    ingesting = qa_chain.QAChain(registry=registry)
+    errors = []
+
+    def ask(i):
+        for j in range(5):
+            result = asking.ask_questions([f"question {i} {j}"])[0]
+            if "error" in result or result["answer"].startswith(qa_chain.PIPELINE_ERROR_PREFIX):
+                errors.append(result)
+
+    # Ingesting, warming up and answering all run the one embedder and the one QA pipeline
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(6)]
+    threads += [threading.Thread(target=ingesting.load_document, args=(PDF_PATH,)), threading.Thread(target=asking.warm_up)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert ingesting.list_documents() and len(qa_pipeline.calls) == 31
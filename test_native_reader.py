@@ -0,0 +1,46 @@
+import fitz
+
+FAQ_TEXT = (
+    "Frequently asked questions.\n"
+    "Question: How long do refunds take?\n"
+    "Answer: Refunds are issued within 14 days of the return being received."
+)
+
+
+def _qa(make_qa_chain, tmp_path, pipeline_mode):
+    pdf_path = str(tmp_path / "faq.pdf")
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), FAQ_TEXT, fontsize=10)
+    doc.save(pdf_path)
+
+    qa = make_qa_chain(pipeline_mode=pipeline_mode)
+    qa.load_document(pdf_path)
+    return qa
+
+
+def test_native_path_passes_chunks_verbatim(make_qa_chain, qa_pipeline, tmp_path):
+    qa = _qa(make_qa_chain, tmp_path, "native")
+
+    result = qa.ask_question("How long do refunds take?")
+
+    assert qa.qa_chain is None
+    assert qa_pipeline.inputs == [{"question": "How long do refunds take?", "context": result["source_documents"][0]}]
+    assert "within 14 days" in qa_pipeline.inputs[0]["context"]
+
+
+def test_retrieval_qa_path_is_still_available(make_qa_chain, qa_pipeline, tmp_path):
+    qa = _qa(make_qa_chain, tmp_path, "retrieval_qa")
+
+    result = qa.ask_question("How long do refunds take?")
+
+    assert qa.qa_chain is not None
+    assert result["source_documents"]
+    assert len(qa_pipeline.inputs) == 1
+
+
+def test_retrieve_returns_scores_nearest_first(qa_chain):
+    hits = qa_chain.retrieve("what is hugging face", k=3)
+
+    assert len(hits) == 3
+    assert all(isinstance(text, str) and isinstance(score, float) for text, score in hits)
+    assert [score for _, score in hits] == sorted(score for _, score in hits)
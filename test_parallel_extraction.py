@@ -0,0 +1,13 @@
+from benchmarks.common import make_synthetic_pdf
+from pdf_extraction import iter_pages_parallel, iter_pages_serial
+
+
+def test_parallel_extraction_matches_serial(tmp_path):
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=23)
+
+    serial = list(iter_pages_serial(pdf_path))
+    parallel = list(iter_pages_parallel(pdf_path, workers=2, pages_per_task=3))
+
+    assert len(parallel) == 23
+    assert "".join(parallel).encode("utf-8") == "".join(serial).encode("utf-8")
+    assert parallel == serial
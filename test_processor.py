@@ -1,13 +1,20 @@
-from document_processor import DocumentProcessor
 import os
 
-# Create a sample PDF or use an existing one
-pdf_path = "sample.pdf"  # Replace with a real PDF file
-if os.path.exists(pdf_path):
-    processor = DocumentProcessor()
-    chunk_count = processor.process_pdf(pdf_path)
-    print(f"Processed {chunk_count} chunks")
-    results = processor.search("What is the main topic?")
-    print("Search results:", results)
-else:
-    print("Please provide a valid PDF file")
\ No newline at end of file
+import numpy as np
+
+from conftest import CountingEncoder
+from document_processor import DocumentProcessor
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.pdf")
+
+
+def test_process_pdf_embeds_every_chunk():
+    processor = DocumentProcessor(embedder=CountingEncoder())
+    chunk_count, chunks, embeddings = processor.process_pdf(PDF_PATH)
+
+    assert chunk_count == len(chunks) == len(embeddings) == len(processor.chunk_pages) > 0
+    assert all(len(chunk) <= processor.chunk_size for chunk in chunks)
+    # A chunk's own embedding is (one of) its nearest neighbours
+    query = processor._embed([chunks[-1]])[0]
+    nearest = int(np.argmin(np.linalg.norm(embeddings - query, axis=1)))
+    assert np.allclose(embeddings[nearest], query)
@@ -0,0 +1,114 @@
+import numpy as np
+
+import model_registry
+import qa_chain
+from conftest import PDF_PATH, CountingEmbeddings, CountingEncoder
+from query_cache import LRUCache, SemanticCache, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used_and_counts_hits():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=60, clock=clock)
+    cache.put("q", "answer")
+
+    clock.now = 59
+    assert cache.get("q") == "answer"
+    clock.now = 61
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+
+def test_normalize_question():
+    assert normalize_question("  What is the  Refund policy? ") == normalize_question("What is the Refund policy")
+    assert normalize_question("Is it made in the US?") != normalize_question("Is it made in the us?")
+
+
+def test_repeat_questions_skip_embedding_and_reader(qa_chain, qa_pipeline):
+    encoder = qa_chain.embeddings.client
+    encoder.encoded_texts.clear()
+
+    first = qa_chain.ask_question("What is the refund policy?")
+    second = qa_chain.ask_question("What  is the refund policy")
+    third = qa_chain.ask_question("What is the refund policy?")
+    # The reader is cased, so a question differing in case is answered again
+    qa_chain.ask_question("what is the refund policy?")
+
+    assert second == first and third == first
+    assert qa_pipeline.calls == [1, 1]
+    assert encoder.encoded_texts == ["What is the refund policy?", "what is the refund policy?"]
+    assert qa_chain.cache_stats()["answer"]["hits"] == 2
+
+
+def test_reloading_a_document_invalidates_its_answers(qa_chain, qa_pipeline):
+    qa_chain.ask_question("what is the refund policy?")
+    assert len(qa_chain.registry.answer_cache) == 1
+
+    qa_chain.load_document(PDF_PATH)
+    assert len(qa_chain.registry.answer_cache) == 0
+    qa_chain.ask_question("what is the refund policy?")
+
+    assert qa_pipeline.calls == [1, 1]
+
+
+class KeywordEncoder(CountingEncoder):
+    """Bag-of-keywords vectors, so paraphrases sharing their keywords land close together."""
+
+    KEYWORDS = ("refund", "policy", "shipping", "warranty")
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        batch = list(sentences)
+        self.encoded_texts.extend(batch)
+        return np.array([[float(w in s.lower()) for w in self.KEYWORDS] + [0.1] for s in batch], dtype=np.float32)
+
+
+class KeywordEmbeddings(CountingEmbeddings):
+    def __init__(self, model_name=None, **kwargs):
+        self.client = KeywordEncoder()
+
+
+def test_semantic_cache_matches_within_threshold_and_evicts():
+    cache = SemanticCache(dim=2, threshold=0.9, maxsize=2)
+    cache.add(np.array([1.0, 0.0]), "a")
+    cache.add(np.array([0.0, 1.0]), "b")
+
+    assert cache.lookup(np.array([[0.99, 0.05], [0.7, 0.7]])) == ["a", None]
+    cache.add(np.array([0.7, 0.7]), "c") # evicts "b", the least recently used
+
+    assert cache.lookup(np.array([[0.0, 1.0]])) == [None]
+    assert len(cache) == 2 and cache.index.ntotal == 2
+
+
+def test_paraphrases_reuse_the_cached_answer(monkeypatch, qa_pipeline):
+    monkeypatch.setattr(model_registry, "load_embeddings", KeywordEmbeddings)
+    qa = qa_chain.QAChain(registry=model_registry.ModelRegistry(semantic_threshold=0.95))
+    qa.load_document(PDF_PATH)
+
+    first = qa.ask_question("what's the refund policy")
+    paraphrase = qa.ask_question("refund policy details")
+    other = qa.ask_question("how long does shipping take")
+
+    assert paraphrase == first
+    assert other["answer"] == "take"
+    assert qa_pipeline.calls == [1, 1]
+    assert qa.cache_stats()["semantic"]["hits"] == 1
@@ -0,0 +1,82 @@
+from conftest import CHUNKS, CountingModel, tiny_qa_model
+from reader import ExtractiveReader
+
+
+def test_best_span_matches_reading_chunks_one_by_one(tmp_path):
+    model, tokenizer = tiny_qa_model(tmp_path)
+    reader = ExtractiveReader(model, tokenizer, max_seq_len=64)
+    question = "how long do refunds take?"
+
+    best = reader.read(question, CHUNKS)
+    singles = [reader.read(question, [chunk]) for chunk in CHUNKS]
+
+    winner = max(range(len(CHUNKS)), key=lambda i: singles[i].score)
+    assert best.chunk_index == winner
+    assert abs(best.score - singles[winner].score) < 1e-4
+    assert best.answer == CHUNKS[winner][best.start:best.end]
+    assert best.answer
+
+
+def test_windows_are_bounded_and_batched(tmp_path):
+    model, tokenizer = tiny_qa_model(tmp_path)
+    counting = CountingModel(model)
+    reader = ExtractiveReader(counting, tokenizer, max_seq_len=64)
+
+    reader.read_batch(["how long do refunds take?", "what does the warranty cover?"], [CHUNKS, CHUNKS[:2]])
+
+    # Five (question, chunk) windows in a single forward pass, each capped at max_seq_len tokens
+    assert len(counting.batch_shapes) == 1
+    assert counting.batch_shapes[0][0] == 5
+    assert counting.batch_shapes[0][1] <= 64
+
+
+def test_confident_answer_stops_reading_early(tmp_path):
+    model, tokenizer = tiny_qa_model(tmp_path)
+    counting = CountingModel(model)
+    reader = ExtractiveReader(counting, tokenizer, max_seq_len=64, chunks_per_pass=1, confident_score=float("-inf"))
+
+    answer = reader.read("how long do refunds take?", CHUNKS)
+
+    assert answer.chunk_index == 0
+    assert len(counting.batch_shapes) == 1
+
+
+def test_per_chunk_mode_reports_source_chunk_and_page(monkeypatch, make_qa_chain, tmp_path):
+    from types import SimpleNamespace
+
+    import model_registry
+    from benchmarks.common import make_synthetic_pdf
+
+    model, tokenizer = tiny_qa_model(tmp_path)
+    monkeypatch.setattr(
+        model_registry, "load_qa_pipeline", lambda *args, **kwargs: SimpleNamespace(model=model, tokenizer=tokenizer)
+    )
+    qa = make_qa_chain(reader_mode="per_chunk")
+    qa.load_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=5))
+
+    result = qa.ask_question("how long do refunds take?")
+
+    assert result["source_chunk"] in result["source_documents"]
+    assert result["answer"] in result["source_chunk"]
+    assert 1 <= result["source_page"] <= 5
+
+
+def test_per_chunk_mode_stops_early_when_configured(monkeypatch, make_qa_chain, tmp_path):
+    from types import SimpleNamespace
+
+    import model_registry
+    from benchmarks.common import make_synthetic_pdf
+
+    model, tokenizer = tiny_qa_model(tmp_path)
+    counting = CountingModel(model)
+    monkeypatch.setattr(
+        model_registry, "load_qa_pipeline", lambda *args, **kwargs: SimpleNamespace(model=counting, tokenizer=tokenizer)
+    )
+    qa = make_qa_chain(reader_mode="per_chunk", chunks_per_pass=1, confident_score=float("-inf"))
+    qa.load_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=5))
+
+    result = qa.ask_question("how long do refunds take?")
+
+    # Any answer is confident enough, so only the top retrieved chunk is read
+    assert len(counting.batch_shapes) == 1 and counting.batch_shapes[0][0] == 1
+    assert result["source_chunk"] == result["source_documents"][0]
@@ -0,0 +1,78 @@
+import torch
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+import model_registry
+from benchmarks.common import make_synthetic_pdf
+from conftest import CHUNKS, WORDS, CountingModel
+from query_cache import LRUCache
+from reranker import Reranker
+
+
+def tiny_cross_encoder(tmp_path):
+    """A randomly initialised one-logit BERT cross-encoder with a word-level vocab, built offline."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", "?", *[str(d) for d in range(10)], *sorted(set(WORDS))]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True)
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab), hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=512, num_labels=1
+    )
+    return BertForSequenceClassification(config).eval(), tokenizer
+
+
+def test_rerank_matches_scoring_pairs_one_by_one(tmp_path):
+    model, tokenizer = tiny_cross_encoder(tmp_path)
+    reranker = Reranker(model, tokenizer, max_seq_len=64)
+    question = "how long do refunds take?"
+
+    ranked = reranker.rerank([question], [CHUNKS], k=2)[0]
+    singles = [reranker.score([question], [[chunk]])[0][0] for chunk in CHUNKS]
+
+    expected = sorted(range(len(CHUNKS)), key=lambda i: singles[i], reverse=True)[:2]
+    assert [i for i, _ in ranked] == expected
+    for i, score in ranked:
+        assert abs(score - singles[i]) < 1e-4
+
+
+def test_scores_are_cached_per_question_and_chunk(tmp_path):
+    model, tokenizer = tiny_cross_encoder(tmp_path)
+    counting = CountingModel(model)
+    reranker = Reranker(counting, tokenizer, max_seq_len=64, cache=LRUCache(maxsize=100))
+
+    first = reranker.score(["how long do refunds take?"], [CHUNKS])
+    assert len(counting.batch_shapes) == 1 # all candidates in one pass
+    again = reranker.score(["how long do refunds take?", "what does the warranty cover?"], [CHUNKS[:2], CHUNKS[1:]])
+
+    assert again[0] == first[0][:2]
+    # Only the second question's pairs were scored
+    assert [shape[0] for shape in counting.batch_shapes] == [3, 2]
+
+
+def test_candidate_count_shrinks_as_scoring_slows(tmp_path):
+    reranker = Reranker(*tiny_cross_encoder(tmp_path))
+    assert reranker.candidate_count(1, 50, budget_ms=100, min_candidates=3) == 50 # nothing measured yet
+
+    reranker.seconds_per_pair = 0.001
+    assert reranker.candidate_count(1, 50, budget_ms=100, min_candidates=3) == 50
+    assert reranker.candidate_count(4, 50, budget_ms=100, min_candidates=3) == 25
+    reranker.seconds_per_pair = 0.01
+    assert reranker.candidate_count(4, 50, budget_ms=100, min_candidates=3) == 3
+    assert reranker.candidate_count(4, 50, budget_ms=None, min_candidates=3) == 50
+
+
+def test_qa_chain_reads_the_best_reranked_candidates(monkeypatch, make_qa_chain, tmp_path):
+    monkeypatch.setattr(model_registry, "load_cross_encoder", lambda *args, **kwargs: tiny_cross_encoder(tmp_path))
+    qa = make_qa_chain(rerank=True)
+    qa.load_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=10))
+    qa.rerank_candidates = 8
+    question = "what does the warranty cover?"
+
+    candidates = [doc.page_content for doc, _ in qa._retrieve_batch([question], 8)[0]]
+    scores = qa.reranker.score([question], [candidates])[0]
+    expected = [candidates[i] for i in sorted(range(8), key=lambda i: scores[i], reverse=True)[:qa.top_k]]
+
+    result = qa.ask_question(question)
+    assert result["source_documents"] == expected
+    assert qa.registry.rerank_cache.stats()["hits"] >= 8
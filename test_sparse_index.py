@@ -0,0 +1,94 @@
+import numpy as np
+
+from benchmarks.common import make_synthetic_pdf
+from sparse_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    "Refunds are issued within 14 days of the return being received.",
+    "Part PN-48213 is covered by clause 4.2.1 of the warranty.",
+    "Shipping costs are not refunded.",
+    "The warranty covers parts and labour for two years.",
+]
+
+
+def _index():
+    index = BM25Index()
+    index.add([f"a:{i}" for i in range(2)], CHUNKS[:2])
+    index.add([f"b:{i}" for i in range(2)], CHUNKS[2:])
+    return index
+
+
+def test_tokenize_keeps_compound_identifiers():
+    assert tokenize("See PN-48213, clause 4.2.1.") == ["see", "pn-48213", "pn", "48213", "clause", "4.2.1", "4", "2", "1"]
+
+
+def test_exact_identifiers_rank_first_and_postings_are_compact():
+    index = _index()
+
+    assert index.search_batch(["PN-48213"], k=2)[0][0][0] == "a:1"
+    assert index.search_batch(["clause 4.2.1"], k=2)[0][0][0] == "a:1"
+    assert [chunk_id for chunk_id, _ in index.search_batch(["warranty"], k=5)[0]] == ["b:1", "a:1"]
+    assert index.search_batch(["nothing matches"], k=2) == [[]]
+    assert index._rows.dtype == np.int32 and index._tfs.dtype == np.uint16
+    assert len(index._rows) == sum(len(set(tokenize(chunk))) for chunk in CHUNKS)
+
+
+def test_removed_and_filtered_rows_are_skipped():
+    index = _index()
+    index.remove_document("a")
+
+    assert [chunk_id for chunk_id, _ in index.search_batch(["warranty"], k=5)[0]] == ["b:1"]
+    assert index.search_batch(["refunded"], k=5, allowed=index.rows_for(["a"])) == [[]]
+    assert len(index) == 2
+
+
+def test_add_remove_cycles_keep_the_index_bounded():
+    index = BM25Index()
+    index.add(["keep:0"], CHUNKS[:1])
+    for cycle in range(50):
+        index.add([f"tmp{cycle}:{i}" for i in range(3)], [f"{chunk} batch{cycle}" for chunk in CHUNKS[1:]])
+        index.search_batch(["warranty"], k=5)
+        index.remove_document(f"tmp{cycle}")
+
+    # Only the kept chunk's rows, postings and terms are left
+    assert index.chunk_ids == ["keep:0"] and len(index._alive) == 1
+    assert set(index.terms) == set(tokenize(CHUNKS[0])) and len(index._rows) == len(index.terms)
+    assert [[chunk_id for chunk_id, _ in hits] for hits in index.search_batch(["refunds", "warranty"], k=5)] == [["keep:0"], []]
+    index.add(["new:0"], CHUNKS[3:])
+    assert [chunk_id for chunk_id, _ in index.search_batch(["warranty"], k=5, allowed=index.rows_for(["new"]))[0]] == ["new:0"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=3)
+    assert [item for item, _ in fused] == ["y", "x", "w"]
+
+
+def _qa(make_qa_chain, tmp_path, retrieval_mode):
+    qa = make_qa_chain(retrieval_mode=retrieval_mode)
+    qa.load_document(make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=30))
+    return qa
+
+
+def test_sparse_retrieval_finds_part_numbers(make_qa_chain, tmp_path):
+    qa = _qa(make_qa_chain, tmp_path, "sparse")
+    target = next(chunk for chunk in qa.doc_processor.text_chunks if "PN-" in chunk)
+    part_number = target[target.index("PN-"):].split(".")[0]
+
+    texts = [text for text, _ in qa.retrieve(f"which clause applies to {part_number}?", k=3)]
+
+    assert part_number in texts[0]
+
+
+def test_hybrid_fuses_dense_and_sparse_rankings(make_qa_chain, tmp_path):
+    qa = _qa(make_qa_chain, tmp_path, "hybrid")
+    question = "refund policy for returned parts"
+    doc_id = qa.list_documents()[0]["doc_id"]
+
+    dense = [chunk_id for chunk_id, _ in qa._dense_search(qa._embed_questions([question]), qa.fusion_depth)[0]]
+    sparse = [chunk_id for chunk_id, _ in qa.sparse_index.search_batch([question], qa.fusion_depth)[0]]
+    expected = [chunk_id for chunk_id, _ in reciprocal_rank_fusion([dense, sparse], k=3)]
+    hits = qa._retrieve_batch([question], k=3, doc_ids=[doc_id])[0]
+
+    chunk_ids = {text: chunk_id for chunk_id, text in zip(qa.sparse_index.chunk_ids, qa.doc_processor.text_chunks)}
+    assert [chunk_ids[doc.page_content] for doc, _ in hits] == expected
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from benchmarks.common import make_synthetic_pdf
+from conftest import CountingEncoder
+from document_processor import DocumentProcessor
+
+
+class BatchRecordingEncoder(CountingEncoder):
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        self.batch_sizes.append(len(sentences))
+        return super().encode(sentences, convert_to_numpy=convert_to_numpy, **kwargs)
+
+
+def test_chunks_span_pages_within_size_limit(tmp_path):
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=30)
+    processor = DocumentProcessor(embedder=BatchRecordingEncoder())
+
+    chunks = list(processor.iter_chunks(processor.iter_pages(pdf_path)))
+    whole_text = "".join(processor.iter_pages(pdf_path))
+
+    assert all(len(chunk) <= processor.chunk_size for chunk in chunks)
+    # Every page's closing clause reference survives chunking
+    for page_no in range(1, 31):
+        assert any(f"Clause {page_no}-" in chunk for chunk in chunks)
+    # Chunking in a stream stays close to splitting the whole text at once
+    assert abs(len(chunks) - len(processor.text_splitter.split_text(whole_text))) <= 2
+
+
+def test_process_pdf_embeds_in_fixed_size_batches(tmp_path):
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=20)
+    encoder = BatchRecordingEncoder()
+    processor = DocumentProcessor(embedder=encoder, embed_batch_size=8)
+
+    chunk_count, chunks, embeddings = processor.process_pdf(pdf_path)
+
+    assert len(encoder.batch_sizes) > 1
+    assert all(size == 8 for size in encoder.batch_sizes[:-1])
+    assert sum(encoder.batch_sizes) == chunk_count == len(chunks)
+    assert embeddings.shape[0] == chunk_count
+    np.testing.assert_array_equal(embeddings, encoder.encode([c.replace("\n", " ") for c in chunks]))
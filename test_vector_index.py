@@ -0,0 +1,82 @@
+import faiss
+import numpy as np
+import pytest
+
+from benchmarks.common import make_synthetic_pdf
+from vector_index import build_index, index_kind
+
+
+def _vectors(n, dim=16):
+    return np.random.default_rng(0).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_trained_indexes_fall_back_when_data_is_small():
+    assert index_kind(build_index("ivf", _vectors(50))) == "flat"
+    assert index_kind(build_index("ivfpq", _vectors(2000))) == "ivf"
+    assert index_kind(build_index("hnsw", _vectors(5))) == "hnsw"
+
+
+def test_each_index_type_finds_exact_matches():
+    vectors = _vectors(10000)
+    for index_type in ("flat", "ivf", "hnsw", "ivfpq"):
+        index = build_index(index_type, vectors)
+        index.add(vectors)
+        assert index_kind(index) == index_type
+        _, found = index.search(vectors[:20], 1)
+        hit_rate = (found[:, 0] == np.arange(20)).mean()
+        assert hit_rate >= (0.8 if index_type == "ivfpq" else 0.95), index_type
+
+
+def test_ivf_corpus_keeps_labels_stable_across_removal(make_qa_chain, tmp_path):
+    qa = make_qa_chain(index_type="ivf", index_params={"nlist": 2})
+    for i, name in enumerate("abc"):
+        qa.add_document(make_synthetic_pdf(str(tmp_path / f"{name}.pdf"), pages=40, seed=i), doc_id=name)
+    assert index_kind(qa.vector_store.index) == "ivf"
+
+    qa.remove_document("b")
+    qa.add_document(make_synthetic_pdf(str(tmp_path / "d.pdf"), pages=10, seed=3), doc_id="d")
+    qa.vector_store.index.nprobe = 2
+
+    total = sum(info["chunks"] for info in qa.documents.values())
+    assert qa.vector_store.index.ntotal == total
+    hits = qa._retrieve_batch(["refund"], k=total)[0]
+    assert len(hits) == total
+    assert {doc.metadata["doc_id"] for doc, _ in hits} == {"a", "c", "d"}
+    assert len({doc.page_content + doc.metadata["doc_id"] for doc, _ in hits}) == total
+
+
+def test_hnsw_corpus_refuses_partial_removal(make_qa_chain, tmp_path):
+    qa = make_qa_chain(index_type="hnsw")
+    qa.add_document(make_synthetic_pdf(str(tmp_path / "a.pdf"), pages=2, seed=0), doc_id="a")
+    qa.add_document(make_synthetic_pdf(str(tmp_path / "b.pdf"), pages=2, seed=1), doc_id="b")
+
+    with pytest.raises(ValueError):
+        qa.remove_document("a")
+    assert set(qa.documents) == {"a", "b"}
+    hits = qa._retrieve_batch(["refund"], k=3, doc_ids=["b"])[0]
+    assert hits and {doc.metadata["doc_id"] for doc, _ in hits} == {"b"}
+
+
+def _centroids(index):
+    quantizer = faiss.extract_index_ivf(index).quantizer
+    return quantizer.reconstruct_n(0, quantizer.ntotal)
+
+
+def test_ivf_documents_are_cached_without_training_again(make_qa_chain, tmp_path, monkeypatch):
+    import qa_chain
+    from index_cache import IndexCache
+
+    trainings = []
+    monkeypatch.setattr(qa_chain, "build_index", lambda *args, **kwargs: trainings.append(1) or build_index(*args, **kwargs))
+    cache = IndexCache(str(tmp_path / "cache"))
+    qa = make_qa_chain(index_type="ivf", index_params={"nlist": 2}, index_cache=cache)
+    for i, name in enumerate("ab"):
+        qa.add_document(make_synthetic_pdf(str(tmp_path / f"{name}.pdf"), pages=40, seed=i), doc_id=name)
+
+    # Trained once, for the corpus store; "a" was cached as that store, "b" on a copy of its cells
+    assert trainings == [1]
+    centroids = _centroids(qa.vector_store.index)
+    for name in "ab":
+        cached = cache.load(qa.documents[name]["hash"], qa.embeddings).vector_store.index
+        assert cached.ntotal == qa.documents[name]["chunks"]
+        assert np.array_equal(_centroids(cached), centroids)
@@ -0,0 +1,207 @@
+import functools
+import shutil
+import time
+
+import pytest
+
+import metrics
+import model_registry
+import qa_chain
+from benchmarks.common import make_synthetic_pdf
+from conftest import CountingEmbeddings, CountingEncoder, RecordingPipeline, upload_pdf
+from index_cache import IndexCache
+from metrics import Metrics
+from worker_pool import WorkerPool
+
+
+def make_chain(cache_dir):
+    """Worker factory with the fake models; module-level so spawned workers can unpickle it."""
+    model_registry.load_embeddings = CountingEmbeddings
+    model_registry.load_qa_pipeline = lambda *args, **kwargs: RecordingPipeline()
+    return qa_chain.QAChain(registry=model_registry.ModelRegistry(), index_cache=IndexCache(cache_dir))
+
+
+class SlowEncoder(CountingEncoder):
+    def encode(self, sentences, **kwargs):
+        if not isinstance(sentences, str): # chunks, not a question
+            time.sleep(0.5)
+        return super().encode(sentences, **kwargs)
+
+
+class SlowEmbeddings(CountingEmbeddings):
+    def __init__(self, model_name=None, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.client = SlowEncoder()
+
+
+def make_slow_chain(cache_dir):
+    """Like make_chain, but embedding chunks takes long enough to cancel an ingest in flight."""
+    model_registry.load_qa_pipeline = lambda *args, **kwargs: RecordingPipeline()
+    model_registry.load_embeddings = SlowEmbeddings
+    return qa_chain.QAChain(registry=model_registry.ModelRegistry(), index_cache=IndexCache(cache_dir))
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    pools = []
+
+    def make(processes, factory=make_chain, **kwargs):
+        pool = WorkerPool(processes, factory=functools.partial(factory, str(tmp_path / "cache")), warm_up=False, **kwargs)
+        pools.append(pool)
+        pool.wait_ready(timeout=120)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_any_worker_answers_from_the_shared_cache(make_pool):
+    pool = make_pool(2)
+    job = pool.ingest("sample.pdf")
+    doc_id = job.future.result(timeout=120)
+    assert job.status == "done" and job.chunks_done > 0
+    assert [doc["doc_id"] for doc in pool.list_documents()] == [doc_id]
+
+    # Both workers are idle, so the two batches go to different workers
+    futures = [pool.submit_batch([f"question {i} hub?"], [doc_id]) for i in range(2)]
+    assert [future.result(timeout=60)[0]["answer"] for future in futures] == ["hub?", "hub?"]
+
+    stats = pool.stats().result(timeout=60)
+    assert [worker["documents"] for worker in stats] == [[doc_id], [doc_id]]
+    # Read and embedded once by the ingesting worker; the other one loaded the cache entry
+    assert sum(worker["index_cache"]["misses"] for worker in stats) == 1
+    assert sum(worker["index_cache"]["hits"] for worker in stats) == 1
+
+
+def test_queued_questions_are_batched_and_removal_reaches_workers(make_pool, tmp_path):
+    pool = make_pool(1)
+    first = pool.ingest(make_synthetic_pdf(str(tmp_path / "a.pdf"), pages=3, seed=0)).future.result(timeout=120)
+    ingest = pool.ingest(make_synthetic_pdf(str(tmp_path / "b.pdf"), pages=3, seed=1))
+
+    # Queued behind the ingest, which keeps the only worker busy
+    futures = [pool.submit(f"refund question {i}?") for i in range(8)]
+    second = ingest.future.result(timeout=120)
+    assert [future.result(timeout=60)["answer"] for future in futures] == [f"{i}?" for i in range(8)]
+    assert pool.questions == 8 and pool.batches <= 3
+
+    pool.remove_document(first)
+    with pytest.raises(KeyError):
+        pool.remove_document(first)
+    assert pool.ask("what about refunds?")["answer"] == "refunds?"
+    assert pool.stats().result(timeout=60)[0]["documents"] == [second]
+
+
+def test_cancelled_question_does_not_stop_the_pool(make_pool):
+    pool = make_pool(1)
+    doc_id = pool.ingest("sample.pdf").future.result(timeout=120)
+
+    # Cancelled after it was handed to the worker, as the API does when a client goes away
+    cancelled = pool.submit("what is the hub?", [doc_id])
+    assert cancelled.cancel()
+    assert pool.submit("what is the ship?", [doc_id]).result(timeout=60)["answer"] == "ship?"
+    assert pool.stats().result(timeout=60)[0]["documents"] == [doc_id]
+
+def test_dead_worker_is_restarted_with_the_corpus(make_pool):
+    pool = make_pool(1)
+    doc_id = pool.ingest("sample.pdf").future.result(timeout=120)
+    dead = pool._workers[0]
+    dead.kill()
+    dead.join()
+
+    # The replacement worker picks the document up from the cache
+    assert pool.submit("what is the hub?", [doc_id]).result(timeout=120)["answer"] == "hub?"
+    assert pool._workers[0].pid != dead.pid
+
+
+def test_document_missing_from_the_cache_is_dropped_once(make_pool, tmp_path, caplog):
+    pool = make_pool(2)
+    doc_id = pool.ingest("sample.pdf").future.result(timeout=120)
+    shutil.rmtree(IndexCache(str(tmp_path / "cache"))._entry_dir(pool.documents[doc_id]["hash"]))
+
+    # The worker that did not ingest the PDF cannot load it; the pool drops it instead of failing every task
+    futures = [pool.submit_batch([f"question {i} hub?"]) for i in range(2)]
+    for future in futures:
+        future.result(timeout=60)
+    assert pool.list_documents() == []
+    # Both workers take one more question, without the document and without errors
+    for future in [pool.submit_batch([f"question {i} hub?"]) for i in range(2)]:
+        future.result(timeout=60)
+    assert [worker["documents"] for worker in pool.stats().result(timeout=60)] == [[], []]
+    assert sum("no longer in the index cache" in record.message for record in caplog.records) == 1
+
+
+def test_cancelled_ingests_leave_no_document(make_pool, tmp_path):
+    pool = make_pool(1, factory=make_slow_chain)
+    running = pool.ingest(make_synthetic_pdf(str(tmp_path / "a.pdf"), pages=3, seed=0))
+    queued = pool.ingest(make_synthetic_pdf(str(tmp_path / "b.pdf"), pages=3, seed=1))
+    queued.cancel()
+    running.cancel()
+
+    assert running.future.result(timeout=120) is None and queued.future.result(timeout=1) is None
+    assert running.status == queued.status == "cancelled"
+    assert pool.list_documents() == []
+    assert pool.stats().result(timeout=60)[0]["documents"] == []
+    assert pool.ingest("sample.pdf").future.result(timeout=120) in pool.documents
+
+
+def test_api_serves_from_worker_processes(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    # Only this app's requests in the serving process's counters
+    monkeypatch.setattr(metrics, "_default_metrics", Metrics())
+
+    factory = functools.partial(make_chain, str(tmp_path / "cache"))
+    with TestClient(api.create_app(factory, processes=2, warm_up=False)) as client:
+        job = upload_pdf(client)
+        assert job["status"] == "done"
+        answer = client.post("/ask", json={"question": "what is the hub?"}).json()
+        assert answer["answer"] == "hub?"
+        batch = client.post("/ask/batch", json={"questions": ["first one", "second two"]}).json()["results"]
+        assert [result["answer"] for result in batch] == ["one", "two"]
+        assert client.get("/health").json()["documents"] == 1
+        text = client.get("/metrics").text
+        # Counted in the workers, reported by the serving process
+        assert 'pdf_qa_requests_total{request="add_document"} 1' in text
+
+
+class StalledEncoder(CountingEncoder):
+    def encode(self, sentences, **kwargs):
+        if not isinstance(sentences, str): # chunks, not a question
+            time.sleep(5)
+        return super().encode(sentences, **kwargs)
+
+
+class StalledEmbeddings(CountingEmbeddings):
+    def __init__(self, model_name=None, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.client = StalledEncoder()
+
+
+def make_stalled_chain(cache_dir):
+    """Like make_chain, but every batch of chunks takes seconds to embed."""
+    model_registry.load_qa_pipeline = lambda *args, **kwargs: RecordingPipeline()
+    model_registry.load_embeddings = StalledEmbeddings
+    return qa_chain.QAChain(registry=model_registry.ModelRegistry(), index_cache=IndexCache(cache_dir))
+
+
+def test_metrics_do_not_wait_for_busy_workers(tmp_path):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    factory = functools.partial(make_stalled_chain, str(tmp_path / "cache"))
+    with TestClient(api.create_app(factory, processes=2, warm_up=False)) as client:
+        for i in range(2):
+            path = make_synthetic_pdf(str(tmp_path / f"{i}.pdf"), pages=2, seed=i)
+            with open(path, "rb") as f:
+                assert client.post("/documents", files={"file": (f"{i}.pdf", f, "application/pdf")}).status_code == 202
+
+        # Both workers are embedding; the scrape serves what the serving process has
+        started = time.perf_counter()
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert time.perf_counter() - started < api.WORKER_STATS_TIMEOUT_S + 2
+        assert "pdf_qa_microbatch_batches_total" in response.text
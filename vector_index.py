@@ -0,0 +1,242 @@
+"""
+FAISS index construction for the vector store.
+
+    flat   exact search over raw float32 vectors (IndexFlatL2)
+    ivf    inverted file over k-means cells, trained automatically (IVF<nlist>,Flat)
+    hnsw   graph-based search, no training (HNSW<m>); does not support removal
+    ivfpq  inverted file with product-quantized codes (IVF<nlist>,PQ<m>), a few
+           dozen bytes per vector instead of 4 * dim
+
+Trained types fall back to a simpler index when there are too few vectors to
+train on, so small documents always get a working index.
+
+`vector_dtype` sets how flat, IVF and HNSW indexes store vectors: "float32",
+"float16" (half the memory, near-identical distances) or "int8" (a quarter,
+per-dimension ranges learnt from the vectors the index is built with).
+
+Chunk texts live in a ChunkDocstore, which keeps each document's chunks as one
+compact ChunkTexts buffer (see compact_storage) and builds the LangChain
+Document for a chunk only when a search returns it.
+
+LangChain's FAISS store assumes row positions are labels, which holds for flat
+and HNSW indexes but not for IVF ones once vectors are removed. add_to_store and
+remove_from_store give IVF indexes explicit, stable labels instead.
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from compact_storage import VECTOR_DTYPES, ChunkTexts
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+# Types whose build_index trains on the vectors it is given, so they need the whole document up front
+TRAINED_INDEX_TYPES = ("ivf", "ivfpq")
+# FAISS code type per vector dtype, as spelt in index_factory strings
+_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+# FAISS warns below ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def default_nlist(n_vectors: int) -> int:
+    """About 4 * sqrt(n) cells, capped so every cell gets enough training points."""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def needs_training(index_type: str, vector_dtype: str = "float32") -> bool:
+    """Whether build_index learns from its vectors, so the first document must be indexed whole."""
+    return index_type in TRAINED_INDEX_TYPES or vector_dtype == "int8"
+
+
+def build_index(
+    index_type: str,
+    training_vectors: np.ndarray,
+    nlist: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    hnsw_m: int = 32,
+    ef_search: int = 64,
+    pq_m: Optional[int] = None,
+    pq_bits: int = 8,
+    vector_dtype: str = "float32"
+) -> faiss.Index:
+    """
+    Build an empty (but trained, where needed) L2 index for vectors like `training_vectors`.
+    The caller adds the vectors afterwards.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}")
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown vector dtype '{vector_dtype}'. Choose one of: {', '.join(VECTOR_DTYPES)}")
+    vectors = np.ascontiguousarray(training_vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    codes = _CODES[vector_dtype]
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m) if codes == "Flat" else faiss.index_factory(dim, f"HNSW{hnsw_m}_{codes}")
+        index.hnsw.efSearch = ef_search
+        if not index.is_trained:
+            index.train(vectors)
+        return index
+
+    if index_type == "ivfpq":
+        pq_m = pq_m or _default_pq_m(dim)
+        # k-means for the PQ codebooks needs enough points per code
+        if n >= MIN_POINTS_PER_CENTROID * (1 << pq_bits):
+            nlist = nlist or default_nlist(n)
+            index = faiss.index_factory(dim, f"IVF{nlist},PQ{pq_m}x{pq_bits}")
+            index.train(vectors)
+            index.nprobe = nprobe or max(1, nlist // 16)
+            return index
+        index_type = "ivf"
+
+    if index_type == "ivf":
+        nlist = nlist or default_nlist(n)
+        if nlist >= 2 and n >= nlist * MIN_POINTS_PER_CENTROID:
+            index = faiss.index_factory(dim, f"IVF{nlist},{codes}")
+            index.train(vectors)
+            index.nprobe = nprobe or max(1, nlist // 16)
+            return index
+
+    if codes == "Flat":
+        return faiss.IndexFlatL2(dim)
+    index = faiss.index_factory(dim, codes)
+    if not index.is_trained:
+        index.train(vectors)
+    return index
+
+
+def _default_pq_m(dim: int) -> int:
+    """Largest sub-quantizer count up to dim / 8 that divides dim (48 for MiniLM's 384)."""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def empty_copy(index: faiss.Index) -> faiss.Index:
+    """An empty index with the type and training (IVF cells, PQ codebooks, int8 ranges) of `index`."""
+    copy = faiss.clone_index(index)
+    copy.reset()
+    return copy
+
+
+def index_kind(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    return not isinstance(index, faiss.IndexHNSW)
+
+
+def search_params(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """
+    Search parameters that restrict results to `selector`. IVF and HNSW indexes need their
+    own parameter types, and the index's nprobe/efSearch must be carried over explicitly.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+class ChunkDocstore(Docstore, AddableMixin):
+    """
+    LangChain docstore over compact chunk storage. Each document's chunks are held as
+    ChunkTexts segments (one per indexed batch, or one for the whole document) with
+    their location dicts; IDs are "<doc_id>:<n>" as everywhere in the vector store.
+    """
+
+    def __init__(self):
+        # doc_id -> (source, [(first chunk number, ChunkTexts, locations), ...])
+        self._documents: Dict[str, tuple] = {}
+
+    def add_chunks(self, doc_id: str, source: str, start: int, texts: Sequence[str], locations: List[dict]) -> None:
+        """Add chunks `start`.. of a document; plain strings are packed into a ChunkTexts first."""
+        if not isinstance(texts, ChunkTexts):
+            texts = ChunkTexts.from_texts(texts)
+        _, segments = self._documents.setdefault(doc_id, (source, []))
+        segments.append((start, texts, locations))
+
+    def replace_chunks(self, doc_id: str, texts: ChunkTexts, locations: List[dict]) -> None:
+        """Hold all of a document's chunks as the one `texts`, e.g. memory-mapped from the index cache."""
+        source, _ = self._documents[doc_id]
+        self._documents[doc_id] = (source, [(0, texts, locations)])
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        for id_, doc in texts.items():
+            doc_id, _, number = id_.rpartition(":")
+            location = {key: value for key, value in doc.metadata.items() if key not in ("doc_id", "source")}
+            self.add_chunks(doc_id, doc.metadata.get("source", ""), int(number), [doc.page_content], [location])
+
+    def search(self, search: str) -> Union[str, Document]:
+        doc_id, _, number = search.rpartition(":")
+        source, segments = self._documents.get(doc_id, (None, []))
+        n = int(number) if number.isdigit() else -1
+        for start, texts, locations in segments:
+            if start <= n < start + len(texts):
+                return Document(
+                    page_content=texts[n - start],
+                    metadata={"doc_id": doc_id, "source": source, **locations[n - start]}
+                )
+        return f"ID {search} not found."
+
+    def delete(self, ids: List) -> None:
+        """Remove whole documents; the vector store only ever deletes all of a document's chunks."""
+        for doc_id in {id_.rpartition(":")[0] for id_ in ids}:
+            self._documents.pop(doc_id, None)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(texts.nbytes for _, segments in self._documents.values() for _, texts, _ in segments)
+
+
+def add_to_store(
+    vector_store: FAISS,
+    doc_id: str,
+    source: str,
+    start: int,
+    texts: Sequence[str],
+    embeddings: np.ndarray,
+    locations: List[dict]
+) -> None:
+    """Add chunks `start`.. of a document with their precomputed vectors to a store over a ChunkDocstore."""
+    ids = [f"{doc_id}:{start + i}" for i in range(len(texts))]
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if isinstance(vector_store.index, faiss.IndexIVF):
+        # Label new vectors after the highest label ever used, never by ntotal, so they
+        # cannot collide with labels that survived an earlier removal
+        first = max(vector_store.index_to_docstore_id, default=-1) + 1
+        labels = np.arange(first, first + len(ids), dtype=np.int64)
+        vector_store.index.add_with_ids(vectors, labels)
+    else:
+        # Flat and HNSW indexes label vectors by row position, as LangChain's FAISS.add_embeddings does
+        first = len(vector_store.index_to_docstore_id)
+        labels = np.arange(first, first + len(ids), dtype=np.int64)
+        vector_store.index.add(vectors)
+    vector_store.docstore.add_chunks(doc_id, source, start, texts, locations)
+    vector_store.index_to_docstore_id.update(zip(labels.tolist(), ids))
+
+
+def remove_from_store(vector_store: FAISS, ids: List[str]) -> None:
+    """Remove vectors by docstore ID without renumbering the labels of the others."""
+    if not isinstance(vector_store.index, faiss.IndexIVF):
+        vector_store.delete(ids)
+        return
+    to_remove = set(ids)
+    labels = [label for label, id_ in vector_store.index_to_docstore_id.items() if id_ in to_remove]
+    vector_store.index.remove_ids(np.array(labels, dtype=np.int64))
+    for label in labels:
+        del vector_store.index_to_docstore_id[label]
+    vector_store.docstore.delete(ids)
@@ -0,0 +1,498 @@
+"""
+Multi-process serving. A WorkerPool runs N worker processes, each with its own
+QAChain and its own copy of the models (loaded once, at start), and a dispatcher
+in the serving process that hands them work:
+
+    pool = WorkerPool(processes=4)
+    job = pool.ingest("manual.pdf") # read and embedded by one worker
+    pool.submit("what does the warranty cover?").result()
+
+The corpus is a manifest kept by the pool: doc ID, name and index cache key per
+document. Workers share one index cache directory (PDF_QA_CACHE_DIR). The worker
+that ingests a PDF writes its entry; each other worker loads that entry, memory-
+mapped (see compact_storage), with the first task it gets after the manifest
+changed. No document is read or embedded twice, and any worker answers about any
+document. Work only goes to idle workers. Questions that queued up while every
+worker was busy go to the next free one as a single ask_questions batch. Each
+worker gets an equal share of the CPU threads, so N workers use the cores of one
+node without oversubscribing them.
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from index_cache import get_index_cache
+from ingestion import IngestCancelled, IngestJob
+from metrics import get_metrics
+from qa_chain import QAChain
+
+logger = logging.getLogger("pdf_qa")
+
+# Read by OpenMP, MKL and OpenBLAS when a worker first loads them
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def configured_qa_chain() -> QAChain:
+    """QAChain configured from the environment, as the API serves it."""
+    return QAChain(
+        index_cache=get_index_cache(),
+        reader_mode=os.environ.get("PDF_QA_READER_MODE", "stuff"),
+        chunks_per_pass=int(os.environ["PDF_QA_CHUNKS_PER_PASS"]) if os.environ.get("PDF_QA_CHUNKS_PER_PASS") else None,
+        confident_score=float(os.environ["PDF_QA_CONFIDENT_SCORE"]) if os.environ.get("PDF_QA_CONFIDENT_SCORE") else None,
+        retrieval_mode=os.environ.get("PDF_QA_RETRIEVAL_MODE", "dense"),
+        rerank=os.environ.get("PDF_QA_RERANK") == "1",
+        chunking=os.environ.get("PDF_QA_CHUNKING", "characters"),
+        vector_dtype=os.environ.get("PDF_QA_VECTOR_DTYPE", "float32")
+    )
+
+
+# --- Worker process ---
+def _picklable(error: Exception) -> Exception:
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _limit_threads(threads: int) -> None:
+    import faiss
+    faiss.omp_set_num_threads(threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def sync_corpus(qa_chain: QAChain, manifest: List[Tuple[str, str, str]]) -> List[Tuple[str, str]]:
+    """
+    Make the chain's corpus the manifest's (doc_id, name, cache key) list, loading new documents
+    from the cache. Documents whose entry is gone are left out; returns their (doc_id, cache key).
+    """
+    wanted = {doc_id: key for doc_id, _, key in manifest}
+    stale = [doc_id for doc_id, info in qa_chain.documents.items() if wanted.get(doc_id) != info["hash"]]
+    try:
+        for doc_id in stale:
+            qa_chain.remove_document(doc_id)
+    except ValueError:
+        # Index types that cannot remove vectors are rebuilt from the cache instead
+        qa_chain.clear()
+    missing = []
+    for doc_id, name, key in manifest:
+        if doc_id not in qa_chain.documents:
+            try:
+                qa_chain.add_cached_document(key, doc_id=doc_id, name=name)
+            except (KeyError, OSError):
+                # Evicted, possibly by another worker while this one was loading it
+                missing.append((doc_id, key))
+    return missing
+
+
+def _worker_main(factory: Callable[[], QAChain], threads: int, warm_up: bool, connection, cancel) -> None:
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        qa_chain = factory()
+        if qa_chain.index_cache is None:
+            raise ValueError("Worker QAChains need an index cache to share documents through")
+        if warm_up:
+            qa_chain.warm_up()
+        _limit_threads(threads)
+    except Exception as e:
+        connection.send((None, "failed", _picklable(e)))
+        return
+    connection.send((None, "ready", None))
+
+    synced = None
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        task_id, kind, payload, corpus = message
+        try:
+            if corpus is not None and corpus[0] != synced:
+                missing = sync_corpus(qa_chain, corpus[1])
+                synced = corpus[0]
+                if missing:
+                    connection.send((task_id, "missing", missing))
+            if kind == "ask":
+                result = qa_chain.ask_questions(*payload)
+            elif kind == "ingest":
+                pdf_path, name, remove_file = payload
+
+                def report(progress: dict) -> None:
+                    # Raising here makes add_document remove what it indexed so far
+                    if cancel.value == task_id:
+                        raise IngestCancelled()
+                    connection.send((task_id, "progress", progress))
+
+                try:
+                    doc_id = qa_chain.add_document(pdf_path, name=name, progress=report)
+                finally:
+                    if remove_file and os.path.exists(pdf_path):
+                        os.remove(pdf_path)
+                result = {"doc_id": doc_id, **qa_chain.documents[doc_id]}
+            else: # "stats"
+                result = {
+                    "cache_stats": qa_chain.cache_stats(),
+                    "index_cache": qa_chain.index_cache.stats(),
+                    "documents": list(qa_chain.documents),
+                    "metrics": get_metrics().export(),
+                }
+            connection.send((task_id, "done", result))
+        except Exception as e:
+            connection.send((task_id, "error", _picklable(e)))
+
+
+def _set_result(future: Future, result: Any) -> None:
+    """Complete `future` unless its caller cancelled it (as the API does when a client goes away)."""
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _set_exception(future: Future, error: BaseException) -> None:
+    try:
+        future.set_exception(error)
+    except InvalidStateError:
+        pass
+
+
+# --- Dispatcher ---
+@dataclass
+class _Task:
+    kind: str # "ask", "ask_batch", "ingest" or "stats"
+    payload: tuple
+    future: Future = field(default_factory=Future)
+    job: Optional[IngestJob] = None
+
+    @property
+    def doc_key(self) -> Optional[tuple]:
+        doc_ids = self.payload[1]
+        return tuple(sorted(doc_ids)) if doc_ids is not None else None
+
+
+class WorkerPool:
+    """
+    `processes` workers built by `factory`, a module-level function so it can be sent
+    to spawned processes; it must give each QAChain an index cache on the shared
+    directory. With `warm_up`, every worker runs QAChain.warm_up before taking work.
+    A worker that dies is restarted and its in-flight work fails with RuntimeError.
+    A document whose cache entry is gone when a worker needs it is dropped from the corpus.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        factory: Callable[[], QAChain] = configured_qa_chain,
+        max_batch_size: int = 16,
+        warm_up: bool = True,
+        start_method: str = "spawn"
+    ):
+        self.processes = processes
+        self.factory = factory
+        self.max_batch_size = max_batch_size
+        self.warm_up = warm_up
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // processes)
+        # Corpus manifest: doc_id -> {"name", "chunks", "hash"}, as QAChain.documents
+        self.documents: Dict[str, dict] = {}
+        self.corpus_version = 0
+        # Batches sent to workers and the questions in them, as MicroBatcher counts them
+        self.batches = 0
+        self.questions = 0
+        self._context = multiprocessing.get_context(start_method)
+        # One pipe per worker: unlike a shared Queue, no lock a killed worker could leave held
+        self._connections: List[Any] = [None] * processes
+        # Per worker, the task ID of an ingest to cancel; read by the worker between batches
+        self._cancel_flags: List[Any] = [None] * processes
+        self._workers: List[Any] = [None] * processes
+        self._failed: Dict[int, Exception] = {}
+        self._started: set = set()
+        self._idle: Deque[int] = deque()
+        self._ready = threading.Event() # set once every worker is ready or failed to start
+        self._pending: Deque[_Task] = deque()
+        self._in_flight: Dict[int, Tuple[int, List[_Task]]] = {}
+        self._next_task_id = 0
+        self._closed = False
+        # Reentrant: futures are resolved with it held, and their callbacks may submit more work
+        self._lock = threading.RLock()
+        for worker_id in range(processes):
+            self._start_worker(worker_id)
+        self._collector = threading.Thread(target=self._collect, name="worker-pool", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, worker_id: int) -> None:
+        connection, child_connection = self._context.Pipe()
+        self._cancel_flags[worker_id] = self._context.RawValue("q", -1)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.factory, self.threads_per_worker, self.warm_up, child_connection, self._cancel_flags[worker_id]),
+            name=f"qa-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        child_connection.close()
+        self._connections[worker_id] = connection
+        self._workers[worker_id] = process
+
+    def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """Block until every worker has loaded its models or failed to; raises if all of them failed."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"Workers not ready after {timeout}s")
+        if len(self._failed) == self.processes:
+            raise RuntimeError(f"Every worker failed to start: {next(iter(self._failed.values()))}")
+
+    # --- Public API ---
+    def submit(self, question: str, doc_ids: Optional[List[str]] = None) -> Future:
+        """Queue a question; the future resolves to the dict QAChain.ask_question gives (MicroBatcher's interface)."""
+        return self._submit(_Task("ask", (question, doc_ids)))
+
+    def ask(self, question: str, doc_ids: Optional[List[str]] = None) -> dict:
+        return self.submit(question, doc_ids).result()
+
+    def submit_batch(self, questions: List[str], doc_ids: Optional[List[str]] = None) -> Future:
+        """Queue questions answered together by one worker; resolves to QAChain.ask_questions' list."""
+        return self._submit(_Task("ask_batch", (questions, doc_ids)))
+
+    def ingest(self, pdf_path: str, name: Optional[str] = None, remove_file: bool = False) -> IngestJob:
+        """Add a PDF to the corpus on the next idle worker; `pdf_path` must be readable by the workers."""
+        job = IngestJob(name=name or os.path.basename(pdf_path))
+        task = _Task("ingest", (pdf_path, job.name, remove_file), job=job)
+        job.future = task.future
+        job.on_cancel = lambda: self._cancel(task)
+        self._submit(task)
+        return job
+
+    def remove_document(self, doc_id: str) -> None:
+        """Drop a document from the corpus; each worker drops it before its next task."""
+        with self._lock:
+            if doc_id not in self.documents:
+                raise KeyError(f"Unknown document id: {doc_id}")
+            del self.documents[doc_id]
+            self.corpus_version += 1
+
+    def _cancel(self, task: _Task) -> None:
+        """IngestJob.cancel: drop a queued ingest, or have its worker stop at the next batch."""
+        with self._lock:
+            if any(queued is task for queued in self._pending):
+                self._pending.remove(task)
+                task.job.status, task.job.finished_at = "cancelled", time.perf_counter()
+                _set_result(task.future, None)
+                return
+            for task_id, (worker_id, batch) in self._in_flight.items():
+                if batch[0] is task:
+                    self._cancel_flags[worker_id].value = task_id
+
+    def clear(self) -> None:
+        with self._lock:
+            self.documents = {}
+            self.corpus_version += 1
+
+    def list_documents(self) -> List[dict]:
+        with self._lock:
+            return [{"doc_id": doc_id, **info} for doc_id, info in self.documents.items()]
+
+    def stats(self) -> Future:
+        """Resolves to one dict per running worker: its cache counters, documents and metrics export."""
+        tasks = []
+        with self._lock:
+            for worker_id in range(self.processes):
+                if worker_id not in self._failed:
+                    task = _Task("stats", ())
+                    self._send(worker_id, [task], with_corpus=False)
+                    tasks.append(task)
+        combined = Future()
+
+        def gather(_):
+            if all(task.future.done() for task in tasks) and not combined.done():
+                results = [task.future.result() for task in tasks if task.future.exception() is None]
+                _set_result(combined, results)
+
+        for task in tasks:
+            task.future.add_done_callback(gather)
+        if not tasks:
+            _set_result(combined, [])
+        return combined
+
+    def close(self) -> None:
+        """Stop every worker; queued work that was never dispatched fails."""
+        with self._lock:
+            self._closed = True
+            pending, self._pending = list(self._pending), deque()
+        for task in pending:
+            _set_exception(task.future, RuntimeError("WorkerPool is closed"))
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout=5)
+
+    # --- Dispatching ---
+    def _submit(self, task: _Task) -> Future:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WorkerPool is closed")
+            if len(self._failed) == self.processes:
+                raise RuntimeError(f"Every worker failed to start: {next(iter(self._failed.values()))}")
+            self._pending.append(task)
+            self._dispatch()
+        return task.future
+
+    def _dispatch(self) -> None:
+        """Hand queued work to idle workers; call with the lock held."""
+        while self._pending and self._idle:
+            worker_id = self._idle.popleft()
+            task = self._pending.popleft()
+            batch = [task]
+            if task.kind == "ask":
+                # Questions that queued up for the same documents go together
+                skipped = []
+                while self._pending and len(batch) < self.max_batch_size:
+                    other = self._pending.popleft()
+                    (batch if other.kind == "ask" and other.doc_key == task.doc_key else skipped).append(other)
+                self._pending.extendleft(reversed(skipped))
+            elif task.job is not None:
+                task.job.status = "running"
+                task.job.started_at = time.perf_counter()
+            self._send(worker_id, batch)
+
+    def _send(self, worker_id: int, batch: List[_Task], with_corpus: bool = True) -> None:
+        task_id = self._next_task_id
+        self._next_task_id += 1
+        first = batch[0]
+        if first.kind == "ask":
+            payload = ([task.payload[0] for task in batch], first.payload[1])
+        else:
+            payload = first.payload
+        manifest = [(doc_id, info["name"], info["hash"]) for doc_id, info in self.documents.items()]
+        corpus = (self.corpus_version, manifest) if with_corpus else None
+        kind = "ask" if first.kind == "ask_batch" else first.kind
+        try:
+            self._connections[worker_id].send((task_id, kind, payload, corpus))
+        except OSError:
+            # The worker exited and _restart has not replaced it yet; the work waits for the next idle one
+            if first.kind == "stats":
+                _set_exception(first.future, RuntimeError(f"Worker {worker_id} has exited"))
+            else:
+                self._pending.extendleft(reversed(batch))
+            return
+        self._in_flight[task_id] = (worker_id, batch)
+        if kind == "ask":
+            self.batches += 1
+            self.questions += len(payload[0])
+
+    def _collect(self) -> None:
+        while not self._closed:
+            with self._lock:
+                # Workers that failed to start have exited for good; waiting on them would spin
+                running = [worker_id for worker_id in range(self.processes) if worker_id not in self._failed]
+                connections = {self._connections[worker_id]: worker_id for worker_id in running}
+                sentinels = {self._workers[worker_id].sentinel: worker_id for worker_id in running}
+            ready = wait([*connections, *sentinels], timeout=1.0)
+            for connection in [item for item in ready if item in connections]:
+                # Read everything a worker sent before it exited
+                while not self._closed and connection.poll():
+                    try:
+                        message = connection.recv()
+                    except (EOFError, OSError):
+                        break
+                    self._handle(connections[connection], *message)
+            for sentinel in [item for item in ready if item in sentinels]:
+                self._restart(sentinels[sentinel])
+
+    def _handle(self, worker_id: int, task_id: Optional[int], status: str, value: Any) -> None:
+        with self._lock:
+            if status == "ready":
+                self._idle.append(worker_id)
+                self._started.add(worker_id)
+            elif status == "failed":
+                logger.error("Worker %d failed to start: %s", worker_id, value)
+                self._failed[worker_id] = value
+                self._started.discard(worker_id)
+                if len(self._failed) == self.processes:
+                    self._fail_pending(value)
+            elif status == "missing":
+                self._drop_missing(value)
+            elif status == "progress":
+                job = self._in_flight[task_id][1][0].job
+                job.pages_done = value["pages_done"]
+                job.pages_total = value["pages_total"]
+                job.chunks_done = value["chunks_done"]
+            else:
+                self._finish(task_id, status, value)
+            if len(self._started) + len(self._failed) == self.processes:
+                self._ready.set()
+            self._dispatch()
+
+    def _finish(self, task_id: int, status: str, value: Any) -> None:
+        worker_id, batch = self._in_flight.pop(task_id)
+        first = batch[0]
+        if first.kind != "stats":
+            self._idle.append(worker_id)
+        if first.job is not None:
+            first.job.finished_at = time.perf_counter()
+        if status == "error" and isinstance(value, IngestCancelled):
+            first.job.status = "cancelled"
+            _set_result(first.future, None)
+            return
+        if status == "error":
+            for task in batch:
+                if task.job is not None:
+                    task.job.error, task.job.status = str(value), "failed"
+                _set_exception(task.future, value)
+            return
+        if first.kind == "ask":
+            for task, result in zip(batch, value):
+                _set_result(task.future, result)
+            return
+        if first.kind == "ingest":
+            doc_id = value.pop("doc_id")
+            self.documents[doc_id] = value
+            self.corpus_version += 1
+            first.job.doc_id, first.job.status = doc_id, "done"
+        _set_result(first.future, value if first.kind != "ingest" else doc_id)
+
+    def _drop_missing(self, missing: List[Tuple[str, str]]) -> None:
+        """Drop documents a worker could not load from the cache; logged once, by the first worker to report them."""
+        for doc_id, key in missing:
+            if self.documents.get(doc_id, {}).get("hash") == key:
+                logger.error("Document %s is no longer in the index cache (%s); dropped from the corpus", doc_id, key)
+                del self.documents[doc_id]
+                self.corpus_version += 1
+
+    def _fail_pending(self, error: Exception) -> None:
+        pending, self._pending = list(self._pending), deque()
+        for task in pending:
+            if task.job is not None:
+                task.job.error, task.job.status = str(error), "failed"
+            _set_exception(task.future, error)
+
+    def _restart(self, worker_id: int) -> None:
+        """Fail the work of a worker that exited and start a new one in its place."""
+        with self._lock:
+            process = self._workers[worker_id]
+            process.join()
+            if self._closed or worker_id in self._failed:
+                return
+            error = RuntimeError(f"Worker {worker_id} exited with code {process.exitcode}")
+            logger.error("%s; restarting it", error)
+            for task_id in [task_id for task_id, (owner, _) in self._in_flight.items() if owner == worker_id]:
+                self._finish(task_id, "error", error)
+            if worker_id in self._idle:
+                self._idle.remove(worker_id)
+            self._connections[worker_id].close()
+            self._start_worker(worker_id)
+            self._dispatch()